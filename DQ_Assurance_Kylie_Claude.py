@@ -1,18 +1,34 @@
 import streamlit as st
 import pandas as pd
-import requests
 import time
-from geopy.distance import geodesic
 import plotly.graph_objects as go
 import json
+import uuid
 import anthropic
 
-# -----------------------------
-# Config
-# -----------------------------
-GERMANY_LAT_RANGE = (47.27, 55.06)
-GERMANY_LON_RANGE = (5.87, 15.04)
-CONFIDENCE_THRESHOLD = 0.8
+from accumulation import ACCUMULATION_COLUMNS, DEFAULT_RADIUS_M, DEFAULT_TOP_K, accumulation
+from dedup import location_keys
+from distance import DISCREPANCY_THRESHOLD_KM, DISTANCE_METHODS, coordinate_discrepancy
+from dq_rules import flag_columns
+from enrichment import ATTRIBUTE_COLUMNS, BuildingEnricher, StubClaudeClient, rows_needing_enrichment
+from export import EXPORT_FORMATS, export_file, flagged_rows
+from flag_index import DISCREPANCY_FLAG, FlagIndex
+from geocache import DEFAULT_CACHE_PATH, DEFAULT_TTL_DAYS, GeocodeCache
+from geocoding import API_COLUMNS, API_PROPERTY_COLUMNS, DEFAULT_MAX_WORKERS, DEFAULT_RATE_LIMIT, GeocodingEngine
+from geoservice import GeocodingService
+from incremental import (
+    fingerprint_settings, load_snapshot, row_fingerprints, save_snapshot, split_incremental, stitch_results,
+)
+from jobs import JobManager, frame_fingerprint
+from map_bins import GERMANY_CENTRE, MAX_ZOOM, MIN_ZOOM, MapBinner, view_bounds
+from metrics import METRICS
+from offline_geo import DEFAULT_POSTCODE_PATH, OfflineReverseGeocoder
+from pipeline import (
+    COMPLETENESS_COLUMNS, geocode_and_validate, load_portfolio, policy_counts, prepare_geocoding_columns,
+    select_reverse_source,
+)
+from profiling import content_hash, profile_frame
+from schema import SUPPORTED_UPLOAD_TYPES, memory_usage_mb, read_table
 
 # -----------------------------
 # Claude Setup
@@ -55,142 +71,172 @@ def get_building_attributes_from_ai(address, postal, client):
         return {"error": "Invalid JSON", "raw_output": raw_text}
 
 
-# -----------------------------
-# Geocoding Functions (unchanged)
-# -----------------------------
-def geocode_address(address, city, api_key, postal_code=None):
-    base_url = "https://api.geoapify.com/v1/geocode/search"
-    query = f"{address}, {city}, Germany"
-    if postal_code and not pd.isna(postal_code):
-        query = f"{address}, {postal_code} {city}, Germany"
-    params = {"text": query, "apiKey": api_key, "limit": 1, "lang": "de"}
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        if data["features"]:
-            feature = data["features"][0]
-            lat = feature["geometry"]["coordinates"][1]
-            lon = feature["geometry"]["coordinates"][0]
-            confidence = feature["properties"].get("rank", {}).get("confidence", None)
-            return lat, lon, confidence
-    return None, None, None
-
-def reverse_geocode(lat, lon, api_key):
-    url = f"https://api.geoapify.com/v1/geocode/reverse?lat={lat}&lon={lon}&apiKey={api_key}&lang=de"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        if data["features"]:
-            props = data["features"][0]["properties"]
-            return props.get("city", ""), props.get("postcode", "")
-    return "", ""
-
-# -----------------------------
-# Data Quality Checks
-# -----------------------------
-def validate_row(row, api_key):
-    flags = {
-        "DQ: Missing Coordinates": False,
-        "DQ: Invalid Coordinates": False,
-        "DQ: Low Confidence": False,
-        "DQ: Reverse Geocode Mismatch": False,
-        "DQ: City/Postal Mismatch": False,
-        "DQ: Incomplete Address": False
-    }
-
-    if pd.isna(row["Latitude"]) or pd.isna(row["Longitude"]):
-        flags["DQ: Missing Coordinates"] = True
-    else:
-        if not (GERMANY_LAT_RANGE[0] <= row["Latitude"] <= GERMANY_LAT_RANGE[1]) or \
-           not (GERMANY_LON_RANGE[0] <= row["Longitude"] <= GERMANY_LON_RANGE[1]):
-            flags["DQ: Invalid Coordinates"] = True
-        else:
-            rev_city, rev_postal = reverse_geocode(row["Latitude"], row["Longitude"], api_key)
-            if rev_city and isinstance(row["City"], str) and rev_city.lower() != row["City"].lower():
-                flags["DQ: Reverse Geocode Mismatch"] = True
-            if rev_postal and row.get("Postal Code") and str(rev_postal) != str(row["Postal Code"]):
-                flags["DQ: City/Postal Mismatch"] = True
-
-    if row.get("Geocoding Confidence") is not None and row["Geocoding Confidence"] < CONFIDENCE_THRESHOLD:
-        flags["DQ: Low Confidence"] = True
-
-    if isinstance(row["Address"], str):
-        if len(row["Address"].split()) < 2:
-            flags["DQ: Incomplete Address"] = True
-    else:
-        flags["DQ: Incomplete Address"] = True
-
-    return flags
-
 # -----------------------------
 # Streamlit Layout
 # -----------------------------
 st.set_page_config(page_title="Exposure Management – Data Quality Dashboard", layout="wide")
 st.title("📊 Exposure Management – Data Quality Dashboard")
 
+
+@st.cache_resource(show_spinner=False)
+def get_geocode_cache(path, ttl_days):
+    return GeocodeCache(path, ttl_days=ttl_days)
+
+
+@st.cache_resource(show_spinner="Loading postcode index...")
+def get_offline_geocoder(path):
+    return OfflineReverseGeocoder.from_file(path)
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager():
+    return JobManager()
+
+
+@st.cache_data(show_spinner="Profiling portfolio...")
+def get_profile(file_hash, _df):
+    # Single-pass profile plus one gauge figure for all present columns, cached per file content.
+    profile = profile_frame(_df, COMPLETENESS_COLUMNS)
+    present = profile["columns"][profile["columns"]["present"]].reset_index(drop=True)
+    n_grid_rows = max(1, -(-len(present) // 2))
+    fig = go.Figure()
+    for i, item in present.iterrows():
+        fig.add_trace(go.Indicator(
+            mode="gauge+number",
+            value=item["reported_ratio"],
+            title={'text': f"{item['column']} Reported", 'font': {'size': 16}},
+            domain={'row': i // 2, 'column': i % 2},
+            gauge={
+                'axis': {'range': [0, 100]},
+                'bar': {'color': "#1f77b4"},
+                'steps': [
+                    {'range': [0, 50], 'color': "#ff4d4d"},
+                    {'range': [50, 80], 'color': "#ffeb3b"},
+                    {'range': [80, 100], 'color': "#4caf50"}
+                ],
+                'threshold': {'line': {'color': "black", 'width': 4}, 'value': 100}
+            }
+        ))
+    fig.update_layout(grid={'rows': n_grid_rows, 'columns': 2, 'ygap': 0.35}, height=220 * n_grid_rows,
+                      margin=dict(l=10, r=10, t=50, b=10))
+    return profile, fig
+
+
+@st.cache_resource(show_spinner=False)
+def get_geocoding_engine(api_key, max_workers, rate_limit, cache_path, ttl_days):
+    # the cache is the sidebar's instance for the same path and TTL, so stats and "clear cache" see its writes
+    return GeocodingEngine(api_key, max_workers=max_workers, rate_limit=rate_limit,
+                           cache=get_geocode_cache(cache_path, ttl_days))
+
+
+@st.cache_resource(show_spinner=False)
+def get_geocoding_service(api_key, max_workers, rate_limit, cache_path, ttl_days):
+    # shared by every browser session, so identical lookups in flight are sent once
+    return GeocodingService(get_geocoding_engine(api_key, max_workers, rate_limit, cache_path, ttl_days))
+
+
+@st.cache_resource(show_spinner="Indexing locations for the map...", max_entries=4)
+def get_map_binner(data_key, _df):
+    # one per uploaded file and geocoding result; keeps its per-zoom cell summaries
+    return MapBinner(_df)
+
+
+def show_flag_explorer(index, key, default_flags=(), columns=None):
+    # Filter, sort and page controls over a FlagIndex; only the current page is sent to the browser.
+    c1, c2 = st.columns([4, 1])
+    flags = c1.multiselect("Flags", index.flags, default=[f for f in default_flags if f in index.flags],
+                           format_func=lambda f: f"{f.removeprefix('DQ: ')} ({len(index.rows_by_flag[f])})",
+                           key=f"{key}_flags")
+    require_all = c2.radio("Match", ["Any flag", "All flags"], key=f"{key}_match") == "All flags"
+    filters = {}
+    for column, col in zip(index.filter_values, st.columns(max(1, len(index.filter_values)))):
+        filters[column] = col.multiselect(column, index.filter_values[column], key=f"{key}_{column}")
+    rows = index.select(flags, require_all, filters)
+
+    c1, c2, c3, c4 = st.columns(4)
+    sort_by = c1.selectbox("Sort by", ["(file order)"] + (columns or list(index.df.columns)), key=f"{key}_sort")
+    ascending = c2.radio("Order", ["Ascending", "Descending"], horizontal=True, key=f"{key}_order") == "Ascending"
+    page_size = c3.selectbox("Rows per page", [50, 100, 500, 1000], index=1, key=f"{key}_page_size")
+    n_pages = max(1, -(-len(rows) // page_size))
+    page = min(c4.number_input(f"Page (of {n_pages:,})", min_value=1, value=1, key=f"{key}_page"), n_pages) - 1
+    st.caption(f"Rows {min(len(rows), page * page_size + 1):,}–{min(len(rows), (page + 1) * page_size):,} "
+               f"of {len(rows):,} matching.")
+    st.dataframe(index.page(rows, page, page_size, None if sort_by == "(file order)" else sort_by, ascending, columns))
+
+
 with st.sidebar:
     st.header("Configuration")
     api_key = st.text_input("🔑 Enter Geoapify API Key", type="password")
-
-uploaded_file = st.file_uploader("📄 Upload your CSV file", type=["csv"])
+    max_workers = st.number_input("⚡ Concurrent geocoding requests", min_value=1, max_value=64,
+                                  value=DEFAULT_MAX_WORKERS, step=1)
+    rate_limit = st.number_input("⏱️ Max API requests per second (0 = unlimited)", min_value=0,
+                                 value=DEFAULT_RATE_LIMIT, step=1)
+    geocoding_mode = st.radio("🧭 Geocoding mode", ["Per-row requests", "Batch job"],
+                              help="Batch job submits up to 1000 addresses per Geoapify batch request and polls for the results.")
+    reverse_mode = st.radio("📮 Reverse geocoding source", ["Geoapify API", "Offline postcode file"],
+                            help=f"Offline mode matches coordinates to the nearest postcode centroid in {DEFAULT_POSTCODE_PATH}.")
+
+    with st.expander("🗄️ Geocode Cache"):
+        cache_ttl_days = st.number_input("Cache entry lifetime (days)", min_value=1,
+                                         value=DEFAULT_TTL_DAYS, step=30)
+        geocode_cache = get_geocode_cache(DEFAULT_CACHE_PATH, cache_ttl_days)
+        warm_file = st.file_uploader("Warm cache from a previous validated.csv", type=SUPPORTED_UPLOAD_TYPES)
+        if warm_file is not None and st.session_state.get("warmed_cache_from") != warm_file.name:
+            warmed = geocode_cache.warm_from_frame(read_table(warm_file))
+            st.session_state["warmed_cache_from"] = warm_file.name
+            st.success(f"Warmed cache with {warmed} geocoded addresses.")
+        if st.button("🗑️ Clear cache"):
+            geocode_cache.clear()
+        st.json(geocode_cache.stats())
+
+uploaded_file = st.file_uploader("📄 Upload your CSV or Parquet file", type=SUPPORTED_UPLOAD_TYPES)
 
 if uploaded_file:
-    df = pd.read_csv(uploaded_file)
-    df.columns = df.columns.str.strip()
-
-    qtab, completeness_tab, geotab, discrepancy_tab, export_tab, building_tab = st.tabs([
-        "Policy Count Validation", "Data Completeness", "Geocoding & Flags", "Coordinate Discrepancies", "Export", "Building Validation"
+    with METRICS.stage("load"):
+        df = load_portfolio(uploaded_file)
+    upload_hash = content_hash(uploaded_file.getvalue())
+    st.caption(f"Loaded {len(df):,} rows ({memory_usage_mb(df):.1f} MB in memory).")
+
+    result_df = result_key = None  # set once geocoding has finished; Map and Export then use the flagged results
+    qtab, completeness_tab, geotab, discrepancy_tab, accumulation_tab, map_tab, export_tab, building_tab = st.tabs([
+        "Policy Count Validation", "Data Completeness", "Geocoding & Flags", "Coordinate Discrepancies",
+        "Accumulation", "Map", "Export", "Building Validation"
     ])
 
     # ---------------- Tab 1 ----------------
     with qtab:
         st.subheader("Policy Count Validation")
-        if 'Unique ID' in df.columns:
-            total_policies = len(df)
-            unique_locations = df['Unique ID'].nunique()
-            st.write(f"**Number of Policies = {total_policies}**")
-            st.write(f"**Thereof Number of Unique Locations = {unique_locations}**")
-            if total_policies > unique_locations:
-                st.warning(f"Found {total_policies - unique_locations} duplicate Unique ID(s).")
+        counts = policy_counts(df)
+        if counts:
+            st.write(f"**Number of Policies = {counts['policies']}**")
+            st.write(f"**Thereof Number of Unique Locations = {counts['unique_locations']}**")
+            if counts["duplicate_ids"] > 0:
+                st.warning(f"Found {counts['duplicate_ids']} duplicate Unique ID(s).")
         else:
             st.error("Error: 'Unique ID' column not found.")
 
     # ---------------- Tab 2 ----------------
     with completeness_tab:
         st.subheader("Data Completeness Validation")
-        columns_to_check = ['Sum Insured', 'Deductible', 'Mapped LoB', 'Construction Type', 'Occupancy', 'Year Built', 'Number of Stories', 'Basement']
-        total_rows = len(df)
-
-        cols = st.columns(2)
-        col_idx = 0
-
-        for column in columns_to_check:
-            if column in df.columns:
-                empty_count = df[column].isna().sum()
-                reported_ratio = (1 - empty_count / total_rows) * 100
-                fig = go.Figure(go.Indicator(
-                    mode="gauge+number",
-                    value=reported_ratio,
-                    title={'text': f"{column} Reported", 'font': {'size': 16}},
-                    gauge={
-                        'axis': {'range': [0, 100]},
-                        'bar': {'color': "#1f77b4"},
-                        'steps': [
-                            {'range': [0, 50], 'color': "#ff4d4d"},
-                            {'range': [50, 80], 'color': "#ffeb3b"},
-                            {'range': [80, 100], 'color': "#4caf50"}
-                        ],
-                        'threshold': {'line': {'color': "black", 'width': 4}, 'value': 100}
-                    }
-                ))
-                fig.update_layout(height=200, margin=dict(l=10, r=10, t=50, b=10))
-                with cols[col_idx]:
-                    st.plotly_chart(fig, use_container_width=True)
-                    if empty_count > 0:
-                        st.warning(f"Found {empty_count} empty {column} values.")
-                col_idx = (col_idx + 1) % 2
-            else:
-                st.error(f"Error: '{column}' column not found in the uploaded CSV.")
+        profile, completeness_fig = get_profile(upload_hash, df)
+        with METRICS.stage("plotly_render"):
+            st.plotly_chart(completeness_fig, use_container_width=True)
+        for item in profile["columns"].to_dict("records"):
+            if not item["present"]:
+                st.error(f"Error: '{item['column']}' column not found in the uploaded CSV.")
+            elif item["empty_count"] > 0:
+                st.warning(f"Found {item['empty_count']} empty {item['column']} values.")
+
+        st.write("### Value Ranges")
+        st.dataframe(profile["columns"][profile["columns"]["present"]].drop(columns="present"), hide_index=True)
+        st.write("### Plausibility Checks")
+        st.dataframe(profile["plausibility"], hide_index=True)
+        for check in profile["plausibility"].itertuples():
+            if check.count > 0:
+                st.warning(f"{check.count} rows fail '{check.check}'.")
+        for column, values in profile["unparsable"].items():
+            examples = ", ".join(f"'{v}'" for v in values.astype(str).unique()[:3])
+            st.warning(f"{len(values)} {column} values are not valid numbers and were kept as entered (e.g. {examples}).")
 
     # ---------------- Tab 3 ----------------
     with geotab:
@@ -200,60 +246,115 @@ if uploaded_file:
             # Sidebar controls
             max_rows = st.sidebar.number_input("🔢 Limit rows for geocoding (0 = all)", 
                                             min_value=0, max_value=len(df), value=0, step=100)
+            reuse_previous = st.sidebar.checkbox("♻️ Reuse results of unchanged rows from the previous run",
+                                                 value=True, key="reuse_previous")
 
             if api_key:
-                # Ensure required cols exist
-                for col in ["Latitude", "Longitude", "Geocoding Confidence"]:
-                    if col not in df.columns:
-                        df[col] = None
-
-                # Add API results columns
-                df["API_Latitude"] = None
-                df["API_Longitude"] = None
-                df["API_Confidence"] = None
-                df["Use_API_Coordinates"] = False
-
-                # --- Cached geocode call ---
-                @st.cache_data(show_spinner=False)
-                def cached_geocode(address, city, postal, api_key):
-                    return geocode_address(address, city, api_key, postal)
-
-                # --- Progress bar setup ---
-                n_rows = len(df) if max_rows == 0 else min(max_rows, len(df))
-                progress = st.progress(0)
-                status = st.empty()
-
-                for i, row in df.head(n_rows).iterrows():
-                    api_lat, api_lon, api_conf = cached_geocode(row["Address"], row["City"], row.get("Postal Code"), api_key)
-                    df.at[i, "API_Latitude"] = api_lat
-                    df.at[i, "API_Longitude"] = api_lon
-                    df.at[i, "API_Confidence"] = api_conf
+                # Ensure required cols exist and reset the API result columns
+                prepare_geocoding_columns(df)
 
-                    orig_conf = row.get("Geocoding Confidence")
-                    if pd.isna(row["Latitude"]) or pd.isna(row["Longitude"]):
-                        df.at[i, "Use_API_Coordinates"] = True
-                    elif api_conf is not None and (orig_conf is None or api_conf > orig_conf):
-                        df.at[i, "Use_API_Coordinates"] = True
+                service = get_geocoding_service(api_key, max_workers, rate_limit, DEFAULT_CACHE_PATH, cache_ttl_days)
+                session_engine = service.for_session(st.session_state.setdefault("session_id", uuid.uuid4().hex))
 
-                    progress.progress((i+1)/n_rows)
-                    status.text(f"Processed {i+1}/{n_rows} rows...")
-
-                progress.empty()
-                status.success(f"✅ Finished geocoding {n_rows} rows.")
-
-                # --- Run validation checks ---
-                dq_flags = [validate_row(row, api_key) for _, row in df.head(n_rows).iterrows()]
-                dq_df = pd.DataFrame(dq_flags)
-                result_df = pd.concat([df.head(n_rows), dq_df], axis=1)
-
-                # --- Show summary counts ---
-                st.write("### Data Quality Summary")
-                summary = dq_df.sum().reset_index()
-                summary.columns = ["Check", "Count"]
-                st.table(summary)
-
-                st.write("### Detailed Results")
-                st.dataframe(result_df)
+                n_rows = len(df) if max_rows == 0 else min(max_rows, len(df))
+                sample = df.head(n_rows)
+                batch = geocoding_mode == "Batch job"
+                reverse_source = select_reverse_source(session_engine, batch)
+                offline_reverse = False
+                if reverse_mode == "Offline postcode file":
+                    try:
+                        reverse_source = get_offline_geocoder(DEFAULT_POSTCODE_PATH).reverse_batch
+                        offline_reverse = True
+                    except FileNotFoundError:
+                        st.error(f"❌ Offline postcode file not found at '{DEFAULT_POSTCODE_PATH}'. "
+                                 "Falling back to the Geoapify reverse geocoding API.")
+                settings = fingerprint_settings(batch, offline_reverse)  # same as the CLI's, for the shared snapshot
+
+                # --- Split off rows unchanged since the last run (kept per upload and settings, so
+                # saving this run's snapshot does not change what this run re-processes, and widget
+                # clicks do not re-hash the sample) ---
+                run_key = (upload_hash, n_rows, settings, reuse_previous)
+                if st.session_state.get("incremental_split", {}).get("run_key") != run_key:
+                    fingerprints = row_fingerprints(sample, *settings)
+                    reused, changed = split_incremental(sample, load_snapshot() if reuse_previous else None,
+                                                        fingerprints)
+                    st.session_state["incremental_split"] = {
+                        "run_key": run_key, "fingerprints": fingerprints, "reused": reused, "changed": changed,
+                        "split_key": frame_fingerprint(sample, *settings, reuse_previous),
+                        "job_id": frame_fingerprint(changed, *settings) if len(changed) else None,
+                        "n_unique": location_keys(changed).nunique() if len(changed) else 0,
+                    }
+                split = st.session_state["incremental_split"]
+                reused, changed, split_key = split["reused"], split["changed"], split["split_key"]
+                if len(reused):
+                    st.info(f"♻️ Reusing results for {len(reused)} unchanged rows from the previous run; "
+                            f"re-processing {len(changed)} new or changed rows.")
+
+                # --- Geocode & validate as a background job (survives reruns, resumes from checkpoints) ---
+                job_manager = get_job_manager()
+                job_id, job = split["job_id"], None
+                if job_id:
+                    job = job_manager.submit(
+                        job_id, changed,
+                        lambda chunk: geocode_and_validate(chunk, session_engine, batch=batch,
+                                                           reverse_source=reverse_source)[0],
+                    )
+                    n_unique = split["n_unique"]
+                    st.info(f"{len(changed)} rows share {n_unique} unique locations — "
+                            f"deduplication saved {len(changed) - n_unique} geocoding calls.")
+                    st.caption(f"Job `{job_id}`")
+
+                def rerun_from_scratch():
+                    # drops this run's checkpoints and the full-sample job the next run will submit
+                    for stale_id in {job_id, frame_fingerprint(sample, *settings)} - {None}:
+                        job_manager.restart(stale_id)
+                    st.session_state["reuse_previous"] = False
+                    for stale in ("incremental_split", "job_result"):
+                        st.session_state.pop(stale, None)
+
+                if job and job.status in ("pending", "running"):
+                    @st.fragment(run_every=2)
+                    def show_job_progress():
+                        if job.status in ("pending", "running"):
+                            st.progress(job.progress())
+                            st.text(f"Processed {job.completed_batches()}/{job.total_batches} batches "
+                                    f"of up to {job.batch_size} rows...")
+                        else:
+                            st.rerun()
+
+                    show_job_progress()
+                elif job and job.status == "failed":
+                    st.error(f"❌ Geocoding job failed after {job.completed_batches()}/{job.total_batches} "
+                             f"batches: {job.error}")
+                    if st.button("▶️ Resume job"):
+                        job.start()
+                        st.rerun()
+                else:
+                    # stitched once per run; later reruns reuse it instead of re-reading the checkpoints
+                    if st.session_state.get("job_result", (None,))[0] != (split_key, job_id):
+                        st.session_state["job_result"] = ((split_key, job_id),
+                                                          stitch_results(sample, reused, job.result() if job else None))
+                    result_df = st.session_state["job_result"][1]
+                    result_key = split_key
+                    if st.session_state.get("snapshot_saved") != split_key:
+                        save_snapshot(result_df, split["fingerprints"])
+                        st.session_state["snapshot_saved"] = split_key
+                    result_cols = API_COLUMNS + API_PROPERTY_COLUMNS + ["Use_API_Coordinates"]
+                    df.loc[result_df.index, result_cols] = result_df[result_cols]
+                    dq_df = result_df[flag_columns()]
+                    st.success(f"✅ Finished geocoding {n_rows} rows.")
+                    st.button("🔄 Re-run from scratch", on_click=rerun_from_scratch)
+
+                    # --- Show summary counts ---
+                    st.write("### Data Quality Summary")
+                    summary = dq_df.sum().reset_index()
+                    summary.columns = ["Check", "Count"]
+                    st.table(summary)
+
+                    st.write("### Detailed Results")
+                    if st.session_state.get("flag_index", (None,))[0] != split_key:
+                        st.session_state["flag_index"] = (split_key, FlagIndex(result_df))
+                    show_flag_explorer(st.session_state["flag_index"][1], "results")
 
             else:
                 st.warning("⚠️ Please enter your Geoapify API key in the sidebar to run geocoding.")
@@ -264,36 +365,134 @@ if uploaded_file:
     # ---------------- Tab 4 ----------------
     with discrepancy_tab:
         st.subheader("Coordinate Discrepancy Check")
+        c1, c2 = st.columns(2)
+        threshold_km = c1.number_input("Discrepancy threshold (km)", min_value=0.0,
+                                       value=DISCREPANCY_THRESHOLD_KM, step=0.5)
+        distance_method = c2.radio("Distance method", list(DISTANCE_METHODS), horizontal=True)
+        # results are kept for these coordinates and settings, so paging through them survives reruns
+        discrepancy_key = None
+        if "API_Latitude" in df.columns:
+            discrepancy_key = frame_fingerprint(df[["Latitude", "Longitude", "API_Latitude", "API_Longitude"]],
+                                                threshold_km, distance_method)
         if st.button("🔍 Run Coordinate Distance Check"):
-            df["Coord_Diff_km"] = None
-            for i, row in df.iterrows():
-                if pd.notna(row["Latitude"]) and pd.notna(row["Longitude"]) and \
-                   pd.notna(row["API_Latitude"]) and pd.notna(row["API_Longitude"]):
-                    orig_coords = (row["Latitude"], row["Longitude"])
-                    api_coords = (row["API_Latitude"], row["API_Longitude"])
-                    df.at[i, "Coord_Diff_km"] = geodesic(orig_coords, api_coords).km
-                else:
-                    df.at[i, "Coord_Diff_km"] = None
-
-            df["DQ: Large Coordinate Discrepancy"] = df["Coord_Diff_km"].apply(lambda x: x is not None and x > 1)
+            if discrepancy_key is None:
+                st.warning("⚠️ Run geocoding first so API coordinates are available.")
+            else:
+                st.session_state["discrepancy"] = (discrepancy_key, *coordinate_discrepancy(
+                    df, threshold_km, distance_method))
+        if discrepancy_key and st.session_state.get("discrepancy", (None,))[0] == discrepancy_key:
+            _, df["Coord_Diff_km"], df[DISCREPANCY_FLAG] = st.session_state["discrepancy"]
             total_checked = df["Coord_Diff_km"].notna().sum()
-            large_discrepancies = df["DQ: Large Coordinate Discrepancy"].sum()
-            st.info(f"Checked {total_checked} rows. {large_discrepancies} rows have >1km discrepancy.")
+            large_discrepancies = df[DISCREPANCY_FLAG].sum()
+            st.info(f"Checked {total_checked} rows. {large_discrepancies} rows have >{threshold_km:g}km discrepancy.")
             if large_discrepancies > 0:
-                st.write("### Rows with >1km coordinate difference")
+                st.write(f"### Rows with >{threshold_km:g}km coordinate difference")
                 cols_to_show = [
                     "Unique ID", "Address", "City", "Postal Code", "Latitude", "Longitude",
                     "API_Latitude", "API_Longitude", "Geocoding Confidence", "API_Confidence", "Coord_Diff_km"
                 ]
-                st.dataframe(df[df["DQ: Large Coordinate Discrepancy"]][cols_to_show])
+                if st.session_state.get("discrepancy_index", (None,))[0] != discrepancy_key:
+                    st.session_state["discrepancy_index"] = (discrepancy_key, FlagIndex(df))
+                show_flag_explorer(st.session_state["discrepancy_index"][1], "discrepancies",
+                                   default_flags=[DISCREPANCY_FLAG], columns=[c for c in cols_to_show if c in df.columns])
 
 
     # ---------------- Tab 5 ----------------
-    with export_tab:
-        csv = df.to_csv(index=False).encode("utf-8")
-        st.download_button("📥 Download Validated CSV", csv, "validated.csv", "text/csv")
+    with accumulation_tab:
+        st.subheader("Sum Insured Accumulation")
+        c1, c2 = st.columns(2)
+        radius_m = c1.number_input("Radius (m)", min_value=10, value=DEFAULT_RADIUS_M, step=50)
+        top_k = c2.number_input("Number of circles", min_value=1, max_value=100, value=DEFAULT_TOP_K)
+        if "Use_API_Coordinates" in df.columns:
+            st.caption(f"API coordinates are used for {int(df['Use_API_Coordinates'].fillna(False).sum())} rows "
+                       "flagged Use_API_Coordinates; submitted coordinates everywhere else.")
+        if st.button("📍 Find Accumulations"):
+            if "Sum Insured" not in df.columns or "Latitude" not in df.columns:
+                st.error("❌ The uploaded file must contain 'Sum Insured', 'Latitude' and 'Longitude' columns.")
+            else:
+                with METRICS.stage("accumulation"):
+                    per_row, circles = accumulation(df, radius_m, top_k)
+                df[ACCUMULATION_COLUMNS] = per_row
+                st.write(f"### Top {len(circles)} non-overlapping {radius_m:g} m circles by Sum Insured")
+                st.dataframe(circles, hide_index=True)
+                circle_map = go.Figure(go.Scattermapbox(
+                    lat=circles["Latitude"], lon=circles["Longitude"], mode="markers+text",
+                    text=circles["Rank"].astype(str), textposition="top right",
+                    marker={"size": 8 + 30 * circles["Accumulated_Sum_Insured"]
+                            / max(circles["Accumulated_Sum_Insured"].max(), 1)},
+                    hovertext=[f"{s:,.0f} over {p} policies" for s, p in
+                               zip(circles["Accumulated_Sum_Insured"], circles["Accumulated_Policies"])],
+                ))
+                circle_map.update_layout(mapbox={"style": "open-street-map", "zoom": 5,
+                                                 "center": {"lat": circles["Latitude"].mean(),
+                                                            "lon": circles["Longitude"].mean()}},
+                                         margin={"l": 0, "r": 0, "t": 0, "b": 0}, height=450)
+                with METRICS.stage("plotly_render"):
+                    st.plotly_chart(circle_map, use_container_width=True)
+                st.write("### Locations with the highest neighbour totals")
+                st.dataframe(df.loc[per_row["Accumulated_Sum_Insured"].nlargest(100).index])
 
     # ---------------- Tab 6 ----------------
+    with map_tab:
+        st.subheader("Locations & DQ Flags")
+        if "Latitude" not in df.columns or "Longitude" not in df.columns:
+            st.error("❌ The uploaded file must contain 'Latitude' and 'Longitude' columns.")
+        else:
+            map_source = df if result_df is None else result_df
+            binner = get_map_binner((upload_hash, result_key), map_source)
+            c1, c2, c3 = st.columns(3)
+            focus = c1.selectbox("Centre on", ["Germany"] + sorted(binner.city_centres))
+            zoom = c2.slider("Zoom", MIN_ZOOM, MAX_ZOOM, 6 if focus == "Germany" else 11)
+            colour_by = c3.selectbox("Colour by", ["Flagged"] + binner.flags + ["Sum Insured", "Locations"],
+                                     format_func=lambda c: c.removeprefix("DQ: "))
+            centre = GERMANY_CENTRE if focus == "Germany" else binner.city_centres[focus]
+            cells = binner.cells(zoom, view_bounds(centre, zoom))
+            st.caption(f"{int(cells['Locations'].sum()):,} locations in {len(cells):,} cells in view "
+                       f"({binner.missing:,} without coordinates). API coordinates are used where "
+                       "Use_API_Coordinates is set.")
+            is_rate = colour_by not in ("Sum Insured", "Locations")
+            cell_map = go.Figure(go.Scattermapbox(
+                lat=cells["lat"], lon=cells["lon"], mode="markers",
+                marker={"size": 6 + 24 * (cells["Locations"] / max(cells["Locations"].max(), 1)) ** 0.5,
+                        "color": cells[colour_by], "colorscale": "RdYlGn_r" if is_rate else "Viridis",
+                        "cmin": 0 if is_rate else None, "cmax": 1 if is_rate else None, "opacity": 0.75,
+                        "showscale": True, "colorbar": {"title": colour_by.removeprefix("DQ: "),
+                                                        "tickformat": ".0%" if is_rate else ",.0f"}},
+                customdata=cells[["Locations", "Sum Insured", colour_by if is_rate else "Flagged"]].to_numpy(),
+                hovertemplate="Locations: %{customdata[0]:,}<br>Sum Insured: %{customdata[1]:,.0f}<br>"
+                              + ("Flagged" if not is_rate else colour_by.removeprefix("DQ: "))
+                              + ": %{customdata[2]:.0%}<extra></extra>",
+            ))
+            # plotly's mapbox zoom counts 512 px tiles, one level below the 256 px tiles used for binning
+            cell_map.update_layout(mapbox={"style": "open-street-map", "zoom": zoom - 1,
+                                           "center": {"lat": centre[0], "lon": centre[1]}},
+                                   margin={"l": 0, "r": 0, "t": 0, "b": 0}, height=600)
+            with METRICS.stage("plotly_render"):
+                st.plotly_chart(cell_map, use_container_width=True)
+
+    # ---------------- Tab 7 ----------------
+    with export_tab:
+        export_source = df if result_df is None else result_df
+        if result_df is None:
+            st.caption("Geocoding has not finished yet, so the export holds the uploaded data without DQ flags.")
+        c1, c2 = st.columns(2)
+        export_format = c1.radio("Export format", list(EXPORT_FORMATS), horizontal=True)
+        flagged_only = c2.radio("Rows", ["All rows", "Flagged rows only"], horizontal=True,
+                                disabled=result_df is None) == "Flagged rows only"
+        if flagged_only:
+            st.caption(f"{len(flagged_rows(export_source))} of {len(export_source)} rows have at least one DQ flag.")
+
+        def build_export():
+            # runs only when the download button is clicked; unchanged data is served from the export cache
+            with METRICS.stage("export"):
+                with open(export_file(export_source, export_format, flagged_only), "rb") as f:
+                    return f.read()
+
+        extension, mime, _ = EXPORT_FORMATS[export_format]
+        st.download_button(f"📥 Download Validated {export_format}", build_export,
+                           ("validated_flagged" if flagged_only else "validated") + extension, mime)
+
+    # ---------------- Tab 8 ----------------
     with building_tab:
         st.subheader("🏠 Building Characteristics via GenAI Only")
         addr = st.text_input("Enter address (e.g. Schillerstrasse 8)")
@@ -305,3 +504,57 @@ if uploaded_file:
                 st.json(attrs)
             else:
                 st.warning("Provide address + postal code and Claude API key.")
+
+        st.write("### Backfill Missing Attributes for the Portfolio")
+        if "Address" in df.columns:
+            needs_enrichment = rows_needing_enrichment(df)
+            st.caption(f"{int(needs_enrichment.sum())} rows lack at least one of: "
+                       f"{', '.join(ATTRIBUTE_COLUMNS.values())}. Answers are cached per address.")
+            use_stub = st.checkbox("Use offline stub client (made-up values, no API calls)")
+            if st.button("🤖 Backfill building attributes"):
+                if client or use_stub:
+                    enricher = BuildingEnricher(StubClaudeClient() if use_stub else client, cache=geocode_cache)
+                    progress = st.progress(0.0)
+                    try:
+                        enriched_df, n_filled = enricher.enrich_frame(
+                            df, on_progress=lambda done, total: progress.progress(done / total))
+                    except anthropic.APIError as e:
+                        st.error(f"❌ Building attribute enrichment failed: {e}")
+                    else:
+                        # kept across reruns, so clicking the download button does not discard it
+                        st.session_state["enrichment"] = (upload_hash, enriched_df, n_filled, enricher.requests)
+                else:
+                    st.warning("Enter a Claude API key or use the offline stub client.")
+            if st.session_state.get("enrichment", (None,))[0] == upload_hash:
+                _, enriched_df, n_filled, n_requests = st.session_state["enrichment"]
+                st.success(f"✅ Filled {n_filled} rows using {n_requests} requests.")
+                st.dataframe(enriched_df[needs_enrichment])
+                st.download_button("📥 Download Enriched CSV", lambda: enriched_df.to_csv(index=False).encode("utf-8"),
+                                   "enriched.csv", "text/csv")
+        else:
+            st.error("❌ The uploaded file must contain an 'Address' column.")
+
+# -----------------------------
+# Diagnostics
+# -----------------------------
+with st.sidebar.expander("🩺 Diagnostics"):
+    diagnostics = METRICS.snapshot()
+    st.write("**Stage timings (s)**")
+    st.dataframe(pd.DataFrame.from_dict(diagnostics["stages"], orient="index"))
+    st.write("**External call latency (s)**")
+    st.dataframe(pd.DataFrame.from_dict(diagnostics["latency"], orient="index"))
+    st.write("**HTTP status codes**")
+    st.dataframe(pd.DataFrame.from_dict(diagnostics["status_codes"], orient="index").fillna(0).astype(int))
+    st.write("**Cache & retry counters**")
+    st.json(diagnostics["counters"])
+    if api_key:
+        st.write("**Geoapify rate control**")
+        service = get_geocoding_service(api_key, max_workers, rate_limit, DEFAULT_CACHE_PATH, cache_ttl_days)
+        st.json(service.engine.controller.state())
+        st.write("**Shared geocoding queue**")
+        st.json(service.state())
+    st.download_button("📥 Metrics (JSON)", METRICS.to_json(), "dq_metrics.json", "application/json")
+    st.download_button("📥 Metrics (Prometheus)", METRICS.to_prometheus(), "dq_metrics.prom", "text/plain")
+    if st.button("♻️ Reset metrics"):
+        METRICS.reset()
+        st.rerun()
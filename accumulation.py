@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from offline_geo import EARTH_RADIUS_KM, to_xyz
+
+# -----------------------------
+# Config
+# -----------------------------
+DEFAULT_RADIUS_M = 200  # typical fire / terrorism accumulation radius
+DEFAULT_TOP_K = 10
+CHUNK_SITES = 100_000  # sites per neighbour query; bounds memory to about CHUNK_SITES x neighbours per site
+ACCUMULATION_COLUMNS = ["Accumulated_Sum_Insured", "Accumulated_Policies"]
+
+
+def _chord(radius_m):
+    # chord length on the unit sphere for a surface distance
+    return 2 * np.sin(radius_m / 1000 / EARTH_RADIUS_KM / 2)
+
+
+def chosen_coordinates(df):
+    # (lat, lon) arrays the portfolio is assessed on: API coordinates where Use_API_Coordinates is set,
+    # the submitted coordinates everywhere else.
+    lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+    if "Use_API_Coordinates" in df.columns and "API_Latitude" in df.columns:
+        use_api = df["Use_API_Coordinates"].fillna(False).to_numpy(dtype=bool)
+        lat = np.where(use_api, pd.to_numeric(df["API_Latitude"], errors="coerce").to_numpy(dtype=float), lat)
+        lon = np.where(use_api, pd.to_numeric(df["API_Longitude"], errors="coerce").to_numpy(dtype=float), lon)
+    return lat, lon
+
+
+# -----------------------------
+# Accumulation Index
+# -----------------------------
+class AccumulationIndex:
+    # KD-tree over the distinct locations (sites) of a portfolio. Policies at identical coordinates
+    # are summed into one site first; negative or missing Sum Insured counts as 0 and rows without
+    # coordinates are left out. Neighbour sums come from KD-tree pair searches over latitude bands, so
+    # the cost is O(n log n + pairs within the radius) rather than O(n^2).
+    def __init__(self, df):
+        lat, lon = chosen_coordinates(df)
+        sum_insured = pd.to_numeric(df["Sum Insured"], errors="coerce").fillna(0).clip(lower=0).to_numpy(dtype=float)
+        self.valid = np.isfinite(lat) & np.isfinite(lon)
+        sites = pd.DataFrame({"lat": lat[self.valid], "lon": lon[self.valid]})
+        self.site_of_row = sites.groupby(["lat", "lon"], sort=False).ngroup().to_numpy()
+        n_sites = int(self.site_of_row.max()) + 1 if len(self.site_of_row) else 0
+        self.row_of_site = np.flatnonzero(self.valid)[np.unique(self.site_of_row, return_index=True)[1]]
+        self.lat, self.lon = lat[self.row_of_site], lon[self.row_of_site]
+        self.sum_insured = np.bincount(self.site_of_row, weights=sum_insured[self.valid], minlength=n_sites)
+        self.policies = np.bincount(self.site_of_row, minlength=n_sites).astype(float)
+        self.xyz = to_xyz(self.lat, self.lon)
+        self.tree = cKDTree(self.xyz)
+        self.index = df.index
+
+    def site_totals(self, radius_m=DEFAULT_RADIUS_M):
+        # (Sum Insured, policies) within radius_m of every site, the site itself included. Sites are
+        # processed in latitude bands of CHUNK_SITES, each with a halo of radius_m on both sides;
+        # a pair only adds to its endpoints inside the band, so pairs across bands count once per end.
+        chord = _chord(radius_m)
+        halo = np.degrees(radius_m / 1000 / EARTH_RADIUS_KM) * 1.01
+        totals, policies = self.sum_insured.copy(), self.policies.copy()
+        order = np.argsort(self.lat, kind="stable")
+        lat_sorted = self.lat[order]
+        for start in range(0, len(order), CHUNK_SITES):
+            end = min(start + CHUNK_SITES, len(order))
+            lo = np.searchsorted(lat_sorted, lat_sorted[start] - halo, side="left")
+            hi = np.searchsorted(lat_sorted, lat_sorted[end - 1] + halo, side="right")
+            band = order[lo:hi]
+            pairs = cKDTree(self.xyz[band]).query_pairs(chord, output_type="ndarray")
+            for centre, other in ((pairs[:, 0], pairs[:, 1]), (pairs[:, 1], pairs[:, 0])):
+                core = (centre >= start - lo) & (centre < end - lo)
+                centre, other = band[centre[core]], band[other[core]]
+                totals += np.bincount(centre, weights=self.sum_insured[other], minlength=len(totals))
+                policies += np.bincount(centre, weights=self.policies[other], minlength=len(policies))
+        return totals, policies
+
+    def neighbour_totals(self, radius_m=DEFAULT_RADIUS_M, site_totals=None):
+        # ACCUMULATION_COLUMNS for every row of the frame; NaN where the row has no coordinates.
+        totals, policies = site_totals or self.site_totals(radius_m)
+        out = pd.DataFrame(np.nan, index=self.index, columns=ACCUMULATION_COLUMNS)
+        out.loc[self.valid, "Accumulated_Sum_Insured"] = totals[self.site_of_row]
+        out.loc[self.valid, "Accumulated_Policies"] = policies[self.site_of_row]
+        return out.astype({"Accumulated_Policies": "Int64"})
+
+    def top_circles(self, radius_m=DEFAULT_RADIUS_M, k=DEFAULT_TOP_K, site_totals=None):
+        # The k circles of radius_m (centred on a site) holding the most Sum Insured, picked greedily
+        # so no two circles overlap. One row per circle, highest accumulation first.
+        totals, policies = site_totals or self.site_totals(radius_m)
+        taken = np.zeros(len(totals), dtype=bool)
+        circles = []
+        for site in np.argsort(-totals, kind="stable"):
+            if len(circles) == k:
+                break
+            if taken[site]:
+                continue
+            circles.append({"Rank": len(circles) + 1, "Latitude": self.lat[site], "Longitude": self.lon[site],
+                            "Centre Row": self.index[self.row_of_site[site]],
+                            "Accumulated_Sum_Insured": totals[site], "Accumulated_Policies": int(policies[site])})
+            # centres closer than two radii would share locations with this circle
+            taken[self.tree.query_ball_point(self.xyz[site], _chord(2 * radius_m))] = True
+        columns = ["Rank", "Latitude", "Longitude", "Centre Row"] + ACCUMULATION_COLUMNS
+        return pd.DataFrame(circles, columns=columns)
+
+
+def accumulation(df, radius_m=DEFAULT_RADIUS_M, k=DEFAULT_TOP_K):
+    # (per-row ACCUMULATION_COLUMNS, top-k circles) for a portfolio in one index build.
+    index = AccumulationIndex(df)
+    totals = index.site_totals(radius_m)
+    return index.neighbour_totals(radius_m, totals), index.top_circles(radius_m, k, totals)
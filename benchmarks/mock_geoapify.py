@@ -0,0 +1,185 @@
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import CITIES
+
+# -----------------------------
+# Config
+# -----------------------------
+BATCH_PENDING_POLLS = 1  # polls answered with 202 before a batch job's results are returned
+_POSTCODE = re.compile(r"\b(\d{5})\b")
+
+
+# -----------------------------
+# Fake Answers
+# -----------------------------
+def _city_for_postcode(postcode):
+    code = int(postcode)
+    for city in CITIES:
+        if city[1] <= code < city[1] + city[2]:
+            return city
+    return None
+
+
+def _nearest_city(lat, lon):
+    return min(CITIES, key=lambda c: (c[3] - lat) ** 2 + (c[4] - lon) ** 2)
+
+
+def fake_geocode(text):
+    # Deterministic (lat, lon, confidence, city, postcode) for a search text: near the city of its
+    # postcode when that is a known synthetic postcode, else somewhere in central Germany.
+    seed = zlib.crc32(text.encode())
+    match = _POSTCODE.search(text)
+    city = _city_for_postcode(match.group(1)) if match else None
+    lat, lon = (city[3], city[4]) if city else (51.0, 10.0)
+    lat += (seed % 1000 - 500) / 10000
+    lon += (seed // 1000 % 1000 - 500) / 10000
+    confidence = 0.5 + (seed % 51) / 100
+    return lat, lon, confidence, city[0] if city else "", match.group(1) if match else ""
+
+
+def fake_properties(text):
+    # ({street, housenumber, result_type}, rank match_type) as Geoapify reports them for a search text
+    street, _, housenumber = text.split(",")[0].strip().rpartition(" ")
+    if not (street and housenumber[:1].isdigit()):
+        street, housenumber = text.split(",")[0].strip(), None
+    props = {"street": street, "housenumber": housenumber, "result_type": "building" if housenumber else "street"}
+    return props, "full_match" if housenumber else "match_by_street"
+
+
+def fake_reverse(lat, lon):
+    city = _nearest_city(lat, lon)
+    seed = zlib.crc32(f"{lat:.5f},{lon:.5f}".encode())
+    return city[0], f"{city[1] + seed % city[2]:05d}"
+
+
+# -----------------------------
+# Mock Server
+# -----------------------------
+class MockGeoapify:
+    # Local stand-in for the Geoapify search, reverse and batch endpoints. Every request sleeps
+    # latency (+ up to jitter) seconds and is answered 429 with probability rate_429.
+    # Use base_url as the GeocodingEngine/geocode_address base_url.
+    def __init__(self, latency=0.0, jitter=0.0, rate_429=0.0, retry_after=1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.status_counts = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._job_ids = itertools.count()
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                mock._handle(self, "GET")
+
+            def do_POST(self):
+                mock._handle(self, "POST")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mock-geoapify", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _send(self, handler, status, body=None, headers=None):
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        payload = json.dumps(body if body is not None else {}).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _handle(self, handler, method):
+        with self._lock:
+            delay = self.latency + self._random.random() * self.jitter
+            throttled = self._random.random() < self.rate_429
+        time.sleep(delay)
+        if throttled:
+            return self._send(handler, 429, {"message": "Too Many Requests"}, {"Retry-After": str(self.retry_after)})
+        url = urlparse(handler.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path.endswith("/batch/geocode/search") or url.path.endswith("/batch/geocode/reverse"):
+            if method == "POST":
+                body = json.loads(handler.rfile.read(int(handler.headers["Content-Length"])))
+                return self._submit_batch(handler, url.path.endswith("/search"), body)
+            return self._poll_batch(handler, query.get("id"))
+        if url.path.endswith("/geocode/search"):
+            text = query.get("text", "")
+            lat, lon, confidence, city, postcode = fake_geocode(text)
+            props, match_type = fake_properties(text)
+            feature = {"geometry": {"type": "Point", "coordinates": [lon, lat]},
+                       "properties": {"lat": lat, "lon": lon, "city": city, "postcode": postcode, **props,
+                                      "rank": {"confidence": confidence, "match_type": match_type}}}
+            return self._send(handler, 200, {"type": "FeatureCollection", "features": [feature]})
+        if url.path.endswith("/geocode/reverse"):
+            city, postcode = fake_reverse(float(query["lat"]), float(query["lon"]))
+            feature = {"properties": {"city": city, "postcode": postcode}}
+            return self._send(handler, 200, {"type": "FeatureCollection", "features": [feature]})
+        return self._send(handler, 404, {"message": "Not Found"})
+
+    def _submit_batch(self, handler, forward, inputs):
+        if forward:
+            results = []
+            for text in inputs:
+                lat, lon, confidence, city, postcode = fake_geocode(text)
+                props, match_type = fake_properties(text)
+                results.append({"query": {"text": text}, "lat": lat, "lon": lon, "city": city,
+                                "postcode": postcode, **props,
+                                "rank": {"confidence": confidence, "match_type": match_type}})
+        else:
+            results = [{"query": item, "lat": item["lat"], "lon": item["lon"],
+                        **dict(zip(("city", "postcode"), fake_reverse(item["lat"], item["lon"])))}
+                       for item in inputs]
+        job_id = str(next(self._job_ids))
+        with self._lock:
+            self._jobs[job_id] = [results, BATCH_PENDING_POLLS]
+        return self._send(handler, 202, {"id": job_id, "status": "pending"})
+
+    def _poll_batch(self, handler, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job[1] > 0:
+                job[1] -= 1
+                pending = True
+            else:
+                pending = False
+        if job is None:
+            return self._send(handler, 404, {"message": f"Unknown job {job_id}"})
+        if pending:
+            return self._send(handler, 202, {"id": job_id, "status": "pending"})
+        return self._send(handler, 200, job[0])
@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from accumulation import accumulation
+from benchmarks.mock_geoapify import MockGeoapify
+from benchmarks.synthetic import generate_portfolio
+from distance import coordinate_discrepancy
+from dq_rules import evaluate_rules
+from geocoding import GeocodingEngine
+from map_bins import MapBinner
+from pipeline import COMPLETENESS_COLUMNS
+from profiling import profile_frame
+from schema import apply_schema
+
+# -----------------------------
+# Config
+# -----------------------------
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_API_ROWS = 2_000  # API benchmarks hit the mock server; their cost does not depend on portfolio size
+REGRESSION_TOLERANCE = 0.2  # fraction of baseline rows/sec that may be lost before --baseline fails
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+def measure(name, rows, fn, memory=True):
+    # Times fn(), then (tracemalloc slows allocation-heavy code, so in a second run) records the
+    # peak memory fn allocates. Returns one result row.
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = round((tracemalloc.get_traced_memory()[1] - base) / 2 ** 20, 2)
+        tracemalloc.stop()
+    return {"benchmark": name, "rows": rows, "seconds": round(seconds, 4),
+            "rows_per_sec": round(rows / seconds, 1) if seconds else None, "peak_mb": peak}
+
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+def local_benchmarks(n_rows, seed=0, memory=True):
+    df = apply_schema(generate_portfolio(n_rows, seed)[0])
+    rng = np.random.default_rng(seed)
+    df["API_Latitude"] = df["Latitude"] + rng.normal(0, 0.01, n_rows)
+    df["API_Longitude"] = df["Longitude"] + rng.normal(0, 0.01, n_rows)
+    reverse_df = pd.DataFrame({"city": df["City"].astype(object), "postcode": df["Postal Code"].astype(object)})
+    return [
+        measure("evaluate_rules", n_rows, lambda: evaluate_rules(df, reverse_df), memory),
+        measure("coordinate_discrepancy (geodesic)", n_rows,
+                lambda: coordinate_discrepancy(df, method="Geodesic (WGS-84)"), memory),
+        measure("coordinate_discrepancy (haversine)", n_rows,
+                lambda: coordinate_discrepancy(df, method="Haversine (fast)"), memory),
+        measure("accumulation (200 m)", n_rows, lambda: accumulation(df, 200), memory),
+        measure("map cells (zoom 8)", n_rows, lambda: MapBinner(df).cells(8), memory),
+        measure("profile_frame", n_rows, lambda: profile_frame(df, COMPLETENESS_COLUMNS), memory),
+        measure("to_csv", n_rows, lambda: df.to_csv(os.devnull, index=False), memory),
+    ]
+
+
+def api_benchmarks(n_rows, mock, workers, rate_limit, seed=0, memory=True):
+    df = apply_schema(generate_portfolio(n_rows, seed)[0])
+    engine = GeocodingEngine("benchmark", max_workers=workers, rate_limit=rate_limit, base_url=mock.base_url)
+    coords = list(zip(df["Latitude"].fillna(51.0), df["Longitude"].fillna(10.0)))
+    return [
+        measure("geocode_address", n_rows, lambda: engine.geocode_frame(df), memory),
+        measure("reverse_geocode", n_rows, lambda: engine.reverse_many(coords), memory),
+    ]
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    # Names (benchmark @ rows) whose rows/sec dropped more than tolerance below the baseline.
+    before = {(r["benchmark"], r["rows"]): r["rows_per_sec"] for r in baseline["results"]}
+    return [f"{r['benchmark']} @ {r['rows']}: {r['rows_per_sec']} rows/s (baseline {before[key]})"
+            for r in results
+            for key in [(r["benchmark"], r["rows"])]
+            if before.get(key) and r["rows_per_sec"] < before[key] * (1 - tolerance)]
+
+
+# -----------------------------
+# Command Line
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput and peak-memory benchmarks for the DQ pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="portfolio sizes (rows)")
+    parser.add_argument("--api-rows", type=int, default=DEFAULT_API_ROWS, help="rows sent to the mock API (0 = skip)")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock API latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="extra random mock latency (s)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of mock API calls answered 429")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate-limit", type=float, default=0, help="client requests/sec (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak-memory runs")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run; exit 1 on regressions")
+    args = parser.parse_args(argv)
+    memory = not args.no_memory
+
+    results = []
+    for n_rows in args.sizes:
+        results += local_benchmarks(n_rows, args.seed, memory)
+    mock_status = None
+    if args.api_rows:
+        with MockGeoapify(args.latency, args.jitter, args.rate_429, seed=args.seed) as mock:
+            results += api_benchmarks(args.api_rows, mock, args.workers, args.rate_limit, args.seed, memory)
+            mock_status = mock.status_counts
+
+    table = pd.DataFrame(results)
+    print(table.to_string(index=False))
+    if mock_status:
+        print(f"Mock API responses by status: {mock_status}")
+
+    report = {
+        "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+        "settings": {k: v for k, v in vars(args).items() if k not in ("json", "baseline", "no_memory")},
+        "mock_status_counts": mock_status, "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Config
+# -----------------------------
+# (city, first postcode of its range, number of postcodes, lat, lon, relative portfolio weight)
+CITIES = [
+    ("Berlin", 10115, 200, 52.520, 13.405, 36),
+    ("Hamburg", 20095, 150, 53.551, 9.994, 18),
+    ("München", 80331, 150, 48.137, 11.576, 15),
+    ("Köln", 50667, 100, 50.938, 6.960, 11),
+    ("Frankfurt am Main", 60311, 80, 50.110, 8.682, 8),
+    ("Stuttgart", 70173, 60, 48.776, 9.183, 6),
+    ("Düsseldorf", 40210, 60, 51.228, 6.774, 6),
+    ("Leipzig", 4103, 50, 51.340, 12.375, 6),
+    ("Dortmund", 44135, 50, 51.514, 7.466, 6),
+    ("Essen", 45127, 50, 51.456, 7.012, 6),
+    ("Bremen", 28195, 50, 53.079, 8.802, 5),
+    ("Dresden", 1067, 50, 51.050, 13.737, 5),
+    ("Hannover", 30159, 50, 52.376, 9.732, 5),
+    ("Nürnberg", 90402, 50, 49.452, 11.077, 5),
+    ("Freiburg im Breisgau", 79098, 20, 47.999, 7.842, 2),
+    ("Kiel", 24103, 20, 54.323, 10.123, 2),
+    ("Rostock", 18055, 20, 54.092, 12.099, 2),
+    ("Passau", 94032, 10, 48.567, 13.431, 1),
+]
+STREETS = ["Hauptstraße", "Schulstraße", "Gartenstraße", "Bahnhofstr.", "Dorfstraße", "Bergstraße",
+           "Birkenweg", "Lindenstraße", "Kirchstraße", "Waldstraße", "Ringstraße", "Schillerstraße",
+           "Goethestraße", "Am Markt", "Friedrich-Ebert-Str.", "Mühlenweg", "Industriestraße", "Parkallee"]
+LOBS = ["Property", "Commercial Property", "Industrial", "Residential"]
+CONSTRUCTION = ["Masonry", "Reinforced Concrete", "Timber Frame", "Steel"]
+OCCUPANCY = ["Residential", "Office", "Retail", "Industrial", "Warehouse"]
+CITY_SPREAD_DEG = 0.06  # std-dev of locations around the city centre
+DUPLICATE_ID_RATE = 0.02
+ERROR_RATE = 0.05  # share of rows receiving one injected error
+ERROR_KINDS = ["missing_coordinates", "swapped_coordinates", "wrong_postal", "city_typo", "no_house_number",
+               "non_positive_sum_insured", "deductible_above_sum_insured", "future_year_built",
+               "missing_attributes"]
+
+
+# -----------------------------
+# Generator
+# -----------------------------
+def generate_portfolio(n_rows, seed=0, duplicate_id_rate=DUPLICATE_ID_RATE, error_rate=ERROR_RATE):
+    # Reproducible synthetic German portfolio with the dashboard's columns. Returns (df, errors)
+    # where errors names the injected error kind per row ("" for clean rows).
+    rng = np.random.default_rng(seed)
+    weights = np.array([c[5] for c in CITIES], dtype=float)
+    city_idx = rng.choice(len(CITIES), n_rows, p=weights / weights.sum())
+    names = np.array([c[0] for c in CITIES], dtype=object)
+    first_postal, n_postal = (np.array([c[i] for c in CITIES]) for i in (1, 2))
+    lat0, lon0 = (np.array([c[i] for c in CITIES]) for i in (3, 4))
+
+    street = np.array(STREETS, dtype=object)[rng.integers(0, len(STREETS), n_rows)]
+    house = rng.zipf(1.6, n_rows).clip(1, 250)
+    postal = first_postal[city_idx] + rng.integers(0, n_postal[city_idx])
+    df = pd.DataFrame({
+        "Unique ID": [f"LOC-{i:08d}" for i in range(n_rows)],
+        "Address": pd.Series(street) + " " + pd.Series(house).astype(str),
+        "City": names[city_idx],
+        "Postal Code": pd.Series(postal).astype(str).str.zfill(5),
+        "Latitude": lat0[city_idx] + rng.normal(0, CITY_SPREAD_DEG, n_rows),
+        "Longitude": lon0[city_idx] + rng.normal(0, CITY_SPREAD_DEG * 1.5, n_rows),
+        "Geocoding Confidence": rng.beta(12, 1, n_rows).round(3),
+        "Sum Insured": rng.lognormal(13.5, 1.2, n_rows).round(-3),
+        "Mapped LoB": np.array(LOBS, dtype=object)[rng.integers(0, len(LOBS), n_rows)],
+        "Construction Type": np.array(CONSTRUCTION, dtype=object)[rng.integers(0, len(CONSTRUCTION), n_rows)],
+        "Occupancy": np.array(OCCUPANCY, dtype=object)[rng.integers(0, len(OCCUPANCY), n_rows)],
+        "Year Built": rng.integers(1850, 2025, n_rows),
+        "Number of Stories": rng.geometric(0.35, n_rows).clip(1, 40),
+        "Basement": rng.choice(np.array(["Y", "N", "Unknown"], dtype=object), n_rows, p=[0.55, 0.35, 0.10]),
+    })
+    df.insert(df.columns.get_loc("Sum Insured") + 1, "Deductible",
+              (df["Sum Insured"] * rng.uniform(0.001, 0.02, n_rows)).round(-2))
+
+    # duplicate Unique IDs: some rows reuse an earlier row's ID
+    dup = np.flatnonzero(rng.random(n_rows) < duplicate_id_rate)
+    dup = dup[dup > 0]
+    df.loc[dup, "Unique ID"] = df["Unique ID"].to_numpy()[rng.integers(0, dup)]
+
+    errors = pd.Series("", index=df.index, dtype=object)
+    hit = np.flatnonzero(rng.random(n_rows) < error_rate)
+    kinds = np.array(ERROR_KINDS, dtype=object)[rng.integers(0, len(ERROR_KINDS), len(hit))]
+    errors.iloc[hit] = kinds
+    _inject_errors(df, errors, rng)
+    return df, errors
+
+
+def _inject_errors(df, errors, rng):
+    rows = {kind: errors.index[errors == kind] for kind in ERROR_KINDS}
+    df.loc[rows["missing_coordinates"], ["Latitude", "Longitude"]] = np.nan
+    swapped = rows["swapped_coordinates"]
+    df.loc[swapped, ["Latitude", "Longitude"]] = df.loc[swapped, ["Longitude", "Latitude"]].to_numpy()
+    wrong = rows["wrong_postal"]
+    random_postal = pd.Series(rng.integers(1000, 99999, len(wrong)), index=wrong).astype(str).str.zfill(5)
+    df.loc[wrong, "Postal Code"] = random_postal
+    typo = rows["city_typo"]
+    df.loc[typo, "City"] = df.loc[typo, "City"].str[:-1]
+    street_only = rows["no_house_number"]
+    df.loc[street_only, "Address"] = df.loc[street_only, "Address"].str.rsplit(" ", n=1).str[0]
+    df.loc[rows["non_positive_sum_insured"], "Sum Insured"] = 0.0
+    above = rows["deductible_above_sum_insured"]
+    df.loc[above, "Deductible"] = df.loc[above, "Sum Insured"] * 2
+    df.loc[rows["future_year_built"], "Year Built"] = 2099
+    missing = rows["missing_attributes"]
+    for column in ["Construction Type", "Occupancy", "Year Built", "Number of Stories"]:
+        df[column] = df[column].astype(object)
+        df.loc[missing[rng.random(len(missing)) < 0.5], column] = np.nan
+
+
+# -----------------------------
+# Command Line
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic German exposure portfolio.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("-o", "--output", default="synthetic_portfolio.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    args = parser.parse_args(argv)
+    df, errors = generate_portfolio(args.rows, args.seed, error_rate=args.error_rate)
+    df.to_csv(args.output, index=False)
+    print(f"Wrote {len(df)} rows to {args.output} ({int((errors != '').sum())} with injected errors)")
+
+
+if __name__ == "__main__":
+    main()
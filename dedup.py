@@ -0,0 +1,39 @@
+import pandas as pd
+
+from geocoding import address_key
+
+# -----------------------------
+# Config
+# -----------------------------
+# Columns geocoding and the DQ rules read; rows identical on these get identical DQ flags.
+VALIDATION_KEY_COLUMNS = ["Address", "City", "Postal Code", "Latitude", "Longitude", "Geocoding Confidence"]
+
+
+# -----------------------------
+# Location Keys
+# -----------------------------
+def location_keys(df):
+    # Normalized Address/Postal Code/City key per row, used to geocode each location once.
+    postal = df["Postal Code"] if "Postal Code" in df.columns else pd.Series(None, index=df.index)
+    return pd.Series([address_key(a, c, p) for a, c, p in zip(df["Address"], df["City"], postal)],
+                     index=df.index)
+
+
+def row_keys(df, columns):
+    # Vectorized 64-bit hash over the given columns (missing columns are skipped).
+    present = [col for col in columns if col in df.columns]
+    return pd.util.hash_pandas_object(df[present], index=False)
+
+
+# -----------------------------
+# Dedup & Fan-out
+# -----------------------------
+def dedupe_locations(df, keys):
+    # Returns one representative row per key (the first occurrence).
+    return df[~keys.duplicated()]
+
+
+def fan_out(unique_results, keys):
+    # Joins results computed on the representative rows back onto every row sharing their key.
+    by_key = unique_results.set_axis(keys.loc[unique_results.index].values)
+    return by_key.reindex(keys.values).set_axis(keys.index)
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+from distance import haversine_km
+from geocoding import normalize_postal_code
+from metrics import METRICS
+
+# -----------------------------
+# Config
+# -----------------------------
+GERMANY_LAT_RANGE = (47.27, 55.06)
+GERMANY_LON_RANGE = (5.87, 15.04)
+CONFIDENCE_THRESHOLD = 0.8
+# Rows whose coordinates lie this close to their API coordinates take city and postcode from the
+# forward geocode result instead of a reverse lookup.
+FORWARD_MATCH_METRES = 25
+
+# Ordered registry of (flag column, rule function, needs reverse geocoding).
+# Local rules are called as fn(df); reverse rules as fn(df, reverse_df) where reverse_df holds
+# "city"/"postcode" per row ("" when the row was not looked up).
+RULES = []
+
+
+def rule(flag, needs_reverse=False):
+    def register(fn):
+        RULES.append((flag, fn, needs_reverse))
+        return fn
+    return register
+
+
+def flag_columns():
+    return [flag for flag, _, _ in RULES]
+
+
+# -----------------------------
+# Column Helpers
+# -----------------------------
+def _numeric(df, column):
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[column], errors="coerce")
+
+
+def _strings(df, column):
+    # String values, NaN where the value is missing or not a string.
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    values = df[column]
+    if pd.api.types.is_string_dtype(values) and values.dtype != object:
+        return values
+    is_str = values.map(lambda v: isinstance(v, str)).astype(bool)
+    if not is_str.any():
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    return values.where(is_str)
+
+
+def coordinates_missing(df):
+    return _numeric(df, "Latitude").isna() | _numeric(df, "Longitude").isna()
+
+
+def coordinates_in_bounds(df):
+    lat, lon = _numeric(df, "Latitude"), _numeric(df, "Longitude")
+    return lat.between(*GERMANY_LAT_RANGE) & lon.between(*GERMANY_LON_RANGE)
+
+
+# -----------------------------
+# Rules
+# -----------------------------
+@rule("DQ: Missing Coordinates")
+def missing_coordinates(df):
+    return coordinates_missing(df)
+
+
+@rule("DQ: Invalid Coordinates")
+def invalid_coordinates(df):
+    return ~coordinates_missing(df) & ~coordinates_in_bounds(df)
+
+
+@rule("DQ: Low Confidence")
+def low_confidence(df):
+    return _numeric(df, "Geocoding Confidence") < CONFIDENCE_THRESHOLD
+
+
+@rule("DQ: Reverse Geocode Mismatch", needs_reverse=True)
+def reverse_city_mismatch(df, reverse_df):
+    rev_city = reverse_df["city"].fillna("").astype(str)
+    city = _strings(df, "City").str.lower()
+    return (rev_city != "") & city.notna() & (rev_city.str.lower() != city)
+
+
+@rule("DQ: City/Postal Mismatch", needs_reverse=True)
+def reverse_postal_mismatch(df, reverse_df):
+    rev_postal = reverse_df["postcode"].map(normalize_postal_code)
+    postal = df["Postal Code"].map(normalize_postal_code) if "Postal Code" in df.columns else ""
+    return (rev_postal != "") & (postal != "") & (rev_postal != postal)
+
+
+@rule("DQ: Incomplete Address")
+def incomplete_address(df):
+    # fewer than two whitespace-separated words
+    has_two_words = _strings(df, "Address").str.strip().str.contains(r"\s", regex=True)
+    return ~has_two_words.fillna(False).astype(bool)
+
+
+# -----------------------------
+# Rule Engine
+# -----------------------------
+def forward_answers(df):
+    # Rows whose coordinates are their API coordinates (within FORWARD_MATCH_METRES) and whose
+    # forward geocode returned a city or postcode; the feature at those coordinates is already known.
+    if "API_City" not in df.columns or "API_Postcode" not in df.columns:
+        return pd.Series(False, index=df.index)
+    metres = 1000 * haversine_km(_numeric(df, "Latitude"), _numeric(df, "Longitude"),
+                                 _numeric(df, "API_Latitude"), _numeric(df, "API_Longitude"))
+    has_answer = df["API_City"].notna() | df["API_Postcode"].notna()
+    return pd.Series(metres <= FORWARD_MATCH_METRES, index=df.index) & has_answer
+
+
+def reverse_lookup_frame(df, reverse_batch_fn):
+    # Aligns a (city, postcode) answer to every in-bounds row of df: from the forward geocode
+    # result where forward_answers applies, otherwise from one batched reverse lookup of the
+    # remaining distinct coordinates. reverse_batch_fn(coords) -> {(lat, lon): (city, postcode)}.
+    lat, lon = _numeric(df, "Latitude"), _numeric(df, "Longitude")
+    in_bounds = coordinates_in_bounds(df)
+    known = in_bounds & forward_answers(df)
+    lookup = in_bounds & ~known
+    reverse_df = pd.DataFrame("", index=df.index, columns=["city", "postcode"], dtype=object)
+    if known.any():
+        reverse_df.loc[known, "city"] = df.loc[known, "API_City"].astype(object).fillna("").to_numpy()
+        reverse_df.loc[known, "postcode"] = df.loc[known, "API_Postcode"].astype(object).fillna("").to_numpy()
+        METRICS.incr("reverse_answered_by_forward", int(known.sum()))
+    results = reverse_batch_fn(zip(lat[lookup], lon[lookup]))
+    answers = [results.get(coord, ("", "")) for coord in zip(lat[lookup], lon[lookup])]
+    if answers:
+        reverse_df.loc[lookup, ["city", "postcode"]] = np.array(answers, dtype=object)
+    return reverse_df
+
+
+def evaluate_rules(df, reverse_df=None):
+    # Evaluates every registered rule column-wise. Reverse rules only apply to in-bounds rows and
+    # are left False when no reverse_df is supplied.
+    in_bounds = coordinates_in_bounds(df)
+    flags = {}
+    for flag, fn, needs_reverse in RULES:
+        if needs_reverse:
+            result = fn(df, reverse_df) & in_bounds if reverse_df is not None else False
+        else:
+            result = fn(df)
+        flags[flag] = pd.Series(result, index=df.index).fillna(False).astype(bool)
+    return pd.DataFrame(flags, index=df.index)
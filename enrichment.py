@@ -0,0 +1,210 @@
+import json
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
+
+import pandas as pd
+
+from geocoding import RateLimiter, address_key
+from metrics import METRICS
+from schema import apply_schema
+
+# -----------------------------
+# Config
+# -----------------------------
+CLAUDE_MODEL = "claude-opus-4-1-20250805"
+# JSON key in the model's answer -> portfolio column it backfills
+ATTRIBUTE_COLUMNS = {
+    "ConstructionType": "Construction Type",
+    "Occupancy": "Occupancy",
+    "Stories": "Number of Stories",
+    "YearBuilt": "Year Built",
+}
+ENRICH_BATCH_SIZE = 20  # addresses per request
+DEFAULT_ENRICH_WORKERS = 4
+DEFAULT_ENRICH_RATE_LIMIT = 1  # requests per second
+MAX_ITEM_RETRIES = 2  # extra attempts for items whose answer was missing or malformed
+TOKENS_PER_ITEM = 60
+NUMERIC_ATTRIBUTES = ["Stories", "YearBuilt"]
+
+
+# -----------------------------
+# Prompt & Parsing
+# -----------------------------
+def _text(value):
+    return None if value is None or pd.isna(value) else str(value)
+
+
+def build_batch_prompt(items):
+    # items: [(item_id, address, postal_code, city), ...]
+    rows = [{"id": item_id, "address": _text(address), "postal": _text(postal), "city": _text(city)}
+            for item_id, address, postal, city in items]
+    return f"""
+    You are an insurance data assistant.
+    For each address in Germany below, return estimated building characteristics.
+
+    Input (JSON array):
+    {json.dumps(rows, ensure_ascii=False)}
+
+    Output strictly a JSON array only, one object per input, in any order.
+    Keys: id (copied from the input), {", ".join(ATTRIBUTE_COLUMNS)}.
+    """
+
+
+def _strip_code_fences(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text.replace("json\n", "", 1)
+    return text
+
+
+def parse_batch_response(text):
+    # Returns {item_id: attributes} for the well-formed items of the answer. Anything else (bad
+    # JSON, missing keys, unknown ids) is left out so the caller can retry those items.
+    text = _strip_code_fences(text)
+    try:
+        answer = json.loads(text)
+    except json.JSONDecodeError:
+        match = re.search(r"\[.*\]", text, re.DOTALL)
+        try:
+            answer = json.loads(match.group(0)) if match else None
+        except json.JSONDecodeError:
+            answer = None
+    if not isinstance(answer, list):
+        return {}
+    parsed = {}
+    for item in answer:
+        if isinstance(item, dict) and "id" in item and all(key in item for key in ATTRIBUTE_COLUMNS):
+            parsed[str(item["id"])] = {key: item[key] for key in ATTRIBUTE_COLUMNS}
+    return parsed
+
+
+# -----------------------------
+# Offline Stub
+# -----------------------------
+class StubClaudeClient:
+    # Stands in for anthropic.Anthropic: answers batch prompts with deterministic made-up
+    # attributes, optionally after a delay and with the first answer for every n-th item broken.
+    def __init__(self, latency=0.0, malformed_every=0):
+        self.latency = latency
+        self.malformed_every = malformed_every
+        self.requests = 0
+        self._broken = set()
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, model, max_tokens, messages, temperature=0):
+        self.requests += 1
+        time.sleep(self.latency)
+        rows = json.loads(re.search(r"^\s*(\[.*\])\s*$", messages[0]["content"], re.MULTILINE).group(1))
+        answer = []
+        for row in rows:
+            seed = zlib.crc32(f"{row['address']}|{row['postal']}".encode())
+            if self.malformed_every and seed % self.malformed_every == 0 and seed not in self._broken:
+                self._broken.add(seed)
+                answer.append({"id": row["id"], "ConstructionType": "Masonry"})
+                continue
+            answer.append({
+                "id": row["id"],
+                "ConstructionType": ["Masonry", "Reinforced Concrete", "Timber Frame", "Steel"][seed % 4],
+                "Occupancy": ["Residential", "Office", "Retail", "Industrial"][seed // 4 % 4],
+                "Stories": 1 + seed % 8,
+                "YearBuilt": 1900 + seed % 120,
+            })
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(answer))])
+
+
+# -----------------------------
+# Bulk Enrichment
+# -----------------------------
+def rows_needing_enrichment(df):
+    # True for rows missing at least one building attribute (absent columns count as missing).
+    missing = pd.Series(False, index=df.index)
+    for column in ATTRIBUTE_COLUMNS.values():
+        missing |= df[column].isna() if column in df.columns else True
+    return missing
+
+
+class BuildingEnricher:
+    # Packs up to batch_size addresses into each Claude request, runs requests on a thread pool
+    # under a shared rate limit and caches answers per normalized address (GeocodeCache).
+    def __init__(self, client, batch_size=ENRICH_BATCH_SIZE, max_workers=DEFAULT_ENRICH_WORKERS,
+                 rate_limit=DEFAULT_ENRICH_RATE_LIMIT, cache=None, model=CLAUDE_MODEL,
+                 max_retries=MAX_ITEM_RETRIES):
+        self.client = client
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate_limit)
+        self.cache = cache
+        self.model = model
+        self.max_retries = max_retries
+        self.requests = 0
+        self._lock = threading.Lock()  # requests is counted from the pool's threads
+
+    def _request(self, items):
+        self.limiter.wait()
+        start = time.perf_counter()
+        resp = self.client.messages.create(
+            model=self.model,
+            max_tokens=TOKENS_PER_ITEM * len(items) + 100,
+            temperature=0,
+            messages=[{"role": "user", "content": build_batch_prompt(items)}],
+        )
+        METRICS.observe("claude_messages", time.perf_counter() - start)
+        with self._lock:
+            self.requests += 1
+        return parse_batch_response(resp.content[0].text)
+
+    def lookup_many(self, addresses, on_progress=None):
+        # addresses: {address_key: (address, postal_code, city)}. Returns {address_key: attributes};
+        # keys still unanswered after max_retries rounds are left out.
+        found = self.cache.get_buildings_many(addresses) if self.cache else {}
+        pending = [key for key in addresses if key not in found]
+        total = len(pending)
+        for attempt in range(1 + self.max_retries):
+            if not pending:
+                break
+            if attempt:
+                METRICS.incr("claude_item_retries", len(pending))
+            ids = {str(n): key for n, key in enumerate(pending)}
+            items = [(item_id, *addresses[key]) for item_id, key in ids.items()]
+            batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+            answered = {}
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(batches)))) as pool:
+                futures = [pool.submit(self._request, batch) for batch in batches]
+                for future in as_completed(futures):
+                    answered.update((ids[item_id], attrs) for item_id, attrs in future.result().items()
+                                    if item_id in ids)
+                    if on_progress:
+                        on_progress(total - len(pending) + len(answered), total)
+            if self.cache:
+                self.cache.put_buildings_many(list(answered.items()))
+            found.update(answered)
+            pending = [key for key in pending if key not in answered]
+        return found
+
+    def enrich_frame(self, df, on_progress=None):
+        # Backfills the empty building attribute cells of df; cells that are already filled are
+        # kept. Returns (enriched copy of df, number of rows that received a value).
+        needs = rows_needing_enrichment(df)
+        todo = df[needs]
+        postal = todo["Postal Code"] if "Postal Code" in todo.columns else pd.Series(None, index=todo.index)
+        city = todo["City"] if "City" in todo.columns else pd.Series(None, index=todo.index)
+        keys = pd.Series([address_key(a, c, p) for a, c, p in zip(todo["Address"], city, postal)], index=todo.index)
+        addresses = {key: (address, p, c) for key, address, p, c in zip(keys, todo["Address"], postal, city)}
+        answers = self.lookup_many(addresses, on_progress)
+
+        out = df.copy()
+        filled = pd.Series(False, index=df.index)
+        for attr, column in ATTRIBUTE_COLUMNS.items():
+            estimates = keys.map(lambda key: answers.get(key, {}).get(attr))
+            if attr in NUMERIC_ATTRIBUTES:
+                estimates = pd.to_numeric(estimates, errors="coerce")
+            current = out[column].astype(object) if column in out.columns else pd.Series(None, index=out.index)
+            gaps = current.isna() & estimates.reindex(out.index).notna()
+            out[column] = current.where(~gaps, estimates.reindex(out.index))
+            filled |= gaps
+        return apply_schema(out), int(filled.sum())
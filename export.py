@@ -0,0 +1,96 @@
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from jobs import frame_fingerprint
+
+# -----------------------------
+# Config
+# -----------------------------
+EXPORT_DIR = os.environ.get("DQ_EXPORT_DIR", ".dq_exports")
+EXPORT_CHUNKSIZE = 100_000  # rows serialized at a time
+MAX_CACHED_EXPORTS = 8  # oldest files beyond this are removed from EXPORT_DIR
+# label -> (file extension, MIME type, stream compression)
+EXPORT_FORMATS = {
+    "CSV": (".csv", "text/csv", None),
+    "CSV (gzip)": (".csv.gz", "application/gzip", "gzip"),
+    "CSV (zstd)": (".csv.zst", "application/zstd", "zstd"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet", None),
+}
+PARQUET_COMPRESSION = "zstd"
+
+
+def flagged_rows(df):
+    # Rows with at least one DQ flag raised.
+    flags = [c for c in df.columns if c.startswith("DQ: ")]
+    return df[df[flags].any(axis=1)] if flags else df.iloc[:0]
+
+
+# -----------------------------
+# Chunked Writers
+# -----------------------------
+def _write_csv(df, path, compression, chunksize):
+    sink = pa.OSFile(path, "wb")
+    stream = pa.CompressedOutputStream(sink, compression) if compression else sink
+    with stream:
+        for start in range(0, max(len(df), 1), chunksize):
+            text = df.iloc[start:start + chunksize].to_csv(index=False, header=start == 0)
+            stream.write(text.encode("utf-8"))
+
+
+def _write_parquet(df, path, chunksize):
+    # one schema from the whole frame, so a chunk where a column is all-null or has no nulls yet
+    # does not infer a different type
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+        for start in range(0, max(len(df), 1), chunksize):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunksize], schema=schema,
+                                                    preserve_index=False))
+
+
+def write_export(df, path, export_format, chunksize=EXPORT_CHUNKSIZE):
+    # Serializes df chunk by chunk straight into the (compressed) file, so only one chunk's text is
+    # ever held in memory.
+    extension, _, compression = EXPORT_FORMATS[export_format]
+    if extension == ".parquet":
+        _write_parquet(df, path, chunksize)
+    else:
+        _write_csv(df, path, compression, chunksize)
+
+
+# -----------------------------
+# Export Cache
+# -----------------------------
+def export_file(df, export_format, flagged_only=False, export_dir=EXPORT_DIR, chunksize=EXPORT_CHUNKSIZE):
+    # Path of the export of df in export_format, keyed on the frame's content hash: the same data
+    # is only serialized once, however often it is downloaded.
+    if flagged_only:
+        df = flagged_rows(df)
+    os.makedirs(export_dir, exist_ok=True)
+    extension = EXPORT_FORMATS[export_format][0]
+    path = os.path.join(export_dir, frame_fingerprint(df, export_format) + extension)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    # a temp file of its own, so concurrent sessions exporting the same data do not share one
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(path) + ".", dir=export_dir)
+    os.close(fd)
+    try:
+        write_export(df, tmp_path, export_format, chunksize)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _prune(export_dir)
+    return path
+
+
+def _prune(export_dir, keep=MAX_CACHED_EXPORTS):
+    paths = [os.path.join(export_dir, name) for name in os.listdir(export_dir) if not name.endswith(".tmp")]
+    for path in sorted(paths, key=os.path.getmtime, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
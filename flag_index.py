@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from dq_rules import flag_columns
+
+# -----------------------------
+# Config
+# -----------------------------
+FLAG_BITMASK_COLUMN = "DQ_Flags"
+DISCREPANCY_FLAG = "DQ: Large Coordinate Discrepancy"  # set by distance.coordinate_discrepancy
+FILTER_COLUMNS = ["City", "Mapped LoB"]
+DEFAULT_PAGE_SIZE = 100
+
+
+def flag_bits():
+    # Stable bit per flag: the rule flags in registry order, then the distance check.
+    return {flag: 1 << bit for bit, flag in enumerate(flag_columns() + [DISCREPANCY_FLAG])}
+
+
+def flag_bitmask(df):
+    # All DQ flags of a row packed into one uint16; flags missing from df count as not raised.
+    mask = np.zeros(len(df), dtype=np.uint16)
+    for flag, bit in flag_bits().items():
+        if flag in df.columns:
+            mask |= np.where(df[flag].fillna(False).to_numpy(dtype=bool), bit, 0).astype(np.uint16)
+    return pd.Series(mask, index=df.index, name=FLAG_BITMASK_COLUMN)
+
+
+def _sort_keys(values):
+    # Float keys that order any column (numbers, text, categories); missing values sort last.
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        keys = np.argsort(np.argsort(values.cat.categories.astype(str), kind="stable"))[codes].astype(float)
+        keys[codes < 0] = np.nan
+        return keys
+    numeric = pd.to_numeric(values, errors="coerce")
+    if numeric.notna().sum() == values.notna().sum():
+        return numeric.to_numpy(dtype=float)
+    codes, _ = pd.factorize(values.astype("string"), sort=True)
+    return np.where(codes < 0, np.nan, codes).astype(float)
+
+
+# -----------------------------
+# Flag Index
+# -----------------------------
+class FlagIndex:
+    # Built once per result frame: the flag bitmask, the row positions raising each flag and
+    # integer codes for the FILTER_COLUMNS. select() narrows to matching row positions and page()
+    # sorts and slices them, so only one page of rows is ever materialized.
+    def __init__(self, df):
+        self.df = df
+        self.bitmask = flag_bitmask(df).to_numpy()
+        self.flags = [flag for flag in flag_bits() if flag in df.columns]
+        self.rows_by_flag = {flag: np.flatnonzero(self.bitmask & bit) for flag, bit in flag_bits().items()
+                             if flag in self.flags}
+        self.filter_codes, self.filter_values = {}, {}
+        for column in FILTER_COLUMNS:
+            if column in df.columns:
+                codes, values = pd.factorize(df[column].astype("string"), sort=True)
+                self.filter_codes[column], self.filter_values[column] = codes, list(values)
+        self._sort_keys = {}
+
+    def counts(self):
+        return {flag: len(rows) for flag, rows in self.rows_by_flag.items()}
+
+    def select(self, flags=(), require_all=False, filters=None):
+        # Row positions raising any (or, with require_all, every) flag in flags and whose
+        # FILTER_COLUMNS value is one of filters[column]. No flags means all rows.
+        bits = 0
+        for flag in flags:
+            bits |= flag_bits()[flag]
+        if not flags:
+            rows = np.arange(len(self.df))
+        elif require_all:
+            # start from the rarest flag's rows and check the rest in the bitmask
+            rarest = min(flags, key=lambda flag: len(self.rows_by_flag.get(flag, ())))
+            rows = self.rows_by_flag.get(rarest, np.array([], dtype=int))
+            rows = rows[(self.bitmask[rows] & bits) == bits]
+        else:
+            rows = np.flatnonzero(self.bitmask & bits)
+        for column, values in (filters or {}).items():
+            if values and column in self.filter_codes:
+                wanted = [self.filter_values[column].index(v) for v in values if v in self.filter_values[column]]
+                rows = rows[np.isin(self.filter_codes[column][rows], wanted)]
+        return rows
+
+    def page(self, rows, page=0, page_size=DEFAULT_PAGE_SIZE, sort_by=None, ascending=True, columns=None):
+        # Rows page*page_size .. (page+1)*page_size of the selection, sorted by sort_by.
+        if sort_by:
+            if sort_by not in self._sort_keys:
+                self._sort_keys[sort_by] = _sort_keys(self.df[sort_by])
+            keys = self._sort_keys[sort_by][rows]
+            order = np.argsort(keys if ascending else -keys, kind="stable")  # NaN stays last either way
+            rows = rows[order]
+        view = self.df.iloc[rows[page * page_size:(page + 1) * page_size]]
+        return view[columns] if columns else view
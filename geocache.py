@@ -0,0 +1,216 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from geocoding import API_PROPERTY_COLUMNS, GeocodeResult, address_key
+from metrics import METRICS
+
+# -----------------------------
+# Config
+# -----------------------------
+DEFAULT_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", "geocode_cache.sqlite")
+DEFAULT_TTL_DAYS = 180
+DEFAULT_MAX_ENTRIES = 2_000_000  # per table
+COORD_PRECISION = 5  # decimal places for reverse lookup keys (~1 m)
+EVICT_EVERY = 5_000  # writes between eviction sweeps
+# Cache hits only note their key; last_used is written for all of them at once with the next put,
+# after TOUCH_FLUSH_EVERY hits or TOUCH_FLUSH_SECONDS, so reads do not queue on SQLite's write lock.
+TOUCH_FLUSH_EVERY = 5_000
+TOUCH_FLUSH_SECONDS = 60
+SQLITE_MAX_VARS = 900
+TABLES = ("forward", "reverse", "buildings")
+
+
+def reverse_key(lat, lon, precision=COORD_PRECISION):
+    return f"{float(lat):.{precision}f},{float(lon):.{precision}f}"
+
+
+# -----------------------------
+# Persistent Cache
+# -----------------------------
+class GeocodeCache:
+    # SQLite-backed store for forward (normalized address -> lat, lon, confidence, feature properties), reverse
+    # (rounded coordinates -> city, postcode) and building (normalized address -> AI-estimated
+    # attributes) lookups. WAL mode lets several processes share one file.
+    # Entries older than the TTL are ignored and purged; beyond max_entries the least recently used go.
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_days=DEFAULT_TTL_DAYS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._touched = {table: set() for table in TABLES}  # hit keys whose last_used is not written yet
+        self._n_touched = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS forward (
+                key TEXT PRIMARY KEY, lat REAL, lon REAL, confidence REAL, properties TEXT,
+                created_at REAL, last_used REAL)""")
+            # cache files written before feature properties were kept
+            if "properties" not in [row[1] for row in self._conn.execute("PRAGMA table_info(forward)")]:
+                self._conn.execute("ALTER TABLE forward ADD COLUMN properties TEXT")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS reverse (
+                key TEXT PRIMARY KEY, city TEXT, postcode TEXT,
+                created_at REAL, last_used REAL)""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS buildings (
+                key TEXT PRIMARY KEY, attributes TEXT,
+                created_at REAL, last_used REAL)""")
+            for table in TABLES:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table}(last_used)")
+
+    # --- generic helpers ---
+    def _get_many(self, table, columns, keys):
+        # Read-only unless a flush of the pending last_used updates is due.
+        keys = list(dict.fromkeys(keys))
+        min_created = time.time() - self.ttl if self.ttl else 0
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), SQLITE_MAX_VARS):
+                chunk = keys[i:i + SQLITE_MAX_VARS]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, {columns} FROM {table} WHERE key IN ({marks}) AND created_at >= ?",
+                    (*chunk, min_created)).fetchall()
+                found.update((row[0], tuple(row[1:])) for row in rows)
+            self._touched[table].update(found)
+            self._n_touched += len(found)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            if self._n_touched >= TOUCH_FLUSH_EVERY or time.monotonic() - self._flushed_at >= TOUCH_FLUSH_SECONDS:
+                with self._conn:
+                    self._flush_touched()
+        METRICS.incr(f"cache_{table}_hits", len(found))
+        METRICS.incr(f"cache_{table}_misses", len(keys) - len(found))
+        return found
+
+    def _flush_touched(self):
+        # Writes last_used for the hits since the last flush. Called with _lock held, in a transaction.
+        now = time.time()
+        for table, keys in self._touched.items():
+            if keys:
+                self._conn.executemany(f"UPDATE {table} SET last_used = ? WHERE key = ?", [(now, key) for key in keys])
+                keys.clear()
+        self._n_touched = 0
+        self._flushed_at = time.monotonic()
+
+    def _put_many(self, table, columns, items):
+        if not items:
+            return
+        now = time.time()
+        marks = ",".join("?" * (len(columns.split(",")) + 3))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (key, {columns}, created_at, last_used) VALUES ({marks})",
+                [(key, *values, now, now) for key, values in items])
+            self._flush_touched()
+            self._writes += len(items)
+        if self._writes >= EVICT_EVERY:
+            self.evict()
+
+    # --- forward lookups ---
+    def get_forward_many(self, keys):
+        # Returns {address_key: GeocodeResult}; entries cached without properties have them as None.
+        found = self._get_many("forward", "lat, lon, confidence, properties", keys)
+        return {key: GeocodeResult(lat, lon, confidence, *(json.loads(properties) if properties else ()))
+                for key, (lat, lon, confidence, properties) in found.items()}
+
+    def get_forward(self, key):
+        return self.get_forward_many([key]).get(key)
+
+    def put_forward_many(self, items):
+        # items: [(address_key, GeocodeResult or (lat, lon, confidence)), ...]
+        self._put_many("forward", "lat, lon, confidence, properties",
+                       [(key, (*result[:3], json.dumps(list(result[3:])) if len(result) > 3 else None))
+                        for key, result in items])
+
+    def put_forward(self, key, result):
+        self.put_forward_many([(key, result)])
+
+    # --- reverse lookups ---
+    def get_reverse_many(self, coords):
+        # Returns {(lat, lon): (city, postcode)} keyed on the caller's unrounded coordinates.
+        keyed = {}
+        for lat, lon in coords:
+            keyed.setdefault(reverse_key(lat, lon), []).append((lat, lon))
+        found = self._get_many("reverse", "city, postcode", keyed)
+        return {coord: found[key] for key, coords_ in keyed.items() if key in found for coord in coords_}
+
+    def get_reverse(self, lat, lon):
+        return self.get_reverse_many([(lat, lon)]).get((lat, lon))
+
+    def put_reverse_many(self, items):
+        # items: [((lat, lon), (city, postcode)), ...]
+        self._put_many("reverse", "city, postcode",
+                       [(reverse_key(lat, lon), result) for (lat, lon), result in items])
+
+    def put_reverse(self, lat, lon, result):
+        self.put_reverse_many([((lat, lon), result)])
+
+    # --- building attributes ---
+    def get_buildings_many(self, keys):
+        # Returns {address_key: attributes dict}.
+        return {key: json.loads(row[0]) for key, row in self._get_many("buildings", "attributes", keys).items()}
+
+    def put_buildings_many(self, items):
+        # items: [(address_key, attributes dict), ...]
+        self._put_many("buildings", "attributes", [(key, (json.dumps(attrs),)) for key, attrs in items])
+
+    # --- maintenance ---
+    def evict(self):
+        with self._lock, self._conn:
+            self._flush_touched()
+            for table in TABLES:
+                if self.ttl:
+                    self._conn.execute(f"DELETE FROM {table} WHERE created_at < ?", (time.time() - self.ttl,))
+                excess = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE key IN "
+                        f"(SELECT key FROM {table} ORDER BY last_used LIMIT ?)", (excess,))
+            self._writes = 0
+
+    def clear(self):
+        with self._lock, self._conn:
+            for table in TABLES:
+                self._conn.execute(f"DELETE FROM {table}")
+                self._touched[table].clear()
+            self._n_touched = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            counts = {f"{table}_entries": self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in TABLES}
+            return {**counts, "hits": self.hits, "misses": self.misses}
+
+    def warm_from_frame(self, df):
+        # Seeds forward entries from a previous validated.csv export (rows with API_* results).
+        required = ["Address", "City", "API_Latitude", "API_Longitude"]
+        if any(col not in df.columns for col in required):
+            return 0
+        done = df[df["API_Latitude"].notna() & df["API_Longitude"].notna()]
+        postal = done["Postal Code"] if "Postal Code" in done.columns else pd.Series(None, index=done.index)
+        confidence = done["API_Confidence"] if "API_Confidence" in done.columns else pd.Series(None, index=done.index)
+        # feature properties only when the export has all of them
+        properties = (done[API_PROPERTY_COLUMNS].astype(object).where(done[API_PROPERTY_COLUMNS].notna(), None)
+                      .itertuples(index=False, name=None)
+                      if all(col in done.columns for col in API_PROPERTY_COLUMNS) else [()] * len(done))
+        items = [
+            (address_key(address, city, postal_code),
+             GeocodeResult(float(lat), float(lon), None if pd.isna(conf) else float(conf),
+                           *(None if value is None else str(value) for value in props)))
+            for address, city, postal_code, lat, lon, conf, props in zip(
+                done["Address"], done["City"], postal, done["API_Latitude"], done["API_Longitude"], confidence,
+                properties)
+        ]
+        self.put_forward_many(items)
+        return len(items)
@@ -0,0 +1,333 @@
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+from ratecontrol import RequestController
+
+# -----------------------------
+# Config
+# -----------------------------
+GEOAPIFY_BASE_URL = "https://api.geoapify.com/v1"
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RATE_LIMIT = 5  # requests per second (Geoapify free plan)
+API_COLUMNS = ["API_Latitude", "API_Longitude", "API_Confidence"]
+# Properties of the matched Geoapify feature kept alongside the coordinates; the mismatch checks
+# use them instead of a reverse lookup where the row's coordinates are the API coordinates.
+GEOCODE_PROPERTIES = ["city", "postcode", "street", "housenumber", "result_type", "match_type"]
+API_PROPERTY_COLUMNS = ["API_City", "API_Postcode", "API_Street", "API_Housenumber", "API_Result_Type",
+                        "API_Match_Type"]
+BATCH_SIZE = 1000  # Geoapify accepts up to 1000 inputs per batch job
+BATCH_POLL_INTERVAL = 2  # seconds between job status polls
+BATCH_TIMEOUT = 900  # seconds before a job is given up on
+
+
+# (lat, lon, confidence, *GEOCODE_PROPERTIES) of one forward geocode; properties default to None
+GeocodeResult = namedtuple("GeocodeResult", ["lat", "lon", "confidence"] + GEOCODE_PROPERTIES,
+                           defaults=[None] * len(GEOCODE_PROPERTIES))
+NO_RESULT = GeocodeResult(None, None, None)
+
+
+# -----------------------------
+# HTTP Plumbing
+# -----------------------------
+def make_session(pool_size=DEFAULT_MAX_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RateLimiter:
+    # Spaces request start times evenly so at most `rate` calls per second leave the process,
+    # no matter how many worker threads share the limiter. rate <= 0 disables limiting.
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# -----------------------------
+# Address Normalization
+# -----------------------------
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_STREET_ABBREVIATION = re.compile(r"str\b\.?")  # "Hauptstr." / "Haupt Str" -> "...strasse"
+
+
+def normalize_text(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    text = str(value).lower().translate(_UMLAUTS)
+    text = _STREET_ABBREVIATION.sub("strasse", text)
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(text.split())
+
+
+def normalize_postal_code(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    # German postcodes are 5 digits; CSV parsing drops the leading zero (01067 -> 1067)
+    return text.zfill(5) if text.isdigit() else normalize_text(text)
+
+
+def address_key(address, city, postal_code=None):
+    return "|".join([normalize_text(address), normalize_postal_code(postal_code), normalize_text(city)])
+
+
+# -----------------------------
+# Geocoding Functions
+# -----------------------------
+def _send(http, method, url, call, controller=None, **kwargs):
+    # One Geoapify request, timed per attempt; through the controller (rate control, retries,
+    # circuit breaker) when one is given.
+    def attempt():
+        start = time.perf_counter()
+        response = http.request(method, url, **kwargs)
+        METRICS.observe(call, time.perf_counter() - start, response.status_code)
+        return response
+    return controller.send(attempt) if controller else attempt()
+
+
+def build_query(address, city, postal_code=None):
+    if postal_code and not pd.isna(postal_code):
+        return f"{address}, {postal_code} {city}, Germany"
+    return f"{address}, {city}, Germany"
+
+
+def _geocode_result(lat, lon, props):
+    # props: a feature's properties (or a batch result item, which carries the same keys)
+    rank = props.get("rank") or {}
+    return GeocodeResult(lat, lon, rank.get("confidence"), props.get("city"), props.get("postcode"),
+                         props.get("street"), props.get("housenumber"), props.get("result_type"),
+                         rank.get("match_type"))
+
+
+def geocode_address(address, city, api_key, postal_code=None, session=None, controller=None,
+                    base_url=GEOAPIFY_BASE_URL):
+    params = {"text": build_query(address, city, postal_code), "apiKey": api_key, "limit": 1, "lang": "de"}
+    response = _send(session or requests, "GET", f"{base_url}/geocode/search", "geocode_search", controller,
+                     params=params)
+    if response.status_code == 200:
+        data = response.json()
+        if data["features"]:
+            feature = data["features"][0]
+            lat = feature["geometry"]["coordinates"][1]
+            lon = feature["geometry"]["coordinates"][0]
+            return _geocode_result(lat, lon, feature["properties"])
+    return NO_RESULT
+
+
+def reverse_geocode(lat, lon, api_key, session=None, controller=None, base_url=GEOAPIFY_BASE_URL):
+    params = {"lat": lat, "lon": lon, "apiKey": api_key, "lang": "de"}
+    response = _send(session or requests, "GET", f"{base_url}/geocode/reverse", "geocode_reverse", controller,
+                     params=params)
+    if response.status_code == 200:
+        data = response.json()
+        if data["features"]:
+            props = data["features"][0]["properties"]
+            return props.get("city", ""), props.get("postcode", "")
+    return "", ""
+
+
+# -----------------------------
+# Batch Geocoding (submit job, poll, collect)
+# -----------------------------
+class BatchJobError(RuntimeError):
+    pass
+
+
+def run_batch_job(endpoint, payload, api_key, session=None, controller=None, base_url=GEOAPIFY_BASE_URL,
+                  poll_interval=BATCH_POLL_INTERVAL, timeout=BATCH_TIMEOUT):
+    # endpoint is "geocode/search" or "geocode/reverse"; returns the job's result list in input order.
+    http = session or requests
+    url = f"{base_url}/batch/{endpoint}"
+    call = f"batch_{endpoint.replace('/', '_')}"
+    response = _send(http, "POST", url, f"{call}_submit", controller,
+                     params={"apiKey": api_key, "lang": "de"}, json=payload)
+    if response.status_code not in (200, 202):
+        raise BatchJobError(f"Batch job submission failed ({response.status_code}): {response.text[:200]}")
+    job_id = response.json()["id"]
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        response = _send(http, "GET", url, f"{call}_poll", controller, params={"id": job_id, "apiKey": api_key})
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code != 202:
+            raise BatchJobError(f"Batch job {job_id} failed ({response.status_code}): {response.text[:200]}")
+    raise BatchJobError(f"Batch job {job_id} did not finish within {timeout}s")
+
+
+def batch_geocode(queries, api_key, **job_kwargs):
+    results = run_batch_job("geocode/search", list(queries), api_key, **job_kwargs)
+    out = []
+    for item in results[:len(queries)]:
+        if item.get("lat") is None or item.get("lon") is None:
+            out.append(NO_RESULT)
+        else:
+            out.append(_geocode_result(item["lat"], item["lon"], item))
+    return out + [NO_RESULT] * (len(queries) - len(out))
+
+
+def batch_reverse_geocode(coords, api_key, **job_kwargs):
+    payload = [{"lat": lat, "lon": lon} for lat, lon in coords]
+    results = run_batch_job("geocode/reverse", payload, api_key, **job_kwargs)
+    out = [(item.get("city", ""), item.get("postcode", "")) for item in results[:len(coords)]]
+    return out + [("", "")] * (len(coords) - len(out))
+
+
+# -----------------------------
+# Concurrent Engine
+# -----------------------------
+class GeocodingEngine:
+    # Runs geocoding requests on a thread pool that shares one pooled HTTP session and one
+    # RequestController, so throughput grows with max_workers until rate_limit (the quota) is hit
+    # and backs off on 429s/5xx instead of dropping rows.
+    # An optional GeocodeCache (see geocache.py) is consulted before every API call.
+    def __init__(self, api_key, max_workers=DEFAULT_MAX_WORKERS, rate_limit=DEFAULT_RATE_LIMIT,
+                 base_url=GEOAPIFY_BASE_URL, cache=None):
+        self.api_key = api_key
+        self.max_workers = max(1, int(max_workers))
+        self.base_url = base_url
+        self.session = make_session(self.max_workers)
+        self.controller = RequestController(rate_limit, self.max_workers)
+        self.cache = cache
+
+    def geocode(self, address, city, postal_code=None):
+        key = address_key(address, city, postal_code)
+        if self.cache:
+            hit = self.cache.get_forward(key)
+            if hit:
+                return hit
+        result = geocode_address(address, city, self.api_key, postal_code, session=self.session,
+                                 controller=self.controller, base_url=self.base_url)
+        if self.cache and result[0] is not None:
+            self.cache.put_forward(key, result)
+        return result
+
+    def reverse(self, lat, lon):
+        if self.cache:
+            hit = self.cache.get_reverse(lat, lon)
+            if hit:
+                return hit
+        result = reverse_geocode(lat, lon, self.api_key, session=self.session,
+                                 controller=self.controller, base_url=self.base_url)
+        if self.cache and (result[0] or result[1]):
+            self.cache.put_reverse(lat, lon, result)
+        return result
+
+    def geocode_frame(self, df, geocode_fn=None, on_progress=None):
+        # geocode_fn(address, city, postal_code) -> GeocodeResult; defaults to self.geocode.
+        # on_progress(done, total) is called from the calling thread, so it may touch Streamlit.
+        geocode_fn = geocode_fn or self.geocode
+        postal = df["Postal Code"] if "Postal Code" in df.columns else pd.Series(None, index=df.index)
+        jobs = list(zip(df.index, df["Address"], df["City"], postal))
+        results = {}
+        total = len(jobs)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(geocode_fn, address, city, postal_code): idx
+                       for idx, address, city, postal_code in jobs}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if on_progress:
+                    on_progress(done, total)
+        return api_result_frame(results, df.index)
+
+    def reverse_many(self, coords, on_progress=None):
+        # Concurrent single reverse lookups; same contract as reverse_batch.
+        coords = list(dict.fromkeys(coords))
+        out = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.reverse, lat, lon): (lat, lon) for lat, lon in coords}
+            for done, future in enumerate(as_completed(futures), start=1):
+                out[futures[future]] = future.result()
+                if on_progress:
+                    on_progress(done, len(coords))
+        return out
+
+    def _run_batches(self, fn, items, batch_size, on_progress):
+        # Submits one batch job per chunk (jobs run concurrently on the pool) and keeps input order.
+        chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        chunk_results = [None] * len(chunks)
+        done = 0
+        job_kwargs = {"session": self.session, "controller": self.controller, "base_url": self.base_url}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as pool:
+            futures = {pool.submit(fn, chunk, self.api_key, **job_kwargs): n for n, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                n = futures[future]
+                chunk_results[n] = future.result()
+                done += len(chunks[n])
+                if on_progress:
+                    on_progress(done, len(items))
+        return [result for chunk in chunk_results for result in chunk]
+
+    def geocode_frame_batch(self, df, on_progress=None, batch_size=BATCH_SIZE):
+        postal = df["Postal Code"] if "Postal Code" in df.columns else pd.Series(None, index=df.index)
+        rows = list(zip(df["Address"], df["City"], postal))
+        keys = [address_key(a, c, p) for a, c, p in rows]
+        cached = self.cache.get_forward_many(keys) if self.cache else {}
+        misses = [n for n, key in enumerate(keys) if key not in cached]
+        fetched = self._run_batches(batch_geocode, [build_query(*rows[n]) for n in misses], batch_size, on_progress)
+        if self.cache:
+            self.cache.put_forward_many([(keys[n], r) for n, r in zip(misses, fetched) if r[0] is not None])
+        results = [cached.get(key) for key in keys]
+        for n, result in zip(misses, fetched):
+            results[n] = result
+        return _api_frame(pd.DataFrame(results, index=df.index, columns=API_COLUMNS + API_PROPERTY_COLUMNS))
+
+    def reverse_batch(self, coords, on_progress=None, batch_size=BATCH_SIZE):
+        # coords: iterable of (lat, lon); returns {(lat, lon): (city, postcode)} for reverse_lookup_frame.
+        coords = list(dict.fromkeys(coords))
+        out = self.cache.get_reverse_many(coords) if self.cache else {}
+        misses = [c for c in coords if c not in out]
+        fetched = self._run_batches(batch_reverse_geocode, misses, batch_size, on_progress)
+        if self.cache:
+            self.cache.put_reverse_many([(c, r) for c, r in zip(misses, fetched) if r[0] or r[1]])
+        out.update(zip(misses, fetched))
+        return out
+
+
+def _api_frame(api_df):
+    return api_df.astype({**{col: "float64" for col in API_COLUMNS}, **{col: "string" for col in API_PROPERTY_COLUMNS}})
+
+
+def api_result_frame(results, index):
+    # API_COLUMNS + API_PROPERTY_COLUMNS for {row index: GeocodeResult}, in the order of index.
+    api_df = pd.DataFrame.from_dict(results, orient="index", columns=API_COLUMNS + API_PROPERTY_COLUMNS)
+    return _api_frame(api_df.reindex(index))
+
+
+def apply_api_results(df, api_df):
+    # Bulk write of geocoding results plus the Use_API_Coordinates decision for the geocoded rows.
+    idx = api_df.index
+    for col in API_COLUMNS + API_PROPERTY_COLUMNS:
+        df.loc[idx, col] = api_df[col].astype(df[col].dtype)
+    orig_conf = pd.to_numeric(df.loc[idx, "Geocoding Confidence"], errors="coerce")
+    api_conf = pd.to_numeric(api_df["API_Confidence"], errors="coerce")
+    missing_orig = (pd.to_numeric(df.loc[idx, "Latitude"], errors="coerce").isna()
+                    | pd.to_numeric(df.loc[idx, "Longitude"], errors="coerce").isna())
+    api_better = api_conf.notna() & (orig_conf.isna() | (api_conf > orig_conf))
+    df.loc[idx, "Use_API_Coordinates"] = missing_orig | api_better
+    return df
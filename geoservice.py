@@ -0,0 +1,132 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, as_completed
+
+import pandas as pd
+
+from geocache import reverse_key
+from geocoding import address_key, api_result_frame
+from metrics import METRICS
+
+
+# -----------------------------
+# Shared Geocoding Service
+# -----------------------------
+class GeocodingService:
+    # One per process, in front of the shared GeocodingEngine. Every session queues its single
+    # lookups here; worker threads take the next request from each session with queued work in
+    # turn, so a huge upload cannot starve a small one. A request identical to one already queued
+    # or running (same address key or reverse key) is not sent again: every caller waits on the
+    # same future; while it is still queued it is also queued for the joining session, so it runs on
+    # whichever session's turn comes first.
+    def __init__(self, engine):
+        self.engine = engine
+        self._cond = threading.Condition()
+        self._queues = {}  # session -> deque of (key, fn, args, future)
+        self._ready = deque()  # sessions with queued requests, in round-robin order
+        self._in_flight = {}  # request key -> future, from submit until the result is set
+        self._workers = []
+
+    def submit(self, session_id, key, fn, *args):
+        # Future for fn(*args); joins the in-flight future of an identical request if there is one.
+        with self._cond:
+            future = self._in_flight.get(key)
+            if future is not None:
+                METRICS.incr("geocode_coalesced")
+                if future.running() or future.done():
+                    return future
+            else:
+                future = self._in_flight[key] = Future()
+            queue = self._queues.setdefault(session_id, deque())
+            if not queue:
+                self._ready.append(session_id)
+            queue.append((key, fn, args, future))
+            if len(self._workers) < self.engine.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True, name=f"geoservice-{len(self._workers)}")
+                self._workers.append(worker)
+                worker.start()
+            self._cond.notify()
+        return future
+
+    def _next(self):
+        # Head of the next session's queue; the session goes to the back of the line if it has more.
+        # Requests another session's turn has already started are dropped.
+        with self._cond:
+            while True:
+                while not self._ready:
+                    self._cond.wait()
+                session_id = self._ready.popleft()
+                queue = self._queues[session_id]
+                request = queue.popleft()
+                if queue:
+                    self._ready.append(session_id)
+                else:
+                    del self._queues[session_id]
+                future = request[3]
+                if not (future.running() or future.done()) and future.set_running_or_notify_cancel():
+                    return request
+
+    def _work(self):
+        while True:
+            key, fn, args, future = self._next()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._in_flight.pop(key, None)
+
+    def _wait(self, futures, on_progress):
+        # [(future, item)] -> {item: result}; a future shared by several items is waited on once.
+        by_future = {}
+        for future, item in futures:
+            by_future.setdefault(future, []).append(item)
+        results, done, total = {}, 0, len(futures)
+        for future in as_completed(by_future):
+            for item in by_future[future]:
+                results[item] = future.result()
+            done += len(by_future[future])
+            if on_progress:
+                on_progress(done, total)
+        return results
+
+    def geocode_frame(self, df, session_id, on_progress=None):
+        # Same contract as GeocodingEngine.geocode_frame, through the shared queue.
+        postal = df["Postal Code"] if "Postal Code" in df.columns else pd.Series(None, index=df.index)
+        futures = [(self.submit(session_id, ("forward", address_key(address, city, postal_code)),
+                                self.engine.geocode, address, city, postal_code), idx)
+                   for idx, address, city, postal_code in zip(df.index, df["Address"], df["City"], postal)]
+        return api_result_frame(self._wait(futures, on_progress), df.index)
+
+    def reverse_many(self, coords, session_id, on_progress=None):
+        # Same contract as GeocodingEngine.reverse_many, through the shared queue.
+        coords = list(dict.fromkeys(coords))
+        futures = [(self.submit(session_id, ("reverse", reverse_key(lat, lon)), self.engine.reverse, lat, lon),
+                    (lat, lon)) for lat, lon in coords]
+        return self._wait(futures, on_progress)
+
+    def state(self):
+        with self._cond:
+            return {"sessions": len(self._queues), "queued": sum(len(q) for q in self._queues.values()),
+                    "in_flight": len(self._in_flight), "workers": len(self._workers)}
+
+    def for_session(self, session_id):
+        return SessionGeocoder(self, session_id)
+
+
+class SessionGeocoder:
+    # Stands in for the engine in one session's pipeline calls: single lookups go through the
+    # service, batch jobs and everything else go to the engine directly.
+    def __init__(self, service, session_id):
+        self.service = service
+        self.session_id = session_id
+
+    def geocode_frame(self, df, on_progress=None):
+        return self.service.geocode_frame(df, self.session_id, on_progress=on_progress)
+
+    def reverse_many(self, coords, on_progress=None):
+        return self.service.reverse_many(coords, self.session_id, on_progress=on_progress)
+
+    def __getattr__(self, name):
+        return getattr(self.service.engine, name)
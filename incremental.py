@@ -0,0 +1,96 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from dedup import VALIDATION_KEY_COLUMNS, row_keys
+from dq_rules import flag_columns
+from geocoding import API_COLUMNS, API_PROPERTY_COLUMNS
+from schema import apply_schema
+
+# -----------------------------
+# Config
+# -----------------------------
+SNAPSHOT_PATH = os.environ.get("DQ_SNAPSHOT_PATH", "dq_snapshot.parquet")
+MAX_SNAPSHOT_ROWS = 2_000_000  # fingerprints kept; the least recently saved go first
+
+
+def output_columns():
+    return API_COLUMNS + API_PROPERTY_COLUMNS + ["Use_API_Coordinates"] + flag_columns()
+
+
+# -----------------------------
+# Row Fingerprints
+# -----------------------------
+def fingerprint_settings(batch=False, offline_reverse=False):
+    # The run settings mixed into row_fingerprints. The CLI and the dashboard share the snapshot
+    # file, so both describe a run through this one tuple.
+    return ("batch" if batch else "per-row", "offline" if offline_reverse else "api")
+
+
+def row_fingerprints(df, *settings):
+    # 64-bit hash of the columns geocoding and validation read, mixed with the run settings
+    # (fingerprint_settings) so results produced under other settings are not reused.
+    settings_hash = pd.util.hash_array(np.array([repr(settings)], dtype=object))[0]
+    return row_keys(df, VALIDATION_KEY_COLUMNS) ^ settings_hash
+
+
+# -----------------------------
+# Snapshot
+# -----------------------------
+def load_snapshot(path=SNAPSHOT_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["fingerprint"] + output_columns())
+    return pd.read_parquet(path)
+
+
+def save_snapshot(result_df, fingerprints, path=SNAPSHOT_PATH, max_rows=MAX_SNAPSHOT_ROWS):
+    # Merges one row of outputs per fingerprint into the snapshot for later runs to reuse. Rows of
+    # earlier runs are kept (a preview of 100 rows or another portfolio does not wipe a full run);
+    # this run's rows replace older ones with the same fingerprint.
+    snapshot = result_df[[c for c in output_columns() if c in result_df.columns]].copy()
+    snapshot.insert(0, "fingerprint", fingerprints.loc[result_df.index].to_numpy())
+    if os.path.exists(path):
+        snapshot = pd.concat([snapshot, load_snapshot(path)], ignore_index=True)
+    snapshot = snapshot.drop_duplicates("fingerprint").head(max_rows).reset_index(drop=True)
+    # a temp file of its own, so concurrent runs saving the same snapshot do not share one
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(path) + ".",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        snapshot.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return len(snapshot)
+
+
+# -----------------------------
+# Split & Stitch
+# -----------------------------
+def split_incremental(df, snapshot, fingerprints):
+    # Returns (reused outputs indexed like the unchanged rows of df, the new or changed rows of df).
+    if snapshot is None:
+        return pd.DataFrame(index=df.index[:0]), df
+    known = snapshot.drop_duplicates("fingerprint").set_index("fingerprint")
+    matched = fingerprints.isin(known.index)
+    reused = known.reindex(fingerprints[matched].to_numpy()).set_axis(df.index[matched])
+    return reused, df[~matched]
+
+
+def stitch_results(df, reused, fresh=None):
+    # Rebuilds a full result frame in df's row order from reused outputs and freshly processed rows.
+    parts = []
+    if len(reused):
+        base = df.loc[reused.index].drop(columns=[c for c in reused.columns if c in df.columns])
+        parts.append(pd.concat([base, reused], axis=1))
+    if fresh is not None and len(fresh):
+        parts.append(fresh)
+    if not parts:
+        return df.iloc[:0]
+    result = apply_schema(pd.concat(parts).loc[df.index])
+    # plain bool, as geocode_and_validate returns it
+    result["Use_API_Coordinates"] = result["Use_API_Coordinates"].fillna(False).astype(bool)
+    return result
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import shutil
+import threading
+
+import pandas as pd
+
+from schema import apply_schema
+
+# -----------------------------
+# Config
+# -----------------------------
+JOB_DIR = os.environ.get("DQ_JOB_DIR", ".dq_jobs")
+JOB_BATCH_SIZE = 1000  # rows per checkpoint
+MAX_KEPT_JOBS = 8  # checkpoints of older jobs that are not running are removed from JOB_DIR
+
+
+def frame_fingerprint(df, *settings):
+    # Stable job ID for a frame plus the settings that change its results, so re-running the
+    # same upload with the same settings resumes the same job.
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr((list(df.columns), settings)).encode())
+    return digest.hexdigest()[:16]
+
+
+# -----------------------------
+# Background Jobs
+# -----------------------------
+class GeocodingJob:
+    # Runs work_fn(row_batch) -> result frame over df in JOB_BATCH_SIZE slices on a background
+    # thread. Every finished slice is written to <job_dir>/<job_id>/part-NNNNNN.parquet, and slices
+    # already on disk are skipped, so a crashed or restarted job picks up where it stopped.
+    def __init__(self, job_id, df, work_fn, batch_size=JOB_BATCH_SIZE, job_dir=JOB_DIR):
+        self.job_id = job_id
+        self.df = df
+        self.work_fn = work_fn
+        self.batch_size = batch_size
+        self.dir = os.path.join(job_dir, job_id)
+        self.total_batches = max(1, -(-len(df) // batch_size))
+        self.status = "pending"
+        self.error = None
+        self._thread = None
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _part_path(self, n):
+        return os.path.join(self.dir, f"part-{n:06d}.parquet")
+
+    def completed_batches(self):
+        return sum(os.path.exists(self._part_path(n)) for n in range(self.total_batches))
+
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def progress(self):
+        return self.completed_batches() / self.total_batches
+
+    def start(self):
+        with self._lock:
+            if self.is_running():
+                return
+            self.status, self.error = "running", None
+            self._thread = threading.Thread(target=self._run, name=f"geocoding-job-{self.job_id}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            os.makedirs(self.dir, exist_ok=True)  # resumed after its checkpoints were pruned
+            for n in range(self.total_batches):
+                path = self._part_path(n)
+                if os.path.exists(path):
+                    continue
+                start = n * self.batch_size
+                result = self.work_fn(self.df.iloc[start:start + self.batch_size].copy())
+                result.to_parquet(path + ".tmp")
+                os.replace(path + ".tmp", path)
+            self.status = "done"
+        except Exception as e:  # surfaced to the UI; the job can be resumed from its checkpoints
+            self.status, self.error = "failed", f"{type(e).__name__}: {e}"
+
+    def result(self):
+        parts = [pd.read_parquet(self._part_path(n)) for n in range(self.total_batches)]
+        return apply_schema(pd.concat(parts))
+
+    def discard(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class JobManager:
+    # Process-wide registry of jobs (share one instance via st.cache_resource), so a Streamlit
+    # rerun reattaches to the job it started instead of starting over.
+    def __init__(self, job_dir=JOB_DIR):
+        self.job_dir = job_dir
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def submit(self, job_id, df, work_fn, batch_size=JOB_BATCH_SIZE):
+        # Returns the existing job for job_id, or creates one (resuming any checkpoints) and starts it.
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                self._prune()
+                job = GeocodingJob(job_id, df, work_fn, batch_size, self.job_dir)
+                self.jobs[job_id] = job
+                job.start()
+            return job
+
+    def _prune(self, keep=MAX_KEPT_JOBS):
+        # Like the export cache: keeps the checkpoints of the most recently written jobs and drops
+        # older jobs that are not running from disk and from the registry. Called with _lock held.
+        if not os.path.isdir(self.job_dir):
+            return
+        running = {job.dir for job in self.jobs.values() if job.is_running()}
+        paths = [os.path.join(self.job_dir, name) for name in os.listdir(self.job_dir)]
+        for path in sorted(paths, key=os.path.getmtime, reverse=True)[keep:]:
+            if path not in running:
+                self.jobs.pop(os.path.basename(path), None)
+                shutil.rmtree(path, ignore_errors=True)
+
+    def restart(self, job_id):
+        # Drops a finished or failed job and its checkpoints; the next submit starts from scratch.
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.is_running():
+                return
+            del self.jobs[job_id]
+        job.discard()
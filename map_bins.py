@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from accumulation import chosen_coordinates
+from flag_index import flag_bitmask, flag_bits
+
+# -----------------------------
+# Config
+# -----------------------------
+CELLS_PER_TILE = 32  # grid cells across one web map tile (360 / 2**zoom degrees of longitude)
+VIEW_TILES = 4  # tiles across the viewport around the map centre
+MIN_ZOOM, MAX_ZOOM = 4, 16
+GERMANY_CENTRE = (51.16, 10.45)
+
+
+def cell_size_deg(zoom):
+    return 360 / 2 ** zoom / CELLS_PER_TILE
+
+
+def view_bounds(centre, zoom):
+    # (lat_min, lat_max, lon_min, lon_max) shown around centre at zoom; None (everything) at MIN_ZOOM.
+    if zoom <= MIN_ZOOM:
+        return None
+    half_lon = 360 / 2 ** zoom * VIEW_TILES / 2
+    half_lat = float(half_lon * np.cos(np.radians(centre[0])))  # web mercator stretches latitude by 1/cos
+    lat, lon = float(centre[0]), float(centre[1])
+    return lat - half_lat, lat + half_lat, lon - half_lon, lon + half_lon
+
+
+# -----------------------------
+# Map Binner
+# -----------------------------
+class MapBinner:
+    # Holds what the map needs per row (chosen coordinates, Sum Insured, flag bitmask) and bins it into
+    # grid cells per zoom level and view. Cell summaries are cached by (zoom, bounds), so panning back
+    # or changing the colour scale costs nothing; only the cells ever reach the figure.
+    def __init__(self, df):
+        lat, lon = chosen_coordinates(df)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.lat, self.lon = lat[valid], lon[valid]
+        sum_insured = df["Sum Insured"] if "Sum Insured" in df.columns else pd.Series(0.0, index=df.index)
+        self.sum_insured = pd.to_numeric(sum_insured, errors="coerce").fillna(0).to_numpy(dtype=float)[valid]
+        self.bitmask = flag_bitmask(df).to_numpy()[valid]
+        self.flags = [flag for flag in flag_bits() if flag in df.columns]
+        self.missing = int((~valid).sum())
+        self.city_centres = {}
+        if "City" in df.columns:
+            centres = pd.DataFrame({"city": df["City"].astype("string").to_numpy()[valid], "lat": self.lat,
+                                    "lon": self.lon}).dropna().groupby("city").median()
+            self.city_centres = {city: (row.lat, row.lon) for city, row in centres.iterrows()}
+        self._cells = {}
+
+    def cells(self, zoom, bounds=None):
+        # One row per non-empty cell: centre of mass, Locations, Sum Insured, Flagged share of
+        # locations with any flag raised and one rate per flag column.
+        key = (zoom, bounds)
+        if key not in self._cells:
+            self._cells[key] = self._aggregate(zoom, bounds)
+        return self._cells[key]
+
+    def _aggregate(self, zoom, bounds):
+        lat, lon, sum_insured, bitmask = self.lat, self.lon, self.sum_insured, self.bitmask
+        if bounds:
+            inside = (lat >= bounds[0]) & (lat <= bounds[1]) & (lon >= bounds[2]) & (lon <= bounds[3])
+            lat, lon, sum_insured, bitmask = lat[inside], lon[inside], sum_insured[inside], bitmask[inside]
+        size = cell_size_deg(zoom)
+        # cells square on screen: latitude steps shrink by cos(latitude) like the web mercator view
+        mid_lat = (bounds[0] + bounds[1]) / 2 if bounds else GERMANY_CENTRE[0]
+        lat_size = size * np.cos(np.radians(mid_lat))
+        cell_ids = (np.floor(lat / lat_size).astype(np.int64) << 32) + np.floor(lon / size).astype(np.int64)
+        cell_of_row, _ = pd.factorize(cell_ids, sort=True)
+        n_cells = int(cell_of_row.max()) + 1 if len(cell_of_row) else 0
+        counts = np.bincount(cell_of_row, minlength=n_cells)
+        cells = pd.DataFrame({
+            "lat": np.bincount(cell_of_row, weights=lat, minlength=n_cells) / np.maximum(counts, 1),
+            "lon": np.bincount(cell_of_row, weights=lon, minlength=n_cells) / np.maximum(counts, 1),
+            "Locations": counts,
+            "Sum Insured": np.bincount(cell_of_row, weights=sum_insured, minlength=n_cells),
+            "Flagged": np.bincount(cell_of_row, weights=bitmask > 0, minlength=n_cells) / np.maximum(counts, 1),
+        })
+        bits = flag_bits()
+        for flag in self.flags:
+            raised = (bitmask & bits[flag]) > 0
+            cells[flag] = np.bincount(cell_of_row, weights=raised, minlength=n_cells) / np.maximum(counts, 1)
+        return cells
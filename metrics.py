@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds, Prometheus histogram bounds
+LATENCY_SAMPLES = 10_000  # most recent samples kept per call for percentiles
+PERCENTILES = (50, 90, 99)
+PROMETHEUS_PREFIX = "dq"
+
+
+# -----------------------------
+# Metrics Registry
+# -----------------------------
+class Metrics:
+    # Thread-safe, process-wide counters for one app: wall time per pipeline stage, latency and
+    # HTTP status per external call, and named event counters (cache hits/misses, retries, ...).
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}  # stage -> [runs, total seconds, last seconds]
+            self.latencies = {}  # call -> deque of recent seconds
+            self.latency_totals = {}  # call -> [count, total seconds, bucket counts]
+            self.status_codes = {}  # (call, status) -> count
+            self.counters = {}  # event -> count
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                runs = self.stages.setdefault(name, [0, 0.0, 0.0])
+                runs[0] += 1
+                runs[1] += seconds
+                runs[2] = seconds
+
+    def observe(self, call, seconds, status=None):
+        # One external call (HTTP request, Claude message) taking `seconds`, with its status code.
+        with self._lock:
+            self.latencies.setdefault(call, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+            totals = self.latency_totals.setdefault(call, [0, 0.0, [0] * len(LATENCY_BUCKETS)])
+            totals[0] += 1
+            totals[1] += seconds
+            for n, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    totals[2][n] += 1
+            if status is not None:
+                key = (call, str(status))
+                self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+    def incr(self, event, n=1):
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + n
+
+    def merge(self, other):
+        # Adds the numbers of another registry, e.g. one sent back by a worker process. Stage
+        # seconds are summed, so stages run in parallel report their total busy time.
+        with self._lock:
+            for name, (runs, total, last) in other.stages.items():
+                mine = self.stages.setdefault(name, [0, 0.0, 0.0])
+                mine[0] += runs
+                mine[1] += total
+                mine[2] = max(mine[2], last)
+            for call, samples in other.latencies.items():
+                self.latencies.setdefault(call, deque(maxlen=LATENCY_SAMPLES)).extend(samples)
+                count, total, buckets = other.latency_totals[call]
+                mine = self.latency_totals.setdefault(call, [0, 0.0, [0] * len(LATENCY_BUCKETS)])
+                mine[0] += count
+                mine[1] += total
+                mine[2] = [a + b for a, b in zip(mine[2], buckets)]
+            for key, count in other.status_codes.items():
+                self.status_codes[key] = self.status_codes.get(key, 0) + count
+            for event, count in other.counters.items():
+                self.counters[event] = self.counters.get(event, 0) + count
+
+    def __getstate__(self):
+        # picklable without the lock, so worker processes can send their registry back
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # --- export ---
+    def snapshot(self):
+        with self._lock:
+            stages = {name: {"runs": runs, "total_s": round(total, 4), "last_s": round(last, 4)}
+                      for name, (runs, total, last) in self.stages.items()}
+            latency = {}
+            for call, samples in self.latencies.items():
+                count, total, _ = self.latency_totals[call]
+                values = np.fromiter(samples, dtype=float)
+                latency[call] = {"count": count, "mean_s": round(total / count, 4),
+                                 **{f"p{p}_s": round(float(np.percentile(values, p)), 4) for p in PERCENTILES},
+                                 "max_s": round(float(values.max()), 4)}
+            status_codes = {}
+            for (call, status), count in self.status_codes.items():
+                status_codes.setdefault(call, {})[status] = count
+            return {"stages": stages, "latency": latency, "status_codes": status_codes,
+                    "counters": dict(self.counters)}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        with self._lock:
+            lines = [f"# TYPE {prefix}_stage_seconds_total counter"]
+            lines += [f'{prefix}_stage_seconds_total{{stage="{name}"}} {total}'
+                      for name, (_, total, _) in self.stages.items()]
+            lines.append(f"# TYPE {prefix}_stage_runs_total counter")
+            lines += [f'{prefix}_stage_runs_total{{stage="{name}"}} {runs}'
+                      for name, (runs, _, _) in self.stages.items()]
+            lines.append(f"# TYPE {prefix}_call_latency_seconds histogram")
+            for call, (count, total, buckets) in self.latency_totals.items():
+                for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'{prefix}_call_latency_seconds_bucket{{call="{call}",le="{bound}"}} {bucket_count}')
+                lines.append(f'{prefix}_call_latency_seconds_bucket{{call="{call}",le="+Inf"}} {count}')
+                lines.append(f'{prefix}_call_latency_seconds_sum{{call="{call}"}} {total}')
+                lines.append(f'{prefix}_call_latency_seconds_count{{call="{call}"}} {count}')
+            lines.append(f"# TYPE {prefix}_http_responses_total counter")
+            lines += [f'{prefix}_http_responses_total{{call="{call}",code="{status}"}} {count}'
+                      for (call, status), count in self.status_codes.items()]
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            lines += [f'{prefix}_events_total{{event="{event}"}} {count}' for event, count in self.counters.items()]
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every module of the app (the dashboard, pipeline runs and background jobs)
+METRICS = Metrics()
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# -----------------------------
+# Config
+# -----------------------------
+# Postcode centroid file. Either the GeoNames postal code dump for Germany (DE.txt, tab separated,
+# no header; https://download.geonames.org/export/zip/DE.zip) or a CSV with the columns
+# postcode, city, lat, lon.
+DEFAULT_POSTCODE_PATH = os.environ.get("OFFLINE_POSTCODE_PATH", "data/DE.txt")
+MAX_MATCH_DISTANCE_KM = 25  # nearest centroid further away than this counts as "no result"
+EARTH_RADIUS_KM = 6371.0088
+GEONAMES_COLUMNS = [
+    "country", "postcode", "city", "admin_name1", "admin_code1", "admin_name2", "admin_code2",
+    "admin_name3", "admin_code3", "lat", "lon", "accuracy",
+]
+
+
+def load_postcode_centroids(path=DEFAULT_POSTCODE_PATH):
+    if path.endswith(".txt"):
+        df = pd.read_csv(path, sep="\t", header=None, names=GEONAMES_COLUMNS, dtype={"postcode": str})
+    else:
+        df = pd.read_csv(path, dtype={"postcode": str})
+    df = df.dropna(subset=["postcode", "city", "lat", "lon"])
+    return df[["postcode", "city", "lat", "lon"]].reset_index(drop=True)
+
+
+def to_xyz(lat, lon):
+    # Points on the unit sphere, so Euclidean nearest neighbours are great-circle nearest neighbours.
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+# -----------------------------
+# Offline Reverse Geocoder
+# -----------------------------
+class OfflineReverseGeocoder:
+    # Nearest postcode centroid lookup over a KD-tree built once per dataset. reverse_batch is a
+    # drop-in replacement for GeocodingEngine.reverse_batch as the reverse source passed to
+    # dq_rules.reverse_lookup_frame.
+    def __init__(self, centroids, max_distance_km=MAX_MATCH_DISTANCE_KM):
+        self.cities = centroids["city"].to_numpy(dtype=object)
+        self.postcodes = centroids["postcode"].to_numpy(dtype=object)
+        self.tree = cKDTree(to_xyz(centroids["lat"], centroids["lon"]))
+        # chord length on the unit sphere for the given surface distance
+        self.max_chord = 2 * np.sin(max_distance_km / EARTH_RADIUS_KM / 2)
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_POSTCODE_PATH, **kwargs):
+        return cls(load_postcode_centroids(path), **kwargs)
+
+    def lookup(self, lats, lons):
+        # Vectorized: returns (cities, postcodes) arrays, "" where nothing lies within range.
+        dist, idx = self.tree.query(to_xyz(lats, lons), distance_upper_bound=self.max_chord)
+        found = np.isfinite(dist)
+        cities = np.full(len(idx), "", dtype=object)
+        postcodes = np.full(len(idx), "", dtype=object)
+        cities[found] = self.cities[idx[found]]
+        postcodes[found] = self.postcodes[idx[found]]
+        return cities, postcodes
+
+    def reverse(self, lat, lon):
+        cities, postcodes = self.lookup([lat], [lon])
+        return cities[0], postcodes[0]
+
+    def reverse_batch(self, coords, on_progress=None):
+        coords = list(dict.fromkeys(coords))
+        if not coords:
+            return {}
+        lats, lons = zip(*coords)
+        cities, postcodes = self.lookup(lats, lons)
+        if on_progress:
+            on_progress(len(coords), len(coords))
+        return dict(zip(coords, zip(cities, postcodes)))
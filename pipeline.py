@@ -0,0 +1,472 @@
+import argparse
+import heapq
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import anthropic
+import numpy as np
+import pandas as pd
+import requests
+
+from accumulation import ACCUMULATION_COLUMNS, DEFAULT_TOP_K, accumulation
+from dedup import dedupe_locations, fan_out, location_keys
+from distance import DISCREPANCY_THRESHOLD_KM, DISTANCE_METHODS, coordinate_discrepancy
+from dq_rules import evaluate_rules, reverse_lookup_frame
+from enrichment import BuildingEnricher
+from geocache import DEFAULT_CACHE_PATH, DEFAULT_TTL_DAYS, GeocodeCache
+from geocoding import (
+    API_COLUMNS, API_PROPERTY_COLUMNS, DEFAULT_MAX_WORKERS, DEFAULT_RATE_LIMIT, GEOAPIFY_BASE_URL, BatchJobError,
+    GeocodingEngine, apply_api_results,
+)
+from incremental import (
+    SNAPSHOT_PATH, fingerprint_settings, load_snapshot, row_fingerprints, save_snapshot, split_incremental,
+    stitch_results,
+)
+from metrics import METRICS
+from offline_geo import DEFAULT_POSTCODE_PATH, OfflineReverseGeocoder
+from schema import COLUMN_TYPES, apply_schema, csv_dtypes, read_table, unparsable_values, write_table
+
+# -----------------------------
+# Config
+# -----------------------------
+COMPLETENESS_COLUMNS = ['Sum Insured', 'Deductible', 'Mapped LoB', 'Construction Type', 'Occupancy',
+                        'Year Built', 'Number of Stories', 'Basement']
+REQUIRED_COLUMNS = ["Address", "City"]
+DEFAULT_CHUNKSIZE = 50_000
+SHARD_BY = ("location", "postal", "rows")
+POSTAL_PREFIX_DIGITS = 2  # German postcode regions (10xxx Berlin, 80xxx München, ...)
+
+# Exit codes for the command line entry point
+EXIT_OK = 0
+EXIT_FLAGS_RAISED = 1  # only with --fail-on-flags
+EXIT_BAD_INPUT = 2
+EXIT_API_ERROR = 3
+
+
+# -----------------------------
+# Pipeline Steps (shared with the dashboard)
+# -----------------------------
+def drop_previous_results(df):
+    # A re-uploaded validated file carries last run's flags; they are recomputed, not duplicated.
+    stale = [c for c in df.columns if c.startswith("DQ: ") or c == "Coord_Diff_km" or c in ACCUMULATION_COLUMNS]
+    return df.drop(columns=stale) if stale else df
+
+
+def load_portfolio(source):
+    # CSV, Parquet or Arrow/Feather (by extension), with the compact schema from schema.py applied.
+    return drop_previous_results(read_table(source))
+
+
+def policy_counts(df):
+    if 'Unique ID' not in df.columns:
+        return None
+    total = len(df)
+    unique = df['Unique ID'].nunique()
+    return {"policies": total, "unique_locations": unique, "duplicate_ids": total - unique}
+
+
+def completeness(df, columns=COMPLETENESS_COLUMNS):
+    # One row per checked column: empty count and reported ratio (%); None for missing columns.
+    rows = []
+    for column in columns:
+        if column in df.columns:
+            empty_count = int(df[column].isna().sum())
+            rows.append({"column": column, "present": True, "empty_count": empty_count,
+                         "reported_ratio": (1 - empty_count / len(df)) * 100 if len(df) else 0.0})
+        else:
+            rows.append({"column": column, "present": False, "empty_count": None, "reported_ratio": None})
+    return pd.DataFrame(rows)
+
+
+def prepare_geocoding_columns(df):
+    api_columns = API_COLUMNS + API_PROPERTY_COLUMNS
+    for col in ["Latitude", "Longitude", "Geocoding Confidence"] + api_columns:
+        if col not in df.columns or col in api_columns:
+            df[col] = pd.Series(np.nan, index=df.index, dtype=COLUMN_TYPES[col])
+    df["Use_API_Coordinates"] = False
+    return df
+
+
+def geocode_locations(df, engine, batch=False, on_progress=None):
+    # Geocodes each unique location of df once; returns (API_* frame for every row, unique count).
+    keys = location_keys(df)
+    unique = dedupe_locations(df, keys)
+    if batch:
+        api_df = engine.geocode_frame_batch(unique, on_progress=on_progress)
+    else:
+        api_df = engine.geocode_frame(unique, on_progress=on_progress)
+    return fan_out(api_df, keys), len(unique)
+
+
+def select_reverse_source(engine, batch=False, postcode_path=None):
+    # Batched reverse lookup callable for reverse_lookup_frame. A postcode_path switches to the
+    # offline index (FileNotFoundError if it does not exist).
+    if postcode_path:
+        return OfflineReverseGeocoder.from_file(postcode_path).reverse_batch
+    return engine.reverse_batch if batch else engine.reverse_many
+
+
+def run_dq_checks(df, reverse_source):
+    with METRICS.stage("reverse_geocode"):
+        reverse_df = reverse_lookup_frame(df, reverse_source)
+    with METRICS.stage("dq_rules"):
+        return evaluate_rules(df, reverse_df)
+
+
+def geocode_and_validate(df, engine, batch=False, reverse_source=None, on_progress=None):
+    # Geocodes and flags every row of df; returns (result_df, unique locations).
+    prepare_geocoding_columns(df)
+    with METRICS.stage("geocode"):
+        api_df, n_unique = geocode_locations(df, engine, batch=batch, on_progress=on_progress)
+        apply_api_results(df, api_df)
+    dq_df = run_dq_checks(df, reverse_source or select_reverse_source(engine, batch))
+    return pd.concat([df, dq_df], axis=1), n_unique
+
+
+def geocode_and_validate_incremental(df, engine, batch=False, reverse_source=None, snapshot_path=SNAPSHOT_PATH,
+                                     settings=None, on_progress=None):
+    # geocode_and_validate for only the rows that are new or changed since the snapshot of the last
+    # run; unchanged rows get their previous outputs back. settings defaults to
+    # fingerprint_settings(batch). Refreshes the snapshot and returns (result_df, unique locations
+    # geocoded, reused rows).
+    fingerprints = row_fingerprints(df, *(settings or fingerprint_settings(batch)))
+    reused, changed = split_incremental(df, load_snapshot(snapshot_path), fingerprints)
+    fresh, n_unique = None, 0
+    if len(changed):
+        fresh, n_unique = geocode_and_validate(changed.copy(), engine, batch, reverse_source, on_progress)
+    result_df = stitch_results(df, reused, fresh)
+    save_snapshot(result_df, fingerprints, snapshot_path)
+    return result_df, n_unique, len(reused)
+
+
+def add_distance_check(result_df, threshold_km=DISCREPANCY_THRESHOLD_KM, distance_method="Geodesic (WGS-84)"):
+    with METRICS.stage("distance"):
+        result_df["Coord_Diff_km"], result_df["DQ: Large Coordinate Discrepancy"] = coordinate_discrepancy(
+            result_df, threshold_km, distance_method)
+    return result_df
+
+
+def add_accumulation(result_df, radius_m, k=DEFAULT_TOP_K):
+    # Adds the Sum Insured within radius_m of every location; returns the top-k accumulation circles.
+    with METRICS.stage("accumulation"):
+        per_row, circles = accumulation(result_df, radius_m, k)
+        result_df[ACCUMULATION_COLUMNS] = per_row
+    return circles
+
+
+def process_frame(df, engine, batch=False, reverse_source=None, threshold_km=DISCREPANCY_THRESHOLD_KM,
+                  distance_method="Geodesic (WGS-84)", on_progress=None):
+    # geocode_and_validate plus the coordinate distance check.
+    result_df, n_unique = geocode_and_validate(df, engine, batch, reverse_source, on_progress)
+    return add_distance_check(result_df, threshold_km, distance_method), n_unique
+
+
+def _flag_counts(result_df):
+    return {c: int(result_df[c].sum()) for c in result_df.columns if c.startswith("DQ: ")}
+
+
+def run_pipeline(df, engine, batch=False, reverse_source=None, max_rows=0,
+                 threshold_km=DISCREPANCY_THRESHOLD_KM, distance_method="Geodesic (WGS-84)",
+                 snapshot_path=None, snapshot_settings=None, accumulation_radius_m=0, shards=0, shard_by="location",
+                 postcode_path=None):
+    # Headless equivalent of the dashboard: geocode, flag and distance-check the first max_rows
+    # rows (0 = all). With a snapshot_path only rows changed since the last run are re-processed;
+    # an accumulation_radius_m adds the Sum Insured accumulation columns. shards > 1 spreads the
+    # work over that many processes (see process_frame_sharded; reverse lookups then come from
+    # postcode_path or the API instead of reverse_source). Returns (result_df, report dict).
+    n_rows = len(df) if max_rows == 0 else min(max_rows, len(df))
+    sample = df.head(n_rows).copy()
+    reused = 0
+    if snapshot_path:
+        result_df, n_unique, reused = geocode_and_validate_incremental(
+            sample, engine, batch, reverse_source, snapshot_path, snapshot_settings)
+        add_distance_check(result_df, threshold_km, distance_method)
+    elif shards > 1:
+        result_df, n_unique = process_frame_sharded(sample, engine, shards, shard_by, batch, postcode_path,
+                                                    threshold_km, distance_method)
+    else:
+        result_df, n_unique = process_frame(sample, engine, batch, reverse_source, threshold_km, distance_method)
+    circles = add_accumulation(result_df, accumulation_radius_m) if accumulation_radius_m else None
+    report = {
+        "rows": n_rows,
+        "unique_locations": n_unique,
+        "reused_rows": reused,
+        "policy_counts": policy_counts(df),
+        "completeness": completeness(df).to_dict("records"),
+        "unparsable_values": {column: len(values) for column, values in unparsable_values(df).items()},
+        "flag_counts": _flag_counts(result_df),
+    }
+    if circles is not None:
+        report["accumulation"] = {"radius_m": accumulation_radius_m, "top_circles": circles.to_dict("records")}
+    return result_df, report
+
+
+def run_pipeline_streaming(source, output, engine, chunksize=DEFAULT_CHUNKSIZE, batch=False, reverse_source=None,
+                           max_rows=0, threshold_km=DISCREPANCY_THRESHOLD_KM, distance_method="Geodesic (WGS-84)",
+                           on_chunk=None):
+    # Same checks as run_pipeline, but reads the CSV in chunks and appends each processed chunk to
+    # output, so memory depends on chunksize rather than file size. Only the set of distinct
+    # Unique IDs is kept across chunks. on_chunk(rows_done) is called after each chunk.
+    reverse_source = reverse_source or select_reverse_source(engine, batch)
+    rows = n_unique = 0
+    unique_ids = set()
+    has_ids = False
+    empty_counts = {}
+    unparsable_counts = {}
+    flag_counts = {}
+    dtypes = csv_dtypes(source)
+    for chunk in pd.read_csv(source, chunksize=chunksize, nrows=max_rows or None, dtype=dtypes):
+        chunk.columns = chunk.columns.str.strip()
+        chunk = drop_previous_results(apply_schema(chunk))
+        rows += len(chunk)
+        if 'Unique ID' in chunk.columns:
+            has_ids = True
+            unique_ids.update(chunk['Unique ID'].dropna().unique())
+        for item in completeness(chunk).to_dict("records"):
+            if item["present"]:
+                empty_counts[item["column"]] = empty_counts.get(item["column"], 0) + item["empty_count"]
+        for column, values in unparsable_values(chunk).items():
+            unparsable_counts[column] = unparsable_counts.get(column, 0) + len(values)
+
+        result_df, chunk_unique = process_frame(chunk, engine, batch, reverse_source, threshold_km, distance_method)
+        n_unique += chunk_unique
+        for flag, count in _flag_counts(result_df).items():
+            flag_counts[flag] = flag_counts.get(flag, 0) + count
+        with METRICS.stage("export"):
+            result_df.to_csv(output, mode="a" if rows > len(chunk) else "w", header=rows == len(chunk), index=False)
+        if on_chunk:
+            on_chunk(rows)
+
+    report = {
+        "rows": rows,
+        "unique_locations": n_unique,  # summed per chunk; repeats across chunks are served by the cache
+        "policy_counts": {"policies": rows, "unique_locations": len(unique_ids),
+                          "duplicate_ids": rows - len(unique_ids)} if has_ids else None,
+        "completeness": [
+            {"column": column, "present": column in empty_counts, "empty_count": empty_counts.get(column),
+             "reported_ratio": (1 - empty_counts[column] / rows) * 100 if column in empty_counts and rows else None}
+            for column in COMPLETENESS_COLUMNS
+        ],
+        "unparsable_values": unparsable_counts,
+        "flag_counts": flag_counts,
+    }
+    return report
+
+
+# -----------------------------
+# Sharded Execution
+# -----------------------------
+def shard_positions(df, n_shards, by="location"):
+    # Row positions of df split into up to n_shards shards. "location" assigns rows by a hash of
+    # their normalized location key, so shards are even and duplicate addresses share a shard (and
+    # are geocoded once); "rows" cuts contiguous row ranges; "postal" keeps every postcode region
+    # (POSTAL_PREFIX_DIGITS) in one shard, balanced by row count but only as even as the regions.
+    n_shards = max(1, min(n_shards, len(df)))
+    if by == "location":
+        hashes = pd.util.hash_pandas_object(location_keys(df), index=False).to_numpy()
+        shard_of_row = hashes % np.uint64(n_shards)
+        return [part for part in (np.flatnonzero(shard_of_row == n) for n in range(n_shards)) if len(part)]
+    if by == "rows" or "Postal Code" not in df.columns:
+        return [part for part in np.array_split(np.arange(len(df)), n_shards) if len(part)]
+    prefixes = df["Postal Code"].astype("string").str.strip().str[:POSTAL_PREFIX_DIGITS].fillna("").to_numpy()
+    regions, region_of_row = np.unique(prefixes, return_inverse=True)
+    sizes = np.bincount(region_of_row, minlength=len(regions))
+    # largest regions first into the currently smallest shard; ties resolved by position, so deterministic
+    shards = [(0, n, []) for n in range(n_shards)]
+    for region in np.argsort(-sizes, kind="stable"):
+        rows, n, members = heapq.heappop(shards)
+        members.append(region)
+        heapq.heappush(shards, (rows + sizes[region], n, members))
+    shard_of_region = np.empty(len(regions), dtype=int)
+    for _, n, members in shards:
+        shard_of_region[members] = n
+    shard_of_row = shard_of_region[region_of_row]
+    return [part for part in (np.flatnonzero(shard_of_row == n) for n in range(n_shards)) if len(part)]
+
+
+def _process_shard(shard, engine_settings, batch, postcode_path, threshold_km, distance_method):
+    # Runs in a worker process: its own HTTP session and rate controller, the shared SQLite cache.
+    METRICS.reset()
+    cache_settings = engine_settings.pop("cache")
+    cache = GeocodeCache(**cache_settings) if cache_settings else None
+    engine = GeocodingEngine(cache=cache, **engine_settings)
+    reverse_source = select_reverse_source(engine, batch, postcode_path)
+    result_df, n_unique = process_frame(shard, engine, batch, reverse_source, threshold_km, distance_method)
+    return result_df, n_unique, METRICS
+
+
+def process_frame_sharded(df, engine, n_shards, shard_by="location", batch=False, postcode_path=None,
+                          threshold_km=DISCREPANCY_THRESHOLD_KM, distance_method="Geodesic (WGS-84)", on_shard=None):
+    # process_frame over up to n_shards shards of df, one worker process per shard. Each worker
+    # builds an engine like the given one; the rate limit (quota) is divided between the shards
+    # actually created and the cache file is shared. Results come back in df's row order whichever
+    # shard finishes first. on_shard(done, total) is called as shards complete. Returns (result_df,
+    # unique locations).
+    shards = shard_positions(df, n_shards, shard_by)
+    cache = engine.cache
+    settings = {
+        "api_key": engine.api_key, "max_workers": engine.max_workers, "base_url": engine.base_url,
+        "rate_limit": engine.controller.max_rate / len(shards) if engine.controller.max_rate else 0,
+        "cache": {"path": cache.path, "ttl_days": cache.ttl / 86400 if cache.ttl else None,
+                  "max_entries": cache.max_entries} if cache else None,
+    }
+    results = [None] * len(shards)
+    with ProcessPoolExecutor(len(shards), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(_process_shard, df.iloc[positions], dict(settings), batch, postcode_path,
+                               threshold_km, distance_method): n
+                   for n, positions in enumerate(shards)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if on_shard:
+                on_shard(done, len(shards))
+    for _, _, worker_metrics in results:
+        METRICS.merge(worker_metrics)
+    order = np.argsort(np.concatenate(shards), kind="stable")
+    result_df = pd.concat([result for result, _, _ in results]).iloc[order]
+    return result_df, sum(n_unique for _, n_unique, _ in results)
+
+
+# -----------------------------
+# Command Line
+# -----------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the exposure data quality checks on a portfolio CSV.")
+    parser.add_argument("input", help="portfolio file (.csv, .parquet or .arrow/.feather)")
+    parser.add_argument("-o", "--output", default="validated.csv",
+                        help="validated file to write; the extension picks CSV, Parquet or Arrow")
+    parser.add_argument("--api-key", default=os.environ.get("GEOAPIFY_API_KEY"),
+                        help="Geoapify API key (default: $GEOAPIFY_API_KEY)")
+    parser.add_argument("--base-url", default=GEOAPIFY_BASE_URL, help="Geoapify API base URL")
+    parser.add_argument("--chunksize", type=int, default=0,
+                        help="stream a CSV input in chunks of this many rows to a CSV output (0 = load it whole)")
+    parser.add_argument("--max-rows", type=int, default=0, help="limit rows (0 = all)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE_LIMIT, help="requests/sec (0 = unlimited)")
+    parser.add_argument("--batch", action="store_true", help="use Geoapify batch jobs")
+    parser.add_argument("--offline-reverse", nargs="?", const=DEFAULT_POSTCODE_PATH, default=None,
+                        metavar="POSTCODE_FILE", help="reverse geocode against a local postcode file")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="geocode cache file")
+    parser.add_argument("--cache-ttl-days", type=int, default=DEFAULT_TTL_DAYS)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--threshold-km", type=float, default=DISCREPANCY_THRESHOLD_KM)
+    parser.add_argument("--distance-method", choices=list(DISTANCE_METHODS), default="Geodesic (WGS-84)")
+    parser.add_argument("--incremental", nargs="?", const=SNAPSHOT_PATH, default=None, metavar="SNAPSHOT_FILE",
+                        help="only re-process rows changed since the run that wrote this snapshot")
+    parser.add_argument("--enrich-buildings", action="store_true",
+                        help="backfill missing building attributes via Claude before validating (not with --chunksize)")
+    parser.add_argument("--claude-api-key", default=os.environ.get("ANTHROPIC_API_KEY"),
+                        help="Claude API key for --enrich-buildings (default: $ANTHROPIC_API_KEY)")
+    parser.add_argument("--accumulation-radius", type=float, default=0, metavar="METRES",
+                        help="add the Sum Insured within this radius of every location and list the top circles")
+    parser.add_argument("--shards", type=int, default=0,
+                        help=f"split the portfolio over this many worker processes (this host has {os.cpu_count()} cores)")
+    parser.add_argument("--shard-by", choices=SHARD_BY, default="location",
+                        help="shard by a hash of the location (default), postal code region or contiguous row ranges")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write run metrics (timings, API latency, cache hits) as JSON, or Prometheus text for .prom")
+    parser.add_argument("--fail-on-flags", action="store_true", help="exit 1 if any DQ flag is raised")
+    return parser
+
+
+def print_report(report, output):
+    counts = report["policy_counts"]
+    if counts:
+        print(f"Policies: {counts['policies']} ({counts['unique_locations']} unique locations, "
+              f"{counts['duplicate_ids']} duplicate IDs)")
+    for item in report["completeness"]:
+        if item["present"]:
+            print(f"{item['column']} reported: {item['reported_ratio']:.2f}% ({item['empty_count']} empty)")
+        else:
+            print(f"{item['column']}: column not found")
+    for column, count in report.get("unparsable_values", {}).items():
+        print(f"{column}: {count} values are not valid numbers and were kept as entered")
+    print(f"Geocoded {report['rows']} rows ({report['unique_locations']} unique locations)")
+    if report.get("reused_rows"):
+        print(f"Reused {report['reused_rows']} unchanged rows from the previous run")
+    for flag, count in report["flag_counts"].items():
+        print(f"{flag}: {count}")
+    if report.get("accumulation"):
+        print(f"Top Sum Insured accumulations within {report['accumulation']['radius_m']:g} m:")
+        for circle in report["accumulation"]["top_circles"]:
+            print(f"  {circle['Rank']}. ({circle['Latitude']:.5f}, {circle['Longitude']:.5f}): "
+                  f"{circle['Accumulated_Sum_Insured']:,.0f} over {circle['Accumulated_Policies']} policies")
+    print(f"Wrote {output}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.api_key:
+        print("error: a Geoapify API key is required (--api-key or $GEOAPIFY_API_KEY)", file=sys.stderr)
+        return EXIT_BAD_INPUT
+    if args.chunksize and not (args.input.lower().endswith(".csv") and args.output.lower().endswith(".csv")):
+        print("error: --chunksize needs a .csv input and a .csv output", file=sys.stderr)
+        return EXIT_BAD_INPUT
+    if args.chunksize and (args.incremental or args.enrich_buildings or args.accumulation_radius or args.shards):
+        print("error: --incremental, --enrich-buildings, --accumulation-radius and --shards cannot be combined "
+              "with --chunksize", file=sys.stderr)
+        return EXIT_BAD_INPUT
+    if args.shards > 1 and args.incremental:
+        print("error: --shards cannot be combined with --incremental", file=sys.stderr)
+        return EXIT_BAD_INPUT
+    if args.enrich_buildings and not args.claude_api_key:
+        print("error: --enrich-buildings needs a Claude API key (--claude-api-key or $ANTHROPIC_API_KEY)",
+              file=sys.stderr)
+        return EXIT_BAD_INPUT
+    try:
+        # streaming mode only needs the header up front
+        with METRICS.stage("load"):
+            df = pd.read_csv(args.input, nrows=0) if args.chunksize else load_portfolio(args.input)
+    except (OSError, ValueError) as e:
+        print(f"error: cannot read {args.input}: {e}", file=sys.stderr)
+        return EXIT_BAD_INPUT
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns.str.strip()]
+    if missing:
+        print(f"error: input is missing required columns: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_BAD_INPUT
+
+    cache = None if args.no_cache else GeocodeCache(args.cache, ttl_days=args.cache_ttl_days)
+    engine = GeocodingEngine(args.api_key, max_workers=args.workers, rate_limit=args.rate_limit,
+                             base_url=args.base_url, cache=cache)
+    try:
+        reverse_source = select_reverse_source(engine, args.batch, args.offline_reverse)
+    except FileNotFoundError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_BAD_INPUT
+    options = {"batch": args.batch, "reverse_source": reverse_source, "max_rows": args.max_rows,
+               "threshold_km": args.threshold_km, "distance_method": args.distance_method}
+    try:
+        if args.enrich_buildings:
+            enricher = BuildingEnricher(anthropic.Anthropic(api_key=args.claude_api_key), cache=cache)
+            # rows beyond --max-rows are not validated, so they are not sent to Claude either
+            df, n_enriched = enricher.enrich_frame(df.head(args.max_rows) if args.max_rows else df)
+            print(f"Backfilled building attributes for {n_enriched} rows")
+        if args.chunksize:
+            report = run_pipeline_streaming(args.input, args.output, engine, chunksize=args.chunksize, **options)
+        else:
+            result_df, report = run_pipeline(df, engine, snapshot_path=args.incremental,
+                                             snapshot_settings=fingerprint_settings(args.batch,
+                                                                                    bool(args.offline_reverse)),
+                                             accumulation_radius_m=args.accumulation_radius, shards=args.shards,
+                                             shard_by=args.shard_by, postcode_path=args.offline_reverse, **options)
+            with METRICS.stage("export"):
+                write_table(result_df, args.output)
+    except (BatchJobError, requests.RequestException) as e:
+        print(f"error: geocoding failed: {e}", file=sys.stderr)
+        return EXIT_API_ERROR
+    except anthropic.APIError as e:
+        print(f"error: building attribute enrichment failed: {e}", file=sys.stderr)
+        return EXIT_API_ERROR
+
+    print_report(report, args.output)
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            f.write(METRICS.to_prometheus() if args.metrics.endswith(".prom") else METRICS.to_json())
+    if args.fail_on_flags and any(report["flag_counts"].values()):
+        return EXIT_FLAGS_RAISED
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import datetime
+import hashlib
+
+import pandas as pd
+
+from schema import unparsable_values
+
+# -----------------------------
+# Config
+# -----------------------------
+EARLIEST_PLAUSIBLE_YEAR = 1000
+MAX_PLAUSIBLE_STORIES = 100
+
+
+# -----------------------------
+# Plausibility Checks
+# -----------------------------
+# (label, columns the check needs, fn(numeric frame) -> bool Series); checks whose columns are
+# missing from the file are skipped.
+PLAUSIBILITY_CHECKS = [
+    ("Sum Insured ≤ 0", ["Sum Insured"], lambda n: n["Sum Insured"] <= 0),
+    ("Deductible < 0", ["Deductible"], lambda n: n["Deductible"] < 0),
+    ("Deductible > Sum Insured", ["Deductible", "Sum Insured"], lambda n: n["Deductible"] > n["Sum Insured"]),
+    ("Year Built in the future", ["Year Built"], lambda n: n["Year Built"] > datetime.date.today().year),
+    (f"Year Built before {EARLIEST_PLAUSIBLE_YEAR}", ["Year Built"],
+     lambda n: n["Year Built"] < EARLIEST_PLAUSIBLE_YEAR),
+    ("Number of Stories ≤ 0", ["Number of Stories"], lambda n: n["Number of Stories"] <= 0),
+    (f"Number of Stories > {MAX_PLAUSIBLE_STORIES}", ["Number of Stories"],
+     lambda n: n["Number of Stories"] > MAX_PLAUSIBLE_STORIES),
+]
+
+
+# -----------------------------
+# Profiling
+# -----------------------------
+def content_hash(data):
+    # Cache key for an uploaded file's bytes.
+    return hashlib.sha256(data).hexdigest()
+
+
+def profile_frame(df, columns):
+    # One vectorized pass over the given columns: null counts, reported ratio, value range
+    # (numeric columns) or distinct values (text columns), plus plausibility check counts and the
+    # values of numeric columns that are not valid numbers.
+    present = [c for c in columns if c in df.columns]
+    frame = df[present]
+    empty = frame.isna().sum()
+    numeric = frame.select_dtypes("number")
+    # as float, so an all-empty nullable Int column gives NaN rather than pd.NA
+    stats = numeric.astype(float).agg(["min", "max", "mean"]).T if len(numeric.columns) else pd.DataFrame()
+    distinct = frame.drop(columns=numeric.columns).nunique()
+
+    rows = []
+    for column in columns:
+        if column not in present:
+            rows.append({"column": column, "present": False, "empty_count": None, "reported_ratio": None})
+            continue
+        row = {"column": column, "present": True, "empty_count": int(empty[column]),
+               "reported_ratio": (1 - empty[column] / len(df)) * 100 if len(df) else 0.0}
+        if column in stats.index:
+            row.update(stats.loc[column].astype(float).to_dict())
+        else:
+            row["distinct"] = int(distinct[column])
+        rows.append(row)
+
+    checks = []
+    runnable = [check for check in PLAUSIBILITY_CHECKS if all(c in df.columns for c in check[1])]
+    values = df[sorted({c for _, needed, _ in runnable for c in needed})].apply(pd.to_numeric, errors="coerce")
+    for label, _, fn in runnable:
+        checks.append({"check": label, "count": int(fn(values).sum())})
+    return {"rows": len(df), "columns": pd.DataFrame(rows),
+            "plausibility": pd.DataFrame(checks, columns=["check", "count"]),
+            "unparsable": unparsable_values(df)}
@@ -0,0 +1,158 @@
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+from metrics import METRICS
+
+# -----------------------------
+# Config
+# -----------------------------
+MIN_RATE = 0.5  # requests per second the controller never drops below
+DECREASE_FACTOR = 0.5  # multiplicative decrease of rate and concurrency on 429 / 5xx
+INCREASE_STEP = 0.1  # additive increase per second of successes, as a fraction of max_rate (at least 1 req/s)
+DECREASE_INTERVAL = 1.0  # seconds; a burst of 429s from concurrent requests counts as one decrease
+MAX_RETRIES = 6
+BACKOFF_BASE = 0.5  # seconds; full-jitter exponential backoff between retries
+BACKOFF_CAP = 30.0
+BREAKER_THRESHOLD = 10  # consecutive failed attempts that open the circuit
+BREAKER_COOLDOWN = 30.0  # seconds the circuit stays open before a trial request
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class ApiUnavailableError(requests.RequestException):
+    # Raised when a request still fails after all retries, or while the circuit is open.
+    pass
+
+
+def retry_after_seconds(response):
+    # Retry-After as seconds (delta-seconds or HTTP date); None when absent or unparsable.
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# -----------------------------
+# Adaptive Request Controller
+# -----------------------------
+class RequestController:
+    # Shared by every Geoapify call of an engine. A token bucket caps the request rate at max_rate
+    # (the paid quota; 0 = uncapped) and an in-flight window caps concurrency at max_concurrency.
+    # Both grow additively on success and shrink multiplicatively on 429/5xx (AIMD). Throttled and
+    # transient failures are retried with full-jitter backoff, honouring Retry-After for all
+    # threads; BREAKER_THRESHOLD consecutive failures open a circuit breaker for BREAKER_COOLDOWN s.
+    def __init__(self, max_rate=0, max_concurrency=8, min_rate=MIN_RATE, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP, breaker_threshold=BREAKER_THRESHOLD,
+                 breaker_cooldown=BREAKER_COOLDOWN, name="geoapify"):
+        self.max_rate = max_rate if max_rate and max_rate > 0 else 0.0
+        self.rate = self.max_rate  # 0 = not limited (until the first throttle)
+        self.min_rate = min_rate
+        self.increase_step = max(1.0, self.max_rate * INCREASE_STEP)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.concurrency = float(self.max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.name = name
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._failures = 0
+        self._open_until = 0.0
+        self._decreased_at = 0.0
+
+    # --- admission ---
+    def _acquire(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self._open_until:
+                    raise ApiUnavailableError(f"{self.name} circuit open for another {self._open_until - now:.0f}s")
+                wait = self._paused_until - now
+                if wait <= 0 and self._in_flight < int(self.concurrency):
+                    if not self.rate:
+                        break
+                    self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._refilled_at) * self.rate)
+                    self._refilled_at = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    wait = (1 - self._tokens) / self.rate
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self._in_flight += 1
+
+    def _release(self, outcome, pause=0.0):
+        # outcome: "ok" (additive increase), "throttled" (multiplicative decrease) or "error".
+        with self._cond:
+            self._in_flight -= 1
+            if outcome == "ok":
+                self._failures = 0
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+                if self.rate and (not self.max_rate or self.rate < self.max_rate):
+                    self.rate = self.rate + self.increase_step / self.rate
+                    self.rate = min(self.max_rate, self.rate) if self.max_rate else self.rate
+            else:
+                self._failures += 1
+                if outcome == "throttled" and time.monotonic() - self._decreased_at >= DECREASE_INTERVAL:
+                    self._decreased_at = time.monotonic()
+                    self.concurrency = max(1.0, self.concurrency * DECREASE_FACTOR)
+                    current = self.rate or self._in_flight + 1
+                    self.rate = max(self.min_rate, current * DECREASE_FACTOR)
+                if pause:
+                    self._paused_until = max(self._paused_until, time.monotonic() + pause)
+                if self._failures >= self.breaker_threshold:
+                    self._open_until = time.monotonic() + self.breaker_cooldown
+                    self._failures = 0
+                    METRICS.incr(f"{self.name}_circuit_opened")
+            self._cond.notify_all()
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    # --- requests ---
+    def send(self, send_fn):
+        # send_fn() -> requests.Response. Returns the first non-retryable response (2xx or a 4xx
+        # other than 429); raises ApiUnavailableError once retries are exhausted.
+        last = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                METRICS.incr(f"{self.name}_retries")
+            self._acquire()
+            try:
+                response = send_fn()
+            except RETRYABLE_ERRORS as e:
+                last = e
+                self._release("error")
+                time.sleep(self._backoff(attempt))
+                continue
+            except BaseException:
+                self._release("error")
+                raise
+            if response.status_code == 429 or response.status_code >= 500:
+                last = f"HTTP {response.status_code}"
+                retry_after = retry_after_seconds(response)
+                self._release("throttled", pause=retry_after or 0.0)
+                time.sleep(max(retry_after or 0.0, self._backoff(attempt)))
+                continue
+            self._release("ok")
+            return response
+        raise ApiUnavailableError(f"{self.name} request failed after {self.max_retries + 1} attempts: {last}")
+
+    def state(self):
+        with self._cond:
+            return {"rate": round(self.rate, 2), "concurrency": round(self.concurrency, 2),
+                    "in_flight": self._in_flight, "circuit_open": time.monotonic() < self._open_until}
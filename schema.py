@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Config
+# -----------------------------
+# Compact dtypes applied at load time. Coordinates and confidences stay float64 so no precision is
+# lost on round trips and source and API confidences compare exactly; repetitive text columns
+# become categoricals; counts become nullable ints (Int32, so a typo such as 2101990 in Year Built
+# still loads and is caught by the plausibility checks).
+COLUMN_TYPES = {
+    "Latitude": "float64",
+    "Longitude": "float64",
+    "API_Latitude": "float64",
+    "API_Longitude": "float64",
+    "Geocoding Confidence": "float64",
+    "API_Confidence": "float64",
+    "Sum Insured": "float64",
+    "Deductible": "float64",
+    "Year Built": "Int32",
+    "Number of Stories": "Int32",
+    "City": "category",
+    "Mapped LoB": "category",
+    "Occupancy": "category",
+    "Construction Type": "category",
+    "Basement": "category",
+    "Use_API_Coordinates": "boolean",
+    "API_City": "string",
+    "API_Postcode": "string",
+    "API_Street": "string",
+    "API_Housenumber": "string",
+    "API_Result_Type": "string",
+    "API_Match_Type": "string",
+}
+# Read as text so leading zeros survive (01067 Dresden)
+TEXT_COLUMNS = ["Postal Code", "Unique ID", "API_Postcode", "API_Housenumber"]
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather")
+SUPPORTED_UPLOAD_TYPES = ["csv", "parquet", "pq", "arrow", "feather"]
+
+
+# -----------------------------
+# Typed Schema
+# -----------------------------
+def apply_schema(df):
+    # A numeric column with values that do not parse ("ca. 1900", "3+", "1.000.000") or do not fit
+    # its dtype keeps its raw values rather than losing them to NaN; unparsable_values lists them.
+    for column, dtype in COLUMN_TYPES.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if dtype == "category":
+            df[column] = df[column].astype("category")
+        elif dtype in ("boolean", "string"):
+            df[column] = df[column].astype(dtype)
+        else:
+            values = pd.to_numeric(df[column], errors="coerce")
+            if (df[column].notna() & (values.isna() | _out_of_range(values, dtype))).any():
+                continue
+            if dtype == "Int32":
+                values = values.round()
+            df[column] = values.astype(dtype)
+    for column in df.columns:
+        if column.startswith("DQ: ") and df[column].dtype != bool:
+            df[column] = df[column].fillna(False).astype(bool)
+    return df
+
+
+def _out_of_range(values, dtype):
+    # numbers a nullable int dtype cannot hold (and infinities)
+    if not dtype.startswith("Int"):
+        return pd.Series(False, index=values.index)
+    info = np.iinfo(dtype.lower())
+    return values.notna() & ~values.between(info.min, info.max)
+
+
+def unparsable_values(df):
+    # {column: raw values that are not numbers or do not fit the dtype} for numeric COLUMN_TYPES
+    # columns left unconverted.
+    found = {}
+    for column, dtype in COLUMN_TYPES.items():
+        if column in df.columns and dtype not in ("category", "boolean", "string"):
+            values = pd.to_numeric(df[column], errors="coerce")
+            bad = df[column].notna() & (values.isna() | _out_of_range(values, dtype))
+            if bad.any():
+                found[column] = df.loc[bad, column]
+    return found
+
+
+def csv_dtypes(source):
+    # read_csv dtype mapping for TEXT_COLUMNS, keyed on the file's raw (unstripped) header names.
+    header = pd.read_csv(source, nrows=0)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return {raw: "string" for raw in header.columns if raw.strip() in TEXT_COLUMNS}
+
+
+# -----------------------------
+# File I/O
+# -----------------------------
+def _extension(source):
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    return os.path.splitext(str(name))[1].lower()
+
+
+def read_table(source):
+    ext = _extension(source)
+    if ext in PARQUET_EXTENSIONS:
+        df = pd.read_parquet(source)
+    elif ext in ARROW_EXTENSIONS:
+        df = pd.read_feather(source)
+    else:
+        df = pd.read_csv(source, dtype=csv_dtypes(source))
+    df.columns = df.columns.str.strip()
+    return apply_schema(df)
+
+
+def write_table(df, target):
+    ext = _extension(target)
+    if ext in PARQUET_EXTENSIONS:
+        df.to_parquet(target, index=False)
+    elif ext in ARROW_EXTENSIONS:
+        df.reset_index(drop=True).to_feather(target)
+    else:
+        df.to_csv(target, index=False)
+
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
@@ -0,0 +1,30 @@
+import pytest
+
+from benchmarks.mock_geoapify import MockGeoapify
+from benchmarks.synthetic import generate_portfolio
+from geocoding import GeocodingEngine
+from metrics import METRICS
+from schema import apply_schema
+
+
+@pytest.fixture(scope="session")
+def mock_api():
+    with MockGeoapify() as mock:
+        yield mock
+
+
+@pytest.fixture
+def engine(mock_api):
+    return GeocodingEngine("test-key", max_workers=4, rate_limit=0, base_url=mock_api.base_url)
+
+
+@pytest.fixture
+def portfolio():
+    return apply_schema(generate_portfolio(300, seed=1)[0])
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
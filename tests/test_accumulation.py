@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import accumulation as acc
+from distance import haversine_km
+
+
+def _frame(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"Latitude": 50.94 + rng.normal(0, 0.01, n), "Longitude": 6.96 + rng.normal(0, 0.015, n),
+                       "Sum Insured": rng.lognormal(13, 1, n).round(-3)})
+    df.loc[1::7, ["Latitude", "Longitude"]] = df.loc[0:len(df) - 2:7, ["Latitude", "Longitude"]].to_numpy()
+    df.loc[5, "Latitude"] = np.nan
+    df.loc[9, "Sum Insured"] = -1000.0
+    return df
+
+
+def _brute_force(df, radius_m):
+    lat, lon = df["Latitude"].to_numpy(), df["Longitude"].to_numpy()
+    within = 1000 * haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]) <= radius_m
+    sum_insured = df["Sum Insured"].clip(lower=0).to_numpy()
+    return within @ sum_insured, within.sum(axis=1)
+
+
+@pytest.mark.parametrize("chunk_sites", [acc.CHUNK_SITES, 50])
+def test_neighbour_totals_match_brute_force(monkeypatch, chunk_sites):
+    monkeypatch.setattr(acc, "CHUNK_SITES", chunk_sites)
+    df = _frame()
+    out, circles = acc.accumulation(df, 300)
+    valid = df["Latitude"].notna()
+    totals, policies = _brute_force(df[valid], 300)
+    np.testing.assert_allclose(out.loc[valid, "Accumulated_Sum_Insured"], totals)
+    assert out.loc[valid, "Accumulated_Policies"].tolist() == policies.tolist()
+    assert out.loc[~valid].isna().all(axis=None)
+    assert circles["Accumulated_Sum_Insured"].iloc[0] == pytest.approx(totals.max())
+
+
+def test_top_circles_do_not_overlap():
+    df = _frame()
+    circles = acc.AccumulationIndex(df).top_circles(300, k=5)
+    assert circles["Rank"].tolist() == [1, 2, 3, 4, 5]
+    assert circles["Accumulated_Sum_Insured"].is_monotonic_decreasing
+    lat, lon = circles["Latitude"].to_numpy(), circles["Longitude"].to_numpy()
+    metres = 1000 * haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    assert (metres[~np.eye(len(circles), dtype=bool)] > 600).all()
+
+
+def test_api_coordinates_are_used_where_chosen():
+    df = pd.DataFrame({"Latitude": [50.0, 50.0], "Longitude": [7.0, 7.0], "Sum Insured": [1.0, 2.0],
+                       "API_Latitude": [51.0, 52.0], "API_Longitude": [8.0, 9.0],
+                       "Use_API_Coordinates": [False, True]})
+    lat, lon = acc.chosen_coordinates(df)
+    assert lat.tolist() == [50.0, 52.0] and lon.tolist() == [7.0, 9.0]
+    assert acc.accumulation(df, 200)[0]["Accumulated_Policies"].tolist() == [1, 1]
@@ -0,0 +1,45 @@
+import json
+
+import pandas as pd
+import requests
+
+from benchmarks import run_benchmarks
+from benchmarks.mock_geoapify import MockGeoapify
+from benchmarks.synthetic import ERROR_KINDS, generate_portfolio
+
+
+def test_generator_is_reproducible_and_injects_errors():
+    df, errors = generate_portfolio(2000, seed=7)
+    again, _ = generate_portfolio(2000, seed=7)
+    pd.testing.assert_frame_equal(df, again)
+    assert set(errors) - {""} <= set(ERROR_KINDS) and (errors != "").sum() > 50
+    assert df["Unique ID"].duplicated().any()
+    assert df.loc[errors == "missing_coordinates", "Latitude"].isna().all()
+    assert (df.loc[errors == "future_year_built", "Year Built"] == 2099).all()
+
+
+def test_mock_answers_429_at_the_configured_rate():
+    with MockGeoapify(rate_429=1.0, retry_after=3) as mock:
+        response = requests.get(f"{mock.base_url}/geocode/search", params={"text": "Hauptstr. 1, 50667 Köln"})
+    assert response.status_code == 429 and response.headers["Retry-After"] == "3"
+    assert mock.status_counts == {429: 1}
+
+
+def test_compare_reports_regressions_beyond_the_tolerance():
+    baseline = {"results": [{"benchmark": "a", "rows": 10, "rows_per_sec": 100.0},
+                            {"benchmark": "b", "rows": 10, "rows_per_sec": 100.0}]}
+    results = [{"benchmark": "a", "rows": 10, "rows_per_sec": 85.0},
+               {"benchmark": "b", "rows": 10, "rows_per_sec": 70.0},
+               {"benchmark": "c", "rows": 10, "rows_per_sec": 1.0}]
+    assert [line.split(" @")[0] for line in run_benchmarks.compare(results, baseline)] == ["b"]
+
+
+def test_benchmark_run_writes_results(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    assert run_benchmarks.main(["--sizes", "500", "--api-rows", "50", "--latency", "0", "--jitter", "0",
+                                "--no-memory", "--json", str(output)]) == 0
+    report = json.loads(output.read_text())
+    names = [r["benchmark"] for r in report["results"]]
+    assert "evaluate_rules" in names and "geocode_address" in names
+    assert report["mock_status_counts"] == {"200": 100}
+    assert run_benchmarks.compare(report["results"], report) == []
@@ -0,0 +1,65 @@
+import json
+
+import pandas as pd
+import pytest
+
+import pipeline
+from benchmarks.synthetic import generate_portfolio
+from enrichment import StubClaudeClient
+
+
+@pytest.fixture
+def portfolio_csv(tmp_path):
+    path = tmp_path / "portfolio.csv"
+    generate_portfolio(200, seed=2)[0].to_csv(path, index=False)
+    return str(path)
+
+
+def _run(mock_api, tmp_path, *args):
+    return pipeline.main([*args, "--api-key", "test-key", "--base-url", mock_api.base_url, "--rate-limit", "0",
+                          "--cache", str(tmp_path / "cache.sqlite")])
+
+
+def test_cli_writes_results_report_and_metrics(mock_api, tmp_path, portfolio_csv, capsys):
+    output, metrics = tmp_path / "validated.csv", tmp_path / "metrics.json"
+    assert _run(mock_api, tmp_path, portfolio_csv, "-o", str(output), "--metrics", str(metrics)) == pipeline.EXIT_OK
+    result = pd.read_csv(output)
+    assert len(result) == 200
+    assert {"API_Latitude", "Coord_Diff_km", "DQ: Missing Coordinates"} <= set(result.columns)
+    assert "Geocoded 200 rows" in capsys.readouterr().out
+    assert "geocode_search" in json.loads(metrics.read_text())["latency"]
+
+
+def test_cli_fails_on_flags_only_when_asked(mock_api, tmp_path, portfolio_csv):
+    output = str(tmp_path / "validated.csv")
+    assert _run(mock_api, tmp_path, portfolio_csv, "-o", output, "--fail-on-flags") == pipeline.EXIT_FLAGS_RAISED
+
+
+def test_cli_enriches_only_the_rows_it_validates(mock_api, tmp_path, monkeypatch, capsys):
+    source = tmp_path / "portfolio.csv"
+    generate_portfolio(200, seed=2)[0].assign(**{"Year Built": None}).to_csv(source, index=False)
+    client = StubClaudeClient()
+    monkeypatch.setattr(pipeline.anthropic, "Anthropic", lambda api_key: client)
+    assert _run(mock_api, tmp_path, str(source), "-o", str(tmp_path / "validated.csv"), "--max-rows", "30",
+                "--enrich-buildings", "--claude-api-key", "test-key") == pipeline.EXIT_OK
+    assert "Backfilled building attributes for 30 rows" in capsys.readouterr().out
+    assert client.requests == 2  # 30 addresses in batches of 20
+
+
+@pytest.mark.parametrize("args", [
+    ["missing.csv"],
+    ["{csv}", "--chunksize", "50", "-o", "out.parquet"],
+    ["{csv}", "--chunksize", "50", "--incremental"],
+    ["{csv}", "--shards", "2", "--incremental"],
+    ["{csv}", "--enrich-buildings"],
+])
+def test_cli_rejects_bad_input(mock_api, tmp_path, portfolio_csv, monkeypatch, args):
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    args = [arg.format(csv=portfolio_csv) for arg in args]
+    assert _run(mock_api, tmp_path, *args) == pipeline.EXIT_BAD_INPUT
+
+
+def test_cli_rejects_missing_columns(mock_api, tmp_path):
+    path = tmp_path / "no_city.csv"
+    pd.DataFrame({"Address": ["Hauptstr. 1"]}).to_csv(path, index=False)
+    assert _run(mock_api, tmp_path, str(path)) == pipeline.EXIT_BAD_INPUT
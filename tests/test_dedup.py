@@ -0,0 +1,31 @@
+import pandas as pd
+
+from dedup import VALIDATION_KEY_COLUMNS, dedupe_locations, fan_out, location_keys, row_keys
+
+
+def _frame():
+    return pd.DataFrame({
+        "Address": ["Hauptstr. 1", "Hauptstrasse 1", "Bahnhofstr 2", "Hauptstr. 1"],
+        "City": ["Köln", "Koeln", "Berlin", "Köln"],
+        "Postal Code": ["50667", "50667", "10115", "50667"],
+    }, index=[10, 11, 12, 13])
+
+
+def test_location_keys_normalize_spelling():
+    keys = location_keys(_frame())
+    assert keys[10] == keys[11] == keys[13] != keys[12]
+
+
+def test_dedupe_and_fan_out_round_trip():
+    df = _frame()
+    keys = location_keys(df)
+    unique = dedupe_locations(df, keys)
+    assert unique.index.tolist() == [10, 12]
+    results = pd.DataFrame({"API_Latitude": [50.9, 52.5]}, index=unique.index)
+    assert fan_out(results, keys)["API_Latitude"].tolist() == [50.9, 50.9, 52.5, 50.9]
+
+
+def test_row_keys_skip_missing_columns():
+    df = _frame()
+    assert row_keys(df, VALIDATION_KEY_COLUMNS).equals(row_keys(df, ["Address", "City", "Postal Code"]))
+    assert row_keys(df, VALIDATION_KEY_COLUMNS)[10] == row_keys(df, VALIDATION_KEY_COLUMNS)[13]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+from distance import coordinate_discrepancy, geodesic_km, haversine_km
+
+
+def _points(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-80, 80, n), rng.uniform(-180, 180, n), rng.uniform(-80, 80, n), rng.uniform(-180, 180, n)
+
+
+def test_geodesic_matches_geopy():
+    lat1, lon1, lat2, lon2 = _points()
+    expected = [geodesic((a, b), (c, d)).km for a, b, c, d in zip(lat1, lon1, lat2, lon2)]
+    np.testing.assert_allclose(geodesic_km(lat1, lon1, lat2, lon2), expected, rtol=0, atol=1e-6)
+
+
+def test_nearly_antipodal_points_fall_back_to_geopy():
+    km = geodesic_km([0.0, 0.5], [0.0, 0.0], [0.0, -0.5], [179.7, 179.7])
+    np.testing.assert_allclose(km, [geodesic((0, 0), (0, 179.7)).km, geodesic((0.5, 0), (-0.5, 179.7)).km],
+                               atol=1e-6)
+
+
+def test_haversine_is_close_and_nan_passes_through():
+    lat1, lon1, lat2, lon2 = _points()
+    np.testing.assert_allclose(haversine_km(lat1, lon1, lat2, lon2), geodesic_km(lat1, lon1, lat2, lon2), rtol=0.006)
+    assert np.isnan(geodesic_km([np.nan, 50.0], [7.0, 7.0], [50.0, 50.0], [7.0, 7.0])).tolist() == [True, False]
+
+
+def test_coordinate_discrepancy_flags_rows_over_the_threshold():
+    df = pd.DataFrame({"Latitude": [50.94, 50.94, None], "Longitude": [6.96, 6.96, 6.96],
+                       "API_Latitude": [50.941, 51.0, 50.94], "API_Longitude": [6.96, 6.96, 6.96]})
+    for method in ("Geodesic (WGS-84)", "Haversine (fast)"):
+        diff_km, flagged = coordinate_discrepancy(df, method=method)
+        assert diff_km.index.equals(df.index) and np.isnan(diff_km[2])
+        assert flagged.tolist() == [False, True, False]
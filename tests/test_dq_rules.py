@@ -0,0 +1,58 @@
+import pandas as pd
+
+from dq_rules import evaluate_rules, flag_columns, forward_answers, reverse_lookup_frame
+from metrics import METRICS
+
+
+def _frame():
+    return pd.DataFrame({
+        "Address": ["Hauptstr. 1", "Hauptstr. 2", "Ringstr. 3", "Marktplatz", "Domkloster 4", "Zeil 5"],
+        "City": ["Köln", "Köln", "Paris", "Bonn", "Köln", "Frankfurt"],
+        "Postal Code": ["50667", "50667", "75001", "53111", "50667", "60311"],
+        "Latitude": [50.94, None, 48.86, 50.73, 50.94, 50.11],
+        "Longitude": [6.96, None, 2.35, 7.10, 6.96, 8.68],
+        "Geocoding Confidence": [0.9, 0.9, 0.9, 0.5, 0.9, 0.9],
+        "API_Latitude": [None, None, None, None, None, 50.11],
+        "API_Longitude": [None, None, None, None, None, 8.68],
+        "API_City": [None, None, None, None, None, "Frankfurt am Main"],
+        "API_Postcode": [None, None, None, None, None, "60311"],
+    })
+
+
+def test_local_rules_flag_each_problem():
+    flags = evaluate_rules(_frame())
+    assert flags.columns.tolist() == flag_columns()
+    assert flags.index[flags["DQ: Missing Coordinates"]].tolist() == [1]
+    assert flags.index[flags["DQ: Invalid Coordinates"]].tolist() == [2]
+    assert flags.index[flags["DQ: Low Confidence"]].tolist() == [3]
+    assert flags.index[flags["DQ: Incomplete Address"]].tolist() == [3]
+    assert not flags["DQ: Reverse Geocode Mismatch"].any()  # no reverse_df
+
+
+def test_reverse_rules_use_the_lookup_answers():
+    df = _frame()
+    looked_up = []
+
+    def reverse_batch(coords):
+        coords = list(coords)
+        looked_up.extend(coords)
+        answers = {(50.94, 6.96): ("Köln", "50668"), (50.73, 7.10): ("Bonn", "53111")}
+        return {coord: answers[coord] for coord in coords}
+
+    reverse_df = reverse_lookup_frame(df, reverse_batch)
+    assert sorted(set(looked_up)) == [(50.73, 7.10), (50.94, 6.96)]  # only in-bounds rows, row 5 from forward
+    assert reverse_df.loc[5].tolist() == ["Frankfurt am Main", "60311"]
+    assert reverse_df.loc[2].tolist() == ["", ""]
+    assert METRICS.snapshot()["counters"]["reverse_answered_by_forward"] == 1
+
+    flags = evaluate_rules(df, reverse_df)
+    assert flags.index[flags["DQ: City/Postal Mismatch"]].tolist() == [0, 4]
+    assert flags.index[flags["DQ: Reverse Geocode Mismatch"]].tolist() == [5]
+
+
+def test_forward_answers_need_matching_coordinates():
+    df = _frame()
+    assert forward_answers(df).tolist() == [False] * 5 + [True]
+    df.loc[5, "API_Latitude"] = 50.12  # about 1 km away
+    assert not forward_answers(df).any()
+    assert not forward_answers(df.drop(columns=["API_City", "API_Postcode"])).any()
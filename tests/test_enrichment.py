@@ -0,0 +1,54 @@
+import pandas as pd
+
+from enrichment import BuildingEnricher, StubClaudeClient, parse_batch_response, rows_needing_enrichment
+from geocache import GeocodeCache
+from metrics import METRICS
+
+
+def _frame(n=30):
+    return pd.DataFrame({
+        "Address": [f"Hauptstr. {i}" for i in range(n)],
+        "City": "Köln",
+        "Postal Code": "50667",
+        "Construction Type": ["Steel"] + [None] * (n - 1),
+        "Occupancy": ["Office"] * n,
+        "Year Built": [None] * n,
+        "Number of Stories": [None] * n,
+    })
+
+
+def test_parse_batch_response_keeps_well_formed_items():
+    text = 'Sure:\n```json\n[{"id": 0, "ConstructionType": "Steel", "Occupancy": "Office", "Stories": 3, ' \
+           '"YearBuilt": 1970}, {"id": 1, "ConstructionType": "Steel"}]\n```'
+    assert parse_batch_response(text) == {"0": {"ConstructionType": "Steel", "Occupancy": "Office", "Stories": 3,
+                                                "YearBuilt": 1970}}
+    assert parse_batch_response("not json") == {}
+
+
+def test_enrich_frame_fills_only_the_gaps():
+    df = _frame()
+    client = StubClaudeClient()
+    enricher = BuildingEnricher(client, batch_size=8, rate_limit=0)
+    enriched, n_filled = enricher.enrich_frame(df)
+    assert n_filled == 30 and client.requests == enricher.requests == 4
+    assert enriched.loc[0, "Construction Type"] == "Steel"
+    assert (enriched["Occupancy"] == "Office").all()
+    assert not rows_needing_enrichment(enriched).any()
+
+
+def test_malformed_answers_are_retried():
+    client = StubClaudeClient(malformed_every=3)
+    enricher = BuildingEnricher(client, batch_size=8, rate_limit=0)
+    enriched, _ = enricher.enrich_frame(_frame())
+    assert not rows_needing_enrichment(enriched).any()
+    assert client.requests > 4
+    assert METRICS.snapshot()["counters"]["claude_item_retries"] > 0
+
+
+def test_cached_answers_skip_the_api(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    first, _ = BuildingEnricher(StubClaudeClient(), rate_limit=0, cache=cache).enrich_frame(_frame())
+    client = StubClaudeClient()
+    second, _ = BuildingEnricher(client, rate_limit=0, cache=cache).enrich_frame(_frame())
+    assert client.requests == 0
+    pd.testing.assert_frame_equal(second, first)
@@ -0,0 +1,62 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from export import EXPORT_FORMATS, export_file, flagged_rows, write_export
+
+
+@pytest.fixture
+def results():
+    return pd.DataFrame({
+        "Unique ID": ["1", "2", "3", "4", "5"],
+        "Note": pd.Series([None, None, "late", None, "text"], dtype=object),  # all-null in the first chunk
+        "Stories": pd.array([1, 2, None, 4, 5], dtype="Int32"),  # nulls only in a later chunk
+        "DQ: Low Confidence": [False, True, False, False, True],
+    })
+
+
+def _read(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".gz"):
+        return pd.read_csv(gzip.open(path), dtype={"Unique ID": str})
+    if path.endswith(".zst"):
+        with pa.input_stream(path, compression="zstd") as stream:
+            return pd.read_csv(stream, dtype={"Unique ID": str})
+    return pd.read_csv(path, dtype={"Unique ID": str})
+
+
+@pytest.mark.parametrize("export_format", list(EXPORT_FORMATS))
+def test_chunked_export_round_trips(results, export_format, tmp_path):
+    path = str(tmp_path / f"out{EXPORT_FORMATS[export_format][0]}")
+    write_export(results, path, export_format, chunksize=2)
+    back = _read(path)
+    assert back["Unique ID"].tolist() == results["Unique ID"].tolist()
+    assert back["Note"].isna().tolist() == results["Note"].isna().tolist()
+    assert back["Stories"].isna().tolist() == results["Stories"].isna().tolist()
+
+
+def test_export_file_is_cached_by_content(results, tmp_path):
+    first = export_file(results, "CSV", flagged_only=True, export_dir=str(tmp_path))
+    assert export_file(results, "CSV", flagged_only=True, export_dir=str(tmp_path)) == first
+    assert _read(first)["Unique ID"].tolist() == ["2", "5"]
+    changed = results.assign(Note="x")
+    assert export_file(changed, "CSV", flagged_only=True, export_dir=str(tmp_path)) != first
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_concurrent_exports_of_the_same_data(tmp_path):
+    df = pd.DataFrame({"Unique ID": [str(i) for i in range(20_000)], "Sum Insured": 1000.0})
+    with ThreadPoolExecutor(8) as pool:
+        paths = list(pool.map(lambda _: export_file(df, "CSV (gzip)", export_dir=str(tmp_path), chunksize=1000),
+                              range(8)))
+    assert len(set(paths)) == 1 and os.listdir(tmp_path) == [os.path.basename(paths[0])]
+    assert len(_read(paths[0])) == 20_000
+
+
+def test_flagged_rows_without_flag_columns_is_empty(results):
+    assert flagged_rows(results.drop(columns="DQ: Low Confidence")).empty
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from flag_index import DISCREPANCY_FLAG, FlagIndex, flag_bits, flag_bitmask
+
+
+def _results(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "City": rng.choice(["Berlin", "Köln", "Bonn", None], n),
+        "Mapped LoB": pd.Categorical(rng.choice(["Property", "Industrial"], n)),
+        "Sum Insured": np.where(rng.random(n) < 0.1, np.nan, rng.integers(1, 50, n) * 1000.0),
+    }, index=rng.permutation(n) + 100)
+    for flag in flag_bits():
+        df[flag] = rng.random(n) < 0.2
+    return df
+
+
+def test_bitmask_round_trips_the_flags():
+    df = _results()
+    mask = flag_bitmask(df).to_numpy()
+    for flag, bit in flag_bits().items():
+        assert np.array_equal(mask & bit > 0, df[flag].to_numpy())
+    without = flag_bitmask(df.drop(columns=[DISCREPANCY_FLAG])).to_numpy()
+    assert not (without & flag_bits()[DISCREPANCY_FLAG]).any()
+
+
+@pytest.mark.parametrize("require_all", [False, True])
+def test_select_matches_pandas(require_all):
+    df = _results()
+    index = FlagIndex(df)
+    flags = list(flag_bits())[:2] + [DISCREPANCY_FLAG]
+    filters = {"City": ["Köln", "Bonn"], "Mapped LoB": ["Industrial"]}
+    raised = df[flags].all(axis=1) if require_all else df[flags].any(axis=1)
+    expected = df[raised & df["City"].isin(filters["City"]) & (df["Mapped LoB"] == "Industrial")]
+    assert df.iloc[np.sort(index.select(flags, require_all, filters))].index.equals(expected.index)
+    assert len(index.select()) == len(df)
+    assert index.counts() == {flag: int(df[flag].sum()) for flag in flag_bits()}
+
+
+@pytest.mark.parametrize("sort_by", ["Sum Insured", "City", "Mapped LoB"])
+@pytest.mark.parametrize("ascending", [True, False])
+def test_pages_match_pandas_sorting(sort_by, ascending):
+    df = _results()
+    index = FlagIndex(df)
+    rows = index.select([DISCREPANCY_FLAG])
+    expected = df.iloc[rows].sort_values(sort_by, ascending=ascending, kind="stable", na_position="last")
+    pages = [index.page(rows, page, 50, sort_by, ascending) for page in range(-(-len(rows) // 50))]
+    assert pd.concat(pages).index.equals(expected.index)
+    assert index.page(rows, 0, 10, columns=["City"]).columns.tolist() == ["City"]
@@ -0,0 +1,121 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import geocache
+from geocache import GeocodeCache
+from geocoding import API_PROPERTY_COLUMNS, GeocodeResult, GeocodingEngine, address_key
+
+
+def test_forward_and_reverse_round_trip(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    result = GeocodeResult(50.94, 6.96, 0.9, "Köln", "50667", "Hauptstraße", "1", "building", "full_match")
+    cache.put_forward("k", result)
+    cache.put_forward("old", (52.5, 13.4, 0.7))
+    cache.put_reverse(52.520001, 13.400001, ("Berlin", "10115"))
+    assert cache.get_forward("k") == result
+    assert cache.get_forward("old") == GeocodeResult(52.5, 13.4, 0.7)
+    assert cache.get_reverse(52.520004, 13.399999) == ("Berlin", "10115")  # same 5-decimal key
+    assert cache.get_forward("missing") is None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_cache_is_shared_across_connections(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    GeocodeCache(path).put_buildings_many([("k", {"Year Built": 1960})])
+    assert GeocodeCache(path).get_buildings_many(["k"]) == {"k": {"Year Built": 1960}}
+
+
+def test_expired_entries_are_ignored_and_purged(tmp_path, monkeypatch):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"), ttl_days=1)
+    cache.put_forward("k", (52.5, 13.4, 0.7))
+    now = time.time()
+    monkeypatch.setattr(geocache.time, "time", lambda: now + 2 * 86400)
+    assert cache.get_forward("k") is None
+    cache.evict()
+    assert cache.stats()["forward_entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for key in "abc":
+        cache.put_forward(key, (52.5, 13.4, 0.7))
+        time.sleep(0.01)
+    cache.get_forward("a")
+    cache.evict()
+    assert set(cache.get_forward_many("abc")) == {"a", "c"}
+
+
+def test_hits_do_not_take_the_write_lock(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = GeocodeCache(path)
+    cache.put_forward("k", (52.5, 13.4, 0.7))
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")  # another process holding SQLite's write lock
+    hits = []
+    reader = threading.Thread(target=lambda: hits.append(cache.get_forward("k")), daemon=True)
+    reader.start()
+    reader.join(timeout=5)
+    writer.execute("ROLLBACK")
+    assert hits == [GeocodeResult(52.5, 13.4, 0.7)]
+
+
+def test_last_used_is_written_in_batches(tmp_path, monkeypatch):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    cache.put_forward("k", (52.5, 13.4, 0.7))
+
+    def last_used():
+        return cache._conn.execute("SELECT last_used FROM forward WHERE key = 'k'").fetchone()[0]
+    written = last_used()
+    time.sleep(0.01)
+    cache.get_forward("k")
+    assert last_used() == written
+    cache.put_forward("other", (52.5, 13.4, 0.7))  # the next write carries the pending update
+    assert last_used() > written
+    monkeypatch.setattr(geocache, "TOUCH_FLUSH_EVERY", 1)
+    written = last_used()
+    time.sleep(0.01)
+    cache.get_forward("k")
+    assert last_used() > written
+
+
+def test_hit_counts_are_exact_across_threads(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    cache.put_forward_many([(str(n), (52.5, 13.4, 0.7)) for n in range(50)])
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda start: cache.get_forward_many([str(n % 100) for n in range(start, start + 10)]), range(200)))
+    assert cache.hits + cache.misses == 2000 and cache.stats()["hits"] == cache.hits
+
+
+def test_old_cache_files_gain_the_properties_column(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("""CREATE TABLE forward (key TEXT PRIMARY KEY, lat REAL, lon REAL, confidence REAL,
+                        created_at REAL, last_used REAL)""")
+        conn.execute("INSERT INTO forward VALUES ('k', 52.5, 13.4, 0.7, ?, ?)", (time.time(), time.time()))
+    assert GeocodeCache(path).get_forward("k") == GeocodeResult(52.5, 13.4, 0.7)
+
+
+def test_engine_serves_repeat_lookups_from_the_cache(tmp_path, mock_api):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    engine = GeocodingEngine("test-key", rate_limit=0, base_url=mock_api.base_url, cache=cache)
+    first = engine.geocode("Hauptstr. 1", "Köln", "50667")
+    requests_before = sum(mock_api.status_counts.values())
+    assert engine.geocode("Hauptstrasse 1", "Koeln", "50667") == first
+    assert engine.reverse(first.lat, first.lon) == engine.reverse(first.lat, first.lon)
+    assert sum(mock_api.status_counts.values()) == requests_before + 1
+
+
+def test_warm_from_frame_seeds_forward_entries(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    df = pd.DataFrame({"Address": ["Hauptstr. 1", "Ringstr. 2"], "City": ["Köln", "Bonn"],
+                       "Postal Code": ["50667", "53111"], "API_Latitude": [50.94, None],
+                       "API_Longitude": [6.96, None], "API_Confidence": [0.9, None]})
+    for col in API_PROPERTY_COLUMNS:
+        df[col] = ["x", None]
+    assert cache.warm_from_frame(df) == 1
+    hit = cache.get_forward(address_key("Hauptstr. 1", "Köln", "50667"))
+    assert hit[:4] == (50.94, 6.96, 0.9, "x")
@@ -0,0 +1,87 @@
+import time
+from functools import partial
+
+import pandas as pd
+import pytest
+
+import geocoding
+from benchmarks.mock_geoapify import fake_geocode, fake_properties, fake_reverse
+from geocoding import (API_COLUMNS, API_PROPERTY_COLUMNS, RateLimiter, address_key, build_query, normalize_postal_code,
+                       normalize_text)
+
+
+@pytest.fixture
+def fast_polls(monkeypatch):
+    # batch jobs are polled without the BATCH_POLL_INTERVAL wait
+    monkeypatch.setattr(geocoding, "run_batch_job", partial(geocoding.run_batch_job, poll_interval=0))
+
+
+def _rows():
+    return pd.DataFrame({
+        "Address": ["Hauptstr. 1", "Bahnhofstraße 12", "Marktplatz", "Hauptstrasse 1"],
+        "City": ["Köln", "Berlin", "Leipzig", "Koeln"],
+        "Postal Code": ["50667", "10115", None, "50667"],
+    }, index=[3, 5, 8, 13])
+
+
+def test_address_normalization():
+    assert normalize_text("Hauptstr. 1") == normalize_text("HAUPTSTRASSE 1") == "hauptstrasse 1"
+    assert normalize_text("Köln") == "koeln"
+    assert normalize_text(None) == normalize_text(float("nan")) == ""
+    assert normalize_postal_code(1067.0) == normalize_postal_code("1067") == "01067"
+    assert address_key("Hauptstr. 1", "Köln", "50667") == address_key("hauptstrasse 1", "Koeln", 50667)
+    assert address_key("Hauptstr. 1", "Köln", "50667") != address_key("Hauptstr. 1", "Köln", "50668")
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(50)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.wait()
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+    assert RateLimiter(0).interval == 0.0
+
+
+def test_geocode_frame_matches_the_api(engine):
+    df = _rows()
+    api_df = engine.geocode_frame(df)
+    assert api_df.index.tolist() == df.index.tolist()
+    assert api_df.columns.tolist() == API_COLUMNS + API_PROPERTY_COLUMNS
+    for idx, row in df.iterrows():
+        text = build_query(row["Address"], row["City"], row["Postal Code"])
+        lat, lon, confidence, _, _ = fake_geocode(text)
+        props, match_type = fake_properties(text)
+        got = api_df.loc[idx]
+        assert (got["API_Latitude"], got["API_Longitude"], got["API_Confidence"]) == (lat, lon, confidence)
+        assert got["API_Street"] == props["street"] and got["API_Match_Type"] == match_type
+
+
+def test_batch_mode_gives_the_same_answers(engine, fast_polls):
+    df = _rows()
+    expected = engine.geocode_frame(df)
+    pd.testing.assert_frame_equal(engine.geocode_frame_batch(df, batch_size=3), expected)
+
+    coords = [(52.52, 13.40), (50.94, 6.96), (52.52, 13.40)]
+    reverse = engine.reverse_batch(coords, batch_size=1)
+    assert reverse == engine.reverse_many(coords) == {c: fake_reverse(*c) for c in coords}
+
+
+def test_progress_reaches_the_total(engine, fast_polls):
+    calls = []
+    engine.geocode_frame(_rows(), on_progress=lambda done, total: calls.append((done, total)))
+    assert calls[-1] == (4, 4)
+    calls.clear()
+    engine.geocode_frame_batch(_rows(), on_progress=lambda done, total: calls.append((done, total)), batch_size=2)
+    assert sorted(calls)[-1] == (4, 4)
+
+
+def test_api_results_replace_missing_or_weaker_coordinates():
+    df = pd.DataFrame({"Latitude": [52.0, None, 52.0], "Longitude": [13.0, None, 13.0],
+                       "Geocoding Confidence": [0.9, 0.9, 0.5]})
+    for col in API_COLUMNS:
+        df[col] = pd.Series(dtype="float64")
+    for col in API_PROPERTY_COLUMNS:
+        df[col] = pd.Series(dtype="string")
+    df["Use_API_Coordinates"] = False
+    api_df = geocoding.api_result_frame({n: geocoding.GeocodeResult(52.1, 13.1, 0.8) for n in range(3)}, df.index)
+    assert geocoding.apply_api_results(df, api_df)["Use_API_Coordinates"].tolist() == [False, True, True]
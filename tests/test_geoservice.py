@@ -0,0 +1,61 @@
+import threading
+from types import SimpleNamespace
+
+import pandas as pd
+
+from benchmarks.mock_geoapify import MockGeoapify
+from geocoding import GeocodingEngine
+from geoservice import GeocodingService
+from metrics import METRICS
+
+
+def test_sessions_take_turns():
+    service = GeocodingService(SimpleNamespace(max_workers=1))
+    gate, order = threading.Event(), []
+
+    def work(name):
+        gate.wait()
+        order.append(name)
+        return name
+
+    futures = [service.submit("big", f"a{i}", work, f"a{i}") for i in range(6)]
+    futures += [service.submit("small", f"b{i}", work, f"b{i}") for i in range(2)]
+    gate.set()
+    assert [future.result(timeout=5) for future in futures] == [f"a{i}" for i in range(6)] + ["b0", "b1"]
+    assert order[:5] == ["a0", "a1", "b0", "a2", "b1"] or order[:5] == ["a0", "b0", "a1", "b1", "a2"]
+
+
+def test_identical_requests_are_sent_once():
+    service = GeocodingService(SimpleNamespace(max_workers=2))
+    gate, calls = threading.Event(), []
+
+    def work(value):
+        gate.wait()
+        calls.append(value)
+        return value * 2
+
+    first = service.submit("s1", "same", work, 21)
+    second = service.submit("s2", "same", work, 21)
+    gate.set()
+    assert first is second and first.result(timeout=5) == 42
+    assert calls == [21]
+    assert METRICS.snapshot()["counters"]["geocode_coalesced"] == 1
+    assert service.submit("s1", "same", work, 4).result(timeout=5) == 8  # finished requests are not reused
+
+
+def test_overlapping_uploads_share_lookups():
+    df = pd.DataFrame({"Address": [f"Hauptstr. {i}" for i in range(12)], "City": "Köln", "Postal Code": "50667"})
+    with MockGeoapify(latency=0.05) as mock:
+        engine = GeocodingEngine("test-key", max_workers=4, rate_limit=0, base_url=mock.base_url)
+        service = GeocodingService(engine)
+        results = {}
+        sessions = [threading.Thread(target=lambda s=s: results.update({s: service.for_session(s).geocode_frame(df)}))
+                    for s in ("alice", "bob")]
+        for thread in sessions:
+            thread.start()
+        for thread in sessions:
+            thread.join()
+        assert mock.status_counts[200] < 24
+        pd.testing.assert_frame_equal(results["alice"], engine.geocode_frame(df))
+    pd.testing.assert_frame_equal(results["alice"], results["bob"])
+    assert service.state()["in_flight"] == 0
@@ -0,0 +1,82 @@
+import pandas as pd
+
+from incremental import (
+    fingerprint_settings, load_snapshot, row_fingerprints, save_snapshot, split_incremental, stitch_results,
+)
+from metrics import METRICS
+from pipeline import (
+    geocode_and_validate, geocode_and_validate_incremental, load_portfolio, main, prepare_geocoding_columns,
+)
+
+
+def _calls():
+    return sum(v["count"] for v in METRICS.snapshot()["latency"].values())
+
+
+def test_fingerprints_depend_on_settings(portfolio):
+    api = row_fingerprints(portfolio, *fingerprint_settings())
+    assert api.equals(row_fingerprints(portfolio.copy(), *fingerprint_settings(False, False)))
+    assert not (api == row_fingerprints(portfolio, *fingerprint_settings(offline_reverse=True))).any()
+
+
+def test_split_and_stitch_rebuild_the_full_result(engine, portfolio, tmp_path):
+    path = str(tmp_path / "snapshot.parquet")
+    first, _ = geocode_and_validate(prepare_geocoding_columns(portfolio.copy()), engine)
+    fingerprints = row_fingerprints(portfolio, *fingerprint_settings())
+    save_snapshot(first, fingerprints, path)
+
+    edited = portfolio.copy()
+    edited.loc[edited.index[:10], "Address"] = "Neue Straße 1"
+    reused, changed = split_incremental(edited, load_snapshot(path), row_fingerprints(edited, *fingerprint_settings()))
+    assert len(changed) == 10 and len(reused) == len(portfolio) - 10
+    fresh, _ = geocode_and_validate(prepare_geocoding_columns(changed.copy()), engine)
+    stitched = stitch_results(edited, reused, fresh)
+    assert stitched.index.equals(edited.index)
+    assert stitched["Use_API_Coordinates"].dtype == bool
+    unchanged = edited.index[10:]
+    pd.testing.assert_series_equal(stitched.loc[unchanged, "API_Latitude"], first.loc[unchanged, "API_Latitude"])
+
+
+def test_second_run_reuses_every_row(engine, portfolio, tmp_path):
+    path = str(tmp_path / "snapshot.parquet")
+    first, _, reused = geocode_and_validate_incremental(portfolio.copy(), engine, snapshot_path=path)
+    assert reused == 0 and _calls() > 0
+    METRICS.reset()
+    again, n_unique, reused = geocode_and_validate_incremental(portfolio.copy(), engine, snapshot_path=path)
+    assert reused == len(portfolio) and n_unique == 0 and _calls() == 0
+    flags = [c for c in first.columns if c.startswith("DQ: ")]
+    pd.testing.assert_frame_equal(again[flags], first[flags])
+
+
+def test_partial_runs_keep_older_fingerprints(engine, portfolio, tmp_path):
+    path = str(tmp_path / "snapshot.parquet")
+    geocode_and_validate_incremental(portfolio.copy(), engine, snapshot_path=path)
+    geocode_and_validate_incremental(portfolio.head(20).copy(), engine, snapshot_path=path)  # a preview
+    other = portfolio.head(5).assign(Address="Neue Straße 1")
+    geocode_and_validate_incremental(other, engine, snapshot_path=path)
+    expected = set(row_fingerprints(portfolio, *fingerprint_settings())) | set(
+        row_fingerprints(other, *fingerprint_settings()))
+    assert set(load_snapshot(path)["fingerprint"]) == expected
+    METRICS.reset()
+    _, _, reused = geocode_and_validate_incremental(portfolio.copy(), engine, snapshot_path=path)
+    assert reused == len(portfolio) and _calls() == 0
+
+
+def test_snapshot_size_is_capped(portfolio, tmp_path):
+    path = str(tmp_path / "snapshot.parquet")
+    fingerprints = row_fingerprints(portfolio, *fingerprint_settings())
+    save_snapshot(portfolio.iloc[:50], fingerprints, path, max_rows=60)
+    assert save_snapshot(portfolio.iloc[50:80], fingerprints, path, max_rows=60) == 60
+    kept = set(load_snapshot(path)["fingerprint"])
+    assert set(fingerprints.iloc[50:80]) <= kept
+
+
+def test_cli_snapshot_is_reused_by_the_dashboard(mock_api, portfolio, tmp_path):
+    source, snapshot = str(tmp_path / "portfolio.csv"), str(tmp_path / "snapshot.parquet")
+    portfolio.to_csv(source, index=False)
+    assert main([source, "-o", str(tmp_path / "validated.csv"), "--api-key", "test-key", "--base-url",
+                 mock_api.base_url, "--rate-limit", "0", "--no-cache", "--incremental", snapshot]) == 0
+    # the dashboard's "Per-row requests" + "Geoapify API" run of the same file
+    df = load_portfolio(source)
+    reused, changed = split_incremental(df, load_snapshot(snapshot), row_fingerprints(df, *fingerprint_settings()))
+    assert changed.empty and len(reused) == len(portfolio)
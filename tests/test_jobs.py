@@ -0,0 +1,67 @@
+import os
+import time
+
+import pandas as pd
+
+from jobs import GeocodingJob, JobManager, frame_fingerprint
+
+
+def _wait(job, timeout=10):
+    deadline = time.monotonic() + timeout
+    while job.is_running() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def _frame(n=25):
+    return pd.DataFrame({"Address": [f"Hauptstr {i}" for i in range(n)], "City": "Berlin"})
+
+
+def test_frame_fingerprint_depends_on_content_and_settings():
+    df = _frame()
+    assert frame_fingerprint(df, "a") == frame_fingerprint(df.copy(), "a")
+    assert frame_fingerprint(df, "a") != frame_fingerprint(df, "b")
+    assert frame_fingerprint(df, "a") != frame_fingerprint(df.head(24), "a")
+
+
+def test_job_checkpoints_and_resumes(tmp_path):
+    df = _frame()
+    calls = []
+
+    def work(chunk):
+        calls.append(len(chunk))
+        if len(calls) == 2:
+            raise RuntimeError("quota exceeded")
+        return chunk.assign(Done=True)
+
+    job = GeocodingJob("job", df, work, batch_size=10, job_dir=str(tmp_path))
+    job.start()
+    assert _wait(job).status == "failed" and "quota exceeded" in job.error
+    assert job.completed_batches() == 1
+    job.start()
+    assert _wait(job).status == "done"
+    assert calls == [10, 10, 10, 5]  # the first slice came from its checkpoint
+    result = job.result()
+    assert result["Address"].tolist() == df["Address"].tolist() and result["Done"].all()
+
+
+def test_manager_reattaches_and_prunes_old_jobs(tmp_path):
+    manager = JobManager(job_dir=str(tmp_path))
+    first = manager.submit("job-0", _frame(), lambda chunk: chunk)
+    assert manager.submit("job-0", _frame(), lambda chunk: chunk) is first
+    _wait(first)
+    for n in range(1, 12):
+        _wait(manager.submit(f"job-{n}", _frame(), lambda chunk: chunk))
+        os.utime(tmp_path / f"job-{n}", (n + 1e9, n + 1e9))  # distinct mtimes, oldest first
+    os.utime(tmp_path / "job-0", (1, 1))
+    _wait(manager.submit("job-12", _frame(), lambda chunk: chunk))
+    kept = sorted(os.listdir(tmp_path), key=lambda name: int(name.split("-")[1]))
+    assert kept == [f"job-{n}" for n in range(4, 13)]
+    assert manager.get("job-0") is None and manager.get("job-12") is not None
+
+
+def test_restart_discards_checkpoints(tmp_path):
+    manager = JobManager(job_dir=str(tmp_path))
+    _wait(manager.submit("job", _frame(), lambda chunk: chunk))
+    manager.restart("job")
+    assert manager.get("job") is None and not os.path.exists(tmp_path / "job")
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from flag_index import DISCREPANCY_FLAG
+from map_bins import GERMANY_CENTRE, MIN_ZOOM, MapBinner, view_bounds
+
+
+def _results(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"Latitude": rng.uniform(47.5, 55.0, n), "Longitude": rng.uniform(6.0, 15.0, n),
+                       "Sum Insured": rng.integers(1, 100, n) * 1000.0,
+                       "City": rng.choice(["Berlin", "Köln"], n), DISCREPANCY_FLAG: rng.random(n) < 0.3})
+    df.loc[:9, "Latitude"] = np.nan
+    return df
+
+
+def test_cells_conserve_locations_and_sum_insured():
+    df = _results()
+    binner = MapBinner(df)
+    valid = df["Latitude"].notna()
+    assert binner.missing == 10
+    for zoom in (MIN_ZOOM, 6, 8):
+        cells = binner.cells(zoom)
+        assert cells["Locations"].sum() == valid.sum()
+        assert cells["Sum Insured"].sum() == df.loc[valid, "Sum Insured"].sum()
+        flagged = (cells[DISCREPANCY_FLAG] * cells["Locations"]).sum()
+        assert round(flagged) == df.loc[valid, DISCREPANCY_FLAG].sum()
+        assert cells["Flagged"].equals(cells[DISCREPANCY_FLAG])
+    assert len(binner.cells(8)) > len(binner.cells(6)) > len(binner.cells(MIN_ZOOM))
+
+
+def test_view_bounds_limit_the_cells():
+    df = _results()
+    binner = MapBinner(df)
+    assert view_bounds(GERMANY_CENTRE, MIN_ZOOM) is None
+    bounds = view_bounds(GERMANY_CENTRE, 8)
+    inside = df["Latitude"].between(bounds[0], bounds[1]) & df["Longitude"].between(bounds[2], bounds[3])
+    cells = binner.cells(8, bounds)
+    assert cells["Locations"].sum() == inside.sum()
+    assert cells["lat"].between(bounds[0], bounds[1]).all() and cells["lon"].between(bounds[2], bounds[3]).all()
+    assert binner.cells(8, bounds) is cells  # cached per (zoom, bounds)
+
+
+def test_empty_frame_gives_no_cells():
+    df = _results().iloc[:10]
+    assert MapBinner(df).cells(8).empty
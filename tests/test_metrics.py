@@ -0,0 +1,49 @@
+import pickle
+
+from metrics import Metrics
+
+
+def _metrics():
+    metrics = Metrics()
+    with metrics.stage("geocode"):
+        pass
+    for seconds in (0.01, 0.2, 3.0):
+        metrics.observe("geocode_search", seconds, 200)
+    metrics.observe("geocode_search", 0.04, 429)
+    metrics.incr("cache_forward_hits", 5)
+    return metrics
+
+
+def test_snapshot_summarizes_calls():
+    snapshot = _metrics().snapshot()
+    assert snapshot["stages"]["geocode"]["runs"] == 1
+    latency = snapshot["latency"]["geocode_search"]
+    assert latency["count"] == 4 and latency["max_s"] == 3.0
+    assert latency["mean_s"] == round(3.25 / 4, 4)
+    assert snapshot["status_codes"] == {"geocode_search": {"200": 3, "429": 1}}
+    assert snapshot["counters"] == {"cache_forward_hits": 5}
+
+
+def test_merge_adds_a_pickled_worker_registry():
+    metrics = _metrics()
+    metrics.merge(pickle.loads(pickle.dumps(_metrics())))
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["geocode"]["runs"] == 2
+    assert snapshot["latency"]["geocode_search"]["count"] == 8
+    assert snapshot["status_codes"]["geocode_search"] == {"200": 6, "429": 2}
+    assert snapshot["counters"]["cache_forward_hits"] == 10
+
+
+def test_prometheus_histogram_is_cumulative():
+    lines = _metrics().to_prometheus().splitlines()
+    buckets = {line.split('le="')[1].split('"')[0]: int(line.rsplit(" ", 1)[1])
+               for line in lines if line.startswith("dq_call_latency_seconds_bucket")}
+    assert (buckets["0.05"], buckets["0.25"], buckets["2.5"], buckets["5.0"], buckets["+Inf"]) == (2, 3, 3, 4, 4)
+    assert 'dq_http_responses_total{call="geocode_search",code="429"} 1' in lines
+    assert 'dq_events_total{event="cache_forward_hits"} 5' in lines
+
+
+def test_reset_clears_everything():
+    metrics = _metrics()
+    metrics.reset()
+    assert metrics.snapshot() == {"stages": {}, "latency": {}, "status_codes": {}, "counters": {}}
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from offline_geo import OfflineReverseGeocoder, load_postcode_centroids, to_xyz
+
+
+@pytest.fixture
+def geocoder():
+    return OfflineReverseGeocoder(pd.DataFrame({
+        "postcode": ["10115", "20095", "01067"], "city": ["Berlin", "Hamburg", "Dresden"],
+        "lat": [52.532, 53.551, 51.050], "lon": [13.385, 9.994, 13.737],
+    }))
+
+
+def test_to_xyz_is_on_the_unit_sphere():
+    assert np.allclose(np.linalg.norm(to_xyz([0, 45, -89], [0, 100, 179]), axis=1), 1)
+
+
+def test_nearest_centroid_within_range(geocoder):
+    assert geocoder.reverse(52.52, 13.40) == ("Berlin", "10115")
+    assert geocoder.reverse(48.14, 11.58) == ("", "")  # Munich is beyond MAX_MATCH_DISTANCE_KM
+
+
+def test_reverse_batch_deduplicates_and_reports_progress(geocoder):
+    progress = []
+    out = geocoder.reverse_batch([(53.55, 10.0), (53.55, 10.0), (51.05, 13.74)],
+                                 on_progress=lambda done, total: progress.append((done, total)))
+    assert out == {(53.55, 10.0): ("Hamburg", "20095"), (51.05, 13.74): ("Dresden", "01067")}
+    assert progress == [(2, 2)]
+    assert geocoder.reverse_batch([]) == {}
+
+
+def test_geonames_file_keeps_leading_zeros(tmp_path):
+    path = tmp_path / "DE.txt"
+    path.write_text("DE\t01067\tDresden\t\t\t\t\t\t\t51.05\t13.737\t4\nDE\t10115\tBerlin\t\t\t\t\t\t\t52.532\t13.385\t4\n")
+    centroids = load_postcode_centroids(str(path))
+    assert centroids["postcode"].tolist() == ["01067", "10115"]
+    assert OfflineReverseGeocoder(centroids).reverse(51.05, 13.74) == ("Dresden", "01067")
@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+from benchmarks.synthetic import generate_portfolio
+from geocoding import GeocodingEngine
+from metrics import METRICS, Metrics
+
+
+class InlinePool(ThreadPoolExecutor):
+    # ProcessPoolExecutor stand-in that records its size and runs shards on threads
+    sizes = []
+
+    def __init__(self, max_workers, mp_context=None):
+        self.sizes.append(max_workers)
+        super().__init__(max_workers)
+
+
+def test_shard_positions_cover_every_row_once(portfolio):
+    for by in pipeline.SHARD_BY:
+        shards = pipeline.shard_positions(portfolio, 4, by)
+        assert 1 <= len(shards) <= 4
+        assert np.array_equal(np.sort(np.concatenate(shards)), np.arange(len(portfolio)))
+
+
+def test_postal_shards_keep_regions_together(portfolio):
+    prefixes = portfolio["Postal Code"].str[:pipeline.POSTAL_PREFIX_DIGITS].to_numpy()
+    regions = [set(prefixes[shard]) for shard in pipeline.shard_positions(portfolio, 4, "postal")]
+    assert sum(len(r) for r in regions) == len(set().union(*regions))
+
+
+def test_location_shards_are_even_and_keep_duplicates_together():
+    df = generate_portfolio(20_000, seed=4)[0]
+    shards = pipeline.shard_positions(df, 8)
+    assert len(shards) == 8 and max(len(shard) for shard in shards) < 1.1 * len(df) / 8
+    keys = pipeline.location_keys(df).to_numpy()
+    assert sum(len(set(keys[shard])) for shard in shards) == len(set(keys))
+
+
+def test_rate_limit_is_split_over_the_shards_created(monkeypatch, mock_api):
+    df = pd.DataFrame({"Address": ["Hauptstr 1", "Hauptstr 2", "Hauptstr 3"], "City": "Berlin",
+                       "Postal Code": ["10115", "10117", "20095"]})  # two postcode regions
+    rates = []
+
+    def fake_shard(shard, settings, *args):
+        rates.append(settings["rate_limit"])
+        return shard, len(shard), Metrics()
+
+    monkeypatch.setattr(pipeline, "_process_shard", fake_shard)
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", InlinePool)
+    InlinePool.sizes.clear()
+    engine = GeocodingEngine("test-key", rate_limit=10, base_url=mock_api.base_url)
+    result_df, n_unique = pipeline.process_frame_sharded(df, engine, n_shards=8, shard_by="postal")
+    assert rates == [5.0, 5.0] and InlinePool.sizes == [2]
+    pd.testing.assert_frame_equal(result_df, df)
+    assert n_unique == 3
+
+
+def test_sharded_run_matches_single_process(engine, portfolio):
+    single, _ = pipeline.process_frame(portfolio.copy(), engine)
+    sharded, n_unique = pipeline.process_frame_sharded(portfolio.copy(), engine, n_shards=2)
+    pd.testing.assert_frame_equal(sharded, single)
+    assert n_unique >= pipeline.location_keys(portfolio).nunique()
+
+
+def test_streaming_matches_the_in_memory_run(engine, tmp_path):
+    source, output = tmp_path / "portfolio.csv", tmp_path / "validated.csv"
+    raw = generate_portfolio(250, seed=3)[0]
+    raw.to_csv(source, index=False)
+    result_df, report = pipeline.run_pipeline(pipeline.load_portfolio(str(source)), engine)
+    chunks = []
+    streamed = pipeline.run_pipeline_streaming(str(source), str(output), engine, chunksize=100, on_chunk=chunks.append)
+    assert chunks == [100, 200, 250]
+    assert streamed["flag_counts"] == report["flag_counts"]
+    assert streamed["completeness"] == report["completeness"]
+    assert streamed["policy_counts"] == report["policy_counts"]
+    expected = tmp_path / "expected.csv"
+    result_df.to_csv(expected, index=False)
+    pd.testing.assert_frame_equal(pd.read_csv(output), pd.read_csv(expected))
+
+
+def test_rows_at_their_api_coordinates_skip_the_reverse_lookup(engine):
+    df = pd.DataFrame({"Address": ["Hauptstr. 1", "Ringstr. 2", "Zeil 3"], "City": ["Köln", "Berlin", "Frankfurt"],
+                       "Postal Code": ["50667", "10115", "60311"]})
+    api_df = engine.geocode_frame(df)
+    df["Latitude"], df["Longitude"] = api_df["API_Latitude"], api_df["API_Longitude"]
+    df.loc[2, "Latitude"] += 0.01  # about 1 km off: looked up
+    looked_up = []
+
+    def reverse_source(coords):
+        coords = list(coords)
+        looked_up.extend(coords)
+        return engine.reverse_many(coords)
+
+    result_df, _ = pipeline.geocode_and_validate(df.copy(), engine, reverse_source=reverse_source)
+    assert looked_up == [(df.loc[2, "Latitude"], df.loc[2, "Longitude"])]
+    assert METRICS.snapshot()["counters"]["reverse_answered_by_forward"] == 2
+    assert not result_df.loc[[0, 1], "DQ: City/Postal Mismatch"].any()
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from profiling import content_hash, profile_frame
+
+
+def test_profile_counts_ranges_and_plausibility():
+    df = pd.DataFrame({
+        "Sum Insured": [100.0, 0.0, None, 50.0],
+        "Deductible": [10.0, 5.0, 1.0, 80.0],
+        "Year Built": pd.array([1990, 3000, None, 1800], dtype="Int32"),
+        "Occupancy": pd.Series(["Office", "Retail", None, "Office"], dtype="category"),
+    })
+    profile = profile_frame(df, ["Sum Insured", "Year Built", "Occupancy", "Basement"])
+    columns = profile["columns"].set_index("column")
+    assert columns.loc["Sum Insured", "empty_count"] == 1
+    assert columns.loc["Sum Insured", "max"] == 100.0
+    assert columns.loc["Occupancy", "distinct"] == 2
+    assert not columns.loc["Basement", "present"]
+    checks = dict(zip(profile["plausibility"]["check"], profile["plausibility"]["count"]))
+    assert checks["Sum Insured ≤ 0"] == 1
+    assert checks["Deductible > Sum Insured"] == 2
+    assert checks["Year Built in the future"] == 1
+
+
+def test_profile_of_an_all_empty_int_column():
+    df = pd.DataFrame({"Year Built": pd.array([None, None], dtype="Int32")})
+    row = profile_frame(df, ["Year Built"])["columns"].iloc[0]
+    assert row["empty_count"] == 2 and np.isnan(row["min"])
+
+
+def test_content_hash_is_stable():
+    assert content_hash(b"abc") == content_hash(b"abc") != content_hash(b"abd")
@@ -0,0 +1,79 @@
+import email.utils
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+import requests
+
+from benchmarks.mock_geoapify import MockGeoapify
+from geocoding import GeocodingEngine
+from metrics import METRICS
+from ratecontrol import ApiUnavailableError, RequestController, retry_after_seconds
+
+
+def _response(status, retry_after=None):
+    return SimpleNamespace(status_code=status, headers={"Retry-After": retry_after} if retry_after else {})
+
+
+def _replay(*outcomes):
+    # send_fn answering with the given statuses (or raising the given exceptions) in turn
+    outcomes = list(outcomes)
+
+    def send():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return _response(outcome)
+    return send
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(_response(429, "3")) == 3.0
+    future = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 55 < retry_after_seconds(_response(429, future)) <= 60
+    assert retry_after_seconds(_response(429, "soon")) is None
+    assert retry_after_seconds(_response(429)) is None and retry_after_seconds(None) is None
+
+
+def test_throttled_requests_are_retried_and_slow_the_controller():
+    controller = RequestController(max_rate=10, max_concurrency=8, backoff_base=0)
+    response = controller.send(_replay(429, 503, 200))
+    assert response.status_code == 200
+    assert METRICS.snapshot()["counters"]["geoapify_retries"] == 2
+    assert controller.rate == pytest.approx(5 + 1 / 5)  # one decrease per DECREASE_INTERVAL, then one increase
+    assert controller.concurrency < 8
+
+
+def test_client_errors_and_connection_errors():
+    controller = RequestController(min_rate=100, backoff_base=0, max_retries=2)
+    assert controller.send(_replay(404)).status_code == 404
+    assert controller.send(_replay(requests.ConnectionError(), 200)).status_code == 200
+    with pytest.raises(ApiUnavailableError):
+        controller.send(_replay(500, 500, 500))
+    with pytest.raises(ValueError):
+        controller.send(_replay(ValueError("bad body")))
+    assert controller.state()["in_flight"] == 0
+
+
+def test_circuit_opens_after_consecutive_failures():
+    controller = RequestController(backoff_base=0, max_retries=5, breaker_threshold=3, breaker_cooldown=60)
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise requests.Timeout()
+    with pytest.raises(ApiUnavailableError, match="circuit open"):
+        controller.send(send)
+    assert len(calls) == 3 and controller.state()["circuit_open"]
+    assert METRICS.snapshot()["counters"]["geoapify_circuit_opened"] == 1
+
+
+def test_engine_geocodes_every_row_through_429s():
+    df = pd.DataFrame({"Address": [f"Hauptstr. {i}" for i in range(20)], "City": "Köln", "Postal Code": "50667"})
+    with MockGeoapify(rate_429=0.3, retry_after=0, seed=1) as mock:
+        engine = GeocodingEngine("test-key", max_workers=4, rate_limit=0, base_url=mock.base_url)
+        engine.controller.min_rate, engine.controller.backoff_base = 50, 0.01
+        api_df = engine.geocode_frame(df)
+        assert mock.status_counts[429] > 0
+    assert api_df["API_Latitude"].notna().all()
@@ -0,0 +1,49 @@
+import io
+
+from geocoding import GeocodeResult, api_result_frame, apply_api_results
+from pipeline import completeness, prepare_geocoding_columns
+from schema import read_table, unparsable_values
+
+CSV = """Unique ID,Address,City,Postal Code,Latitude,Longitude,Geocoding Confidence
+001,Hauptstr 1,Berlin,01067,52.52,13.40,0.9
+002,Hauptstr 2,Berlin,10115,52.53,13.41,0.9
+"""
+
+
+def test_text_columns_keep_leading_zeros():
+    df = read_table(io.StringIO(CSV))
+    assert df["Unique ID"].tolist() == ["001", "002"]
+    assert df["Postal Code"].tolist() == ["01067", "10115"]
+
+
+def test_equal_confidence_keeps_source_coordinates():
+    df = prepare_geocoding_columns(read_table(io.StringIO(CSV)))
+    api_df = api_result_frame({0: GeocodeResult(52.0, 13.0, 0.9), 1: GeocodeResult(52.0, 13.0, 0.95)}, df.index)
+    apply_api_results(df, api_df)
+    assert df["Use_API_Coordinates"].tolist() == [False, True]
+    assert df["API_Confidence"].dtype == df["Geocoding Confidence"].dtype == "float64"
+
+
+def test_unparsable_numbers_are_kept_and_reported():
+    df = read_table(io.StringIO("Year Built,Number of Stories,Sum Insured\nca. 1900,3+,1.000.000\n1990,2,500000\n"))
+    assert df["Year Built"].tolist() == ["ca. 1900", "1990"]
+    assert df["Number of Stories"].tolist() == ["3+", "2"]
+    assert df["Sum Insured"].tolist() == ["1.000.000", "500000"]
+    assert {column: values.tolist() for column, values in unparsable_values(df).items()} == {
+        "Year Built": ["ca. 1900"], "Number of Stories": ["3+"], "Sum Insured": ["1.000.000"]}
+    assert completeness(df, ["Year Built"])["empty_count"].tolist() == [0]
+
+
+def test_numeric_columns_are_downcast_when_every_value_parses():
+    df = read_table(io.StringIO("Year Built,Sum Insured\n1990,1000\n,2000.5\n"))
+    assert df["Year Built"].dtype == "Int32"
+    assert df["Sum Insured"].dtype == "float64"
+    assert unparsable_values(df) == {}
+
+
+def test_out_of_range_numbers_load():
+    df = read_table(io.StringIO("Year Built,Number of Stories\n2101990,3\n1990,99999999999\n"))
+    assert df["Year Built"].tolist() == [2101990, 1990]  # left to the Year Built plausibility check
+    assert df["Number of Stories"].tolist() == [3, 99999999999]  # kept as read
+    assert {column: values.tolist() for column, values in unparsable_values(df).items()} == {
+        "Number of Stories": [99999999999]}